@@ -27,10 +27,11 @@ class PowerOpsClient:
         self,
         client: CogniteClient,
         cog_shop_service: Literal["prod", "staging"] | None = None,
+        cog_shop_pool_size: int = 10,
     ):
         self.cdf = client
         self.powermodel = PowerOpsModelsClient(self.cdf)
-        self.cogshop = CogShopAPI(self.cdf, self.powermodel, cog_shop_service)
+        self.cogshop = CogShopAPI(self.cdf, self.powermodel, cog_shop_service, pool_size=cog_shop_pool_size)
 
         DomainModelWrite.external_id_factory = ExternalIdFactory.create_external_id_factory(
             prefix_ext_id_factory=ExternalIdFactory(
@@ -1,35 +1,95 @@
 import datetime
-from typing import Literal
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, Literal
 from urllib.parse import urlparse
 
+import numpy as np
+import pandas as pd
 import requests
 from cognite.client import CogniteClient
+from cognite.client import data_modeling as dm
+from cognite.client.data_classes import DatapointsArray, DatapointsQuery
+from cognite.client.utils import datetime_to_ms
 
 from cognite.powerops.client._generated._api_client import PowerOpsModelsClient
 from cognite.powerops.client._generated.data_classes import (
     ShopCase,
+    ShopCaseGraphQL,
     ShopCaseWrite,
     ShopFileWrite,
     ShopModelWrite,
     ShopResult,
+    ShopResultGraphQL,
     ShopResultList,
     ShopScenarioWrite,
 )
 from cognite.powerops.client._generated.data_classes._core import (
     DEFAULT_INSTANCE_SPACE,
+    GraphQLCore,
+    GraphQLList,
 )
+from cognite.powerops.client.shop.http import RequestTimings, create_session
+from cognite.powerops.utils.require import require
+
+logger = getLogger(__name__)
+
+# The statuses a SHOP case does not leave without being triggered again
+TERMINAL_STATUSES: tuple[str, ...] = ("completed", "failed", "stale", "timedOut")
+
+# The maximum number of external ids in the filter of one list request
+_MAX_FILTER_EXTERNAL_IDS = 1000
+
+
+@dataclass
+class ShopCaseTriggerResult:
+    """The SHOP cases that were triggered by `CogShopAPI.trigger_shop_cases`, and the error of each case that failed.
+
+    The cases that failed were not sent to CogSHOP, or the request they were sent in was rejected, and their status is
+    unchanged.
+    """
+
+    triggered: list[str] = field(default_factory=list)
+    failed: dict[str, Exception] = field(default_factory=dict)
 
 
 class CogShopAPI:
+    """
+    Prepare, trigger and follow up SHOP cases run by CogSHOP as a Service (CShaaS).
+
+    Args:
+        cdf: CogniteClient for the project of the SHOP cases
+        po: PowerOpsModelsClient for the project of the SHOP cases
+        cog_shop_service: The CShaaS environment, defaults to staging for the `power-ops-staging` project
+        pool_size: The maximum number of connections to CShaaS kept alive
+        max_retries: The maximum number of retries of a CShaaS request that failed with a connection error, or that
+            was rejected with a 429 or 503 with `Retry-After`. Other failed triggers are not retried, as CShaaS may
+            already have started the runs.
+    """
+
     def __init__(
         self,
         cdf: CogniteClient,
         po: PowerOpsModelsClient,
         cog_shop_service: Literal["prod", "staging"] | None = None,
+        pool_size: int = 10,
+        max_retries: int = 5,
     ):
         self._cdf = cdf
         self._po = po
         self.cog_shop_service = cog_shop_service
+        # Kept alive between calls, so repeated triggers reuse the connection to CShaaS
+        self._session = create_session(pool_size=pool_size, max_retries=max_retries)
+        self._session.auth = self._auth
+        self.timings = RequestTimings()
+
+    def _auth(self, r: requests.PreparedRequest) -> requests.PreparedRequest:
+        # Evaluated per request, as the token of the credentials is refreshed
+        auth_header_name, auth_header_value = self._cdf._config.credentials.authorization_header()
+        r.headers[auth_header_name] = auth_header_value
+        return r
 
     def _shop_url_cshaas(self) -> str:
         project = self._cdf.config.project
@@ -64,35 +124,149 @@ class CogShopAPI:
                 Only used for post run yaml dumps. Pre run will always use `output_only=False`.
         """
 
-        def auth(r: requests.PreparedRequest) -> requests.PreparedRequest:
-            auth_header_name, auth_header_value = self._cdf._config.credentials.authorization_header()
-            r.headers[auth_header_name] = auth_header_value
-            return r
-
-        shop_url = self._shop_url_cshaas()
-        shop_body = {
-            "mode": "fdm",
-            "runs": [
-                {
-                    "case_external_id": shop_case_external_id,
-                    "write_classic_ts": write_classic_ts,
-                    "shop_dump_output_only": shop_dump_output_only,
-                }
-            ],
-        }
-
-        response = requests.post(
-            url=shop_url,
-            json=shop_body,
-            auth=auth,
-        )
-        response.raise_for_status()
+        self._post_runs([self._shop_run(shop_case_external_id, write_classic_ts, shop_dump_output_only)])
 
         shop_case_update = ShopCaseWrite(
             external_id=shop_case_external_id,
             status="triggered",
         )
-        self._po.upsert(shop_case_update)
+        with self.timings.cdf.time():
+            self._po.upsert(shop_case_update)
+
+    def trigger_shop_cases(
+        self,
+        shop_case_external_ids: Sequence[str],
+        write_classic_ts: bool = True,
+        shop_dump_output_only: bool = False,
+        batch_size: int = 50,
+    ) -> ShopCaseTriggerResult:
+        """
+        Trigger many SHOP cases in CogSHOP as a Service.
+
+        The cases are sent as the `runs` of one request per batch, and all cases that were accepted are marked as
+        `triggered` with one upsert. A failed request does not stop the remaining batches, instead the cases of the
+        failed batch are reported in the result.
+
+        Args:
+            shop_case_external_ids (Sequence[str]):
+                External IDs of the SHOP cases to trigger.
+            write_classic_ts (bool):
+                Whether to CogSHOP should write classic time series as part of post processing.
+            shop_dump_output_only (bool):
+                Used in CogSHOP as `shop.dump_yaml(output_only=shop_dump_output_only)`.
+                Only used for post run yaml dumps. Pre run will always use `output_only=False`.
+            batch_size (int):
+                Maximum number of cases in each request to CogSHOP as a Service.
+
+        Returns:
+            ShopCaseTriggerResult: The external IDs of the triggered cases, and the error of each case that failed.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        # Triggering the same case twice in one call would run it twice
+        case_external_ids = list(dict.fromkeys(shop_case_external_ids))
+
+        result = ShopCaseTriggerResult()
+        for start in range(0, len(case_external_ids), batch_size):
+            batch = case_external_ids[start : start + batch_size]
+            runs = [self._shop_run(external_id, write_classic_ts, shop_dump_output_only) for external_id in batch]
+            try:
+                self._post_runs(runs)
+            except requests.RequestException as error:
+                logger.warning(f"Failed to trigger {len(batch)} SHOP case(s): {error}")
+                result.failed.update(dict.fromkeys(batch, error))
+            else:
+                result.triggered.extend(batch)
+
+        if result.triggered:
+            # The SDK splits the upsert into requests of at most 1000 instances
+            with self.timings.cdf.time():
+                self._po.upsert(
+                    [ShopCaseWrite(external_id=external_id, status="triggered") for external_id in result.triggered]
+                )
+        return result
+
+    @staticmethod
+    def _shop_run(shop_case_external_id: str, write_classic_ts: bool, shop_dump_output_only: bool) -> dict:
+        return {
+            "case_external_id": shop_case_external_id,
+            "write_classic_ts": write_classic_ts,
+            "shop_dump_output_only": shop_dump_output_only,
+        }
+
+    def _post_runs(self, runs: list[dict]) -> None:
+        with self.timings.cshaas.time():
+            response = self._session.post(url=self._shop_url_cshaas(), json={"mode": "fdm", "runs": runs})
+        response.raise_for_status()
+
+    def wait_for_cases(
+        self,
+        case_external_ids: Sequence[str],
+        timeout: float | None = 3600,
+        poll_interval: float = 1,
+        max_poll_interval: float = 30,
+    ) -> Iterator[ShopCase]:
+        """
+        Wait for SHOP cases to finish, yielding each case as soon as it reaches a terminal status.
+
+        The status of all pending cases is checked with one list request per poll, only returning the cases that
+        finished. The poll interval starts at `poll_interval` and is doubled up to `max_poll_interval` every poll
+        that no case finished, and is reset when one does.
+
+        Args:
+            case_external_ids: External IDs of the SHOP cases to wait for
+            timeout: The maximum number of seconds to wait for all cases, or None to wait indefinitely
+            poll_interval: The initial number of seconds between polls
+            max_poll_interval: The maximum number of seconds between polls
+
+        Yields:
+            The cases in the order they finish, with status `completed`, `failed`, `stale` or `timedOut`
+
+        Raises:
+            TimeoutError: If not all cases finished within `timeout` seconds
+
+        Example:
+            ```python
+            for shop_case in client.cogshop.wait_for_cases(result.triggered, timeout=1800):
+                if shop_case.status == "completed":
+                    process_results(shop_case)
+            ```
+        """
+        pending = dict.fromkeys(case_external_ids)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = poll_interval
+        while pending:
+            finished = self._list_finished_cases(list(pending))
+            for shop_case in finished:
+                if shop_case.external_id in pending:
+                    del pending[shop_case.external_id]
+                    yield shop_case
+            if not pending:
+                return
+
+            interval = poll_interval if finished else min(interval * 2, max_poll_interval)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"{len(pending)} SHOP case(s) did not finish within {timeout} seconds: {', '.join(pending)}"
+                    )
+                interval = min(interval, remaining)
+            time.sleep(interval)
+
+    def _list_finished_cases(self, case_external_ids: list[str]) -> list[ShopCase]:
+        finished: list[ShopCase] = []
+        for start in range(0, len(case_external_ids), _MAX_FILTER_EXTERNAL_IDS):
+            external_ids = case_external_ids[start : start + _MAX_FILTER_EXTERNAL_IDS]
+            with self.timings.cdf.time():
+                finished.extend(
+                    self._po.shop_based_day_ahead_bid_process.shop_case.list(
+                        status=list(TERMINAL_STATUSES),  # type: ignore[arg-type]
+                        filter=dm.filters.In(["node", "externalId"], external_ids),
+                        limit=-1,
+                    )
+                )
+        return finished
 
     def _validate_shop_scenario_reference(
         self, shop_scenario_reference: str | ShopScenarioWrite
@@ -106,9 +280,11 @@ class CogShopAPI:
 
         elif isinstance(shop_scenario_reference, str):
             # if the scenario reference is a string, it is assumed to be an external id
-            if scenario := self._po.shop_based_day_ahead_bid_process.shop_scenario.retrieve(
-                external_id=shop_scenario_reference
-            ):
+            with self.timings.cdf.time():
+                scenario = self._po.shop_based_day_ahead_bid_process.shop_scenario.retrieve(
+                    external_id=shop_scenario_reference
+                )
+            if scenario:
                 return scenario.external_id
 
         raise ValueError(f"Invalid shop scenario reference: {shop_scenario_reference}.")
@@ -239,9 +415,10 @@ class CogShopAPI:
                 - "identifier": Retrieve only identifiers of connections
                 - "full": Retrieve full connection objects
         """
-        return self._po.shop_based_day_ahead_bid_process.shop_case.retrieve(
-            external_id=case_external_id, retrieve_connections=retrieve_connections
-        )
+        with self.timings.cdf.time():
+            return self._po.shop_based_day_ahead_bid_process.shop_case.retrieve(
+                external_id=case_external_id, retrieve_connections=retrieve_connections
+            )
 
     def list_shop_results_for_case(self, case_external_id: str, limit: int = 3) -> ShopResultList:
         """
@@ -250,14 +427,16 @@ class CogShopAPI:
             case_external_id: External ID of the SHOP case
             limit: Number of results to return, -1 for all results
         """
-        result_list: ShopResultList = self._po.shop_based_day_ahead_bid_process.shop_result.list(
-            case=case_external_id, limit=limit
-        )
+        with self.timings.cdf.time():
+            result_list: ShopResultList = self._po.shop_based_day_ahead_bid_process.shop_result.list(
+                case=case_external_id, limit=limit
+            )
         return result_list
 
     def retrieve_shop_result(self, result_external_id: str) -> ShopResult:
         """Retrieve a shop result from CDF"""
-        return self._po.shop_based_day_ahead_bid_process.shop_result.retrieve(external_id=result_external_id)
+        with self.timings.cdf.time():
+            return self._po.shop_based_day_ahead_bid_process.shop_result.retrieve(external_id=result_external_id)
 
     def list_shop_versions(self) -> list[str]:
         """List the available version of SHOP in CDF. Does not include versions that are "local" to CShaaS.
@@ -265,29 +444,299 @@ class CogShopAPI:
         'SHOP-{VERSION}-pyshop-python{py_version}.linux.zip' and the metadata {'shop:type': 'shop-release'}.
         """
         # todo? Add an endpoint to list the available versions of SHOP via powerops API?
-        return [file.name for file in self._cdf.files.list(metadata={"shop:type": "shop-release"}, limit=-1)]
+        with self.timings.cdf.time():
+            files = self._cdf.files.list(metadata={"shop:type": "shop-release"}, limit=-1)
+        return [file.name for file in files]
 
     def retrieve_shop_case_graphql(self, case_external_id: str) -> ShopCase:
         """Retrieve a shop case from CDF using GraphQL.
         Instead of the external of IDs of ShopScenario, ShopModel and ShopFiles, the actual instances are fetched.
         This is provided as a fallback option for cases when `retrieve_shop_case` does not perform well."""
-        graphql_response = self._po.shop_based_day_ahead_bid_process.graphql_query(_shop_case_query(case_external_id))
+        with self.timings.cdf.time():
+            graphql_response = self._po.shop_based_day_ahead_bid_process.graphql_query(
+                _shop_case_query(case_external_id)
+            )
         if graphql_response:
             shop_case: ShopCase = graphql_response[0].as_read()
         else:
             raise ValueError(f"Failed to fetch ShopCase instance with external_id: {case_external_id}.")
         return shop_case
 
+    def retrieve_shop_cases_graphql(
+        self, case_external_ids: Sequence[str], space: str = DEFAULT_INSTANCE_SPACE
+    ) -> list[ShopCase]:
+        """Retrieve many shop cases from CDF using GraphQL.
+        Like `retrieve_shop_case_graphql`, the ShopScenario, ShopModel, output definitions and ShopFiles (ordered) are
+        fetched with the cases. The cases are listed with an `in` filter on their external IDs and cursor pagination,
+        so hundreds of cases only take a few requests.
 
-# Helper function for rendering graphql queries
+        Args:
+            case_external_ids: External IDs of the SHOP cases
+            space: The space of the SHOP cases
 
+        Returns:
+            The cases in the order of `case_external_ids`. Cases that do not exist are left out.
+        """
+        case_external_ids = list(dict.fromkeys(case_external_ids))
+        shop_cases: dict[str, ShopCase] = {}
+        for start in range(0, len(case_external_ids), _MAX_FILTER_EXTERNAL_IDS):
+            external_ids = case_external_ids[start : start + _MAX_FILTER_EXTERNAL_IDS]
+            for item in self._graphql_query_all(_SHOP_CASES_QUERY, {"externalIds": external_ids, "space": space}):
+                if isinstance(item, ShopCaseGraphQL):
+                    shop_case = item.as_read()
+                    shop_cases[shop_case.external_id] = shop_case
+        return [shop_cases[external_id] for external_id in case_external_ids if external_id in shop_cases]
+
+    def fetch_results(
+        self,
+        case_external_ids: Sequence[str],
+        attributes: Sequence[str] | None = None,
+        space: str = DEFAULT_INSTANCE_SPACE,
+    ) -> pd.DataFrame:
+        """
+        Fetch the output time series of SHOP cases into one DataFrame.
 
-def _shop_case_query(external_id: str, space: str = DEFAULT_INSTANCE_SPACE) -> str:
-    """Render a GraphQL query to fetch a ShopCase instance by external_id."""
-    query_template = """
-    query RetrieveShopCaseByExternalId {{
-      getShopCaseById(instance: {{ space: "{space}", externalId: "{external_id}" }}) {{
-        items {{
+        The results of the cases, their output `ShopTimeSeries` and the CDF time series these refer to are resolved
+        with one (paginated) GraphQL query, and the datapoints of all time series are then retrieved concurrently in
+        one call. If a case has more than one result, the most recent one is used.
+
+        Args:
+            case_external_ids: External IDs of the SHOP cases
+            attributes: Only fetch these SHOP attributes (e.g. `["production", "discharge"]`), defaults to all
+            space: The space of the SHOP cases
+
+        Returns:
+            A DataFrame with one row per output time series, indexed by (case, object_type, object_name, attribute),
+            and one column per timestamp. Cases without results are left out.
+
+        Example:
+            ```python
+            results = client.cogshop.fetch_results(case_ids, attributes=["production"])
+            production = results.xs("generator", level="object_type")
+            ```
+        """
+        # The raw items are kept, as the parsed results do not have the page info of their output time series
+        latest_results: dict[str, tuple[ShopResultGraphQL, dict[str, Any]]] = {}
+        raw_results = self._raw_graphql_query_all(
+            _SHOP_RESULTS_QUERY, {"caseExternalIds": list(dict.fromkeys(case_external_ids)), "space": space}
+        )
+        for raw_result in raw_results:
+            item = ShopResultGraphQL.model_validate(raw_result)
+            if item.case is None or item.case.external_id is None:
+                continue
+            latest = latest_results.get(item.case.external_id)
+            if latest is None or _created_time(item) > _created_time(latest[0]):
+                latest_results[item.case.external_id] = (item, raw_result)
+
+        wanted_attributes = None if attributes is None else set(attributes)
+        keys: list[tuple[str, str | None, str | None, str | None]] = []
+        ranges: list[tuple[str, int, int]] = []
+        for case_external_id in dict.fromkeys(case_external_ids):
+            if (latest := latest_results.get(case_external_id)) is None:
+                continue
+            shop_result, raw_result = latest
+            if self._retrieve_remaining_output_time_series(raw_result):
+                shop_result = ShopResultGraphQL.model_validate(raw_result)
+            shop_case = require(shop_result.case)
+            start = 0 if shop_case.start_time is None else datetime_to_ms(shop_case.start_time)
+            end = _MAX_TIMESTAMP_MS if shop_case.end_time is None else datetime_to_ms(shop_case.end_time)
+            for shop_time_series in shop_result.output_time_series or []:
+                if wanted_attributes is not None and shop_time_series.attribute_name not in wanted_attributes:
+                    continue
+                if shop_time_series.time_series is None or shop_time_series.time_series.external_id is None:
+                    continue
+                keys.append(
+                    (
+                        case_external_id,
+                        shop_time_series.object_type,
+                        shop_time_series.object_name,
+                        shop_time_series.attribute_name,
+                    )
+                )
+                ranges.append((shop_time_series.time_series.external_id, start, end))
+        return self._retrieve_wide(keys, ranges)
+
+    def _retrieve_wide(
+        self, keys: list[tuple[str, str | None, str | None, str | None]], ranges: list[tuple[str, int, int]]
+    ) -> pd.DataFrame:
+        """One row per key with the datapoints of the (external id, start, end) range of the key."""
+        index_names = ["case", "object_type", "object_name", "attribute"]
+        # Each range is only retrieved once, even if it is used by several rows
+        unique_ranges = list(dict.fromkeys(ranges))
+        arrays: list[DatapointsArray] = []
+        if unique_ranges:
+            queries = [
+                DatapointsQuery(external_id=external_id, start=start, end=end)
+                for external_id, start, end in unique_ranges
+            ]
+            with self.timings.cdf.time():
+                # The SDK retrieves the datapoints of the time series concurrently
+                arrays = list(self._cdf.time_series.data.retrieve_arrays(external_id=queries, ignore_unknown_ids=True))
+
+        # The results are in the order of the queries, but unknown ids are skipped
+        by_range: dict[tuple[str, int, int], DatapointsArray] = {}
+        remaining = iter(unique_ranges)
+        for datapoints in arrays:
+            time_series_range = next(remaining)
+            while time_series_range[0] != datapoints.external_id:
+                time_series_range = next(remaining)
+            by_range[time_series_range] = datapoints
+
+        rows = [
+            (key, by_range[time_series_range])
+            for key, time_series_range in zip(keys, ranges, strict=True)
+            if time_series_range in by_range
+        ]
+        if len(rows) < len(keys):
+            logger.warning(f"{len(keys) - len(rows)} SHOP output time series do not exist in CDF")
+        if not rows:
+            return pd.DataFrame(
+                index=pd.MultiIndex.from_tuples([], names=index_names), columns=pd.DatetimeIndex([], dtype="M8[ns]")
+            )
+
+        timestamps = np.unique(np.concatenate([datapoints.timestamp for _, datapoints in rows]))
+        values = np.full((len(rows), len(timestamps)), np.nan)
+        for row, (_, datapoints) in enumerate(rows):
+            values[row, np.searchsorted(timestamps, datapoints.timestamp)] = datapoints.value
+        return pd.DataFrame(
+            values,
+            index=pd.MultiIndex.from_tuples([key for key, _ in rows], names=index_names),
+            columns=pd.DatetimeIndex(timestamps).as_unit("ns"),
+        )
+
+    def _retrieve_remaining_output_time_series(self, raw_result: dict[str, Any]) -> bool:
+        """Add the output time series after the first page to a raw result, returning whether there were any."""
+        output_time_series = raw_result["outputTimeSeries"]
+        page_info = output_time_series.pop("pageInfo", None) or {}
+        retrieved = False
+        while page_info.get("hasNextPage"):
+            with self.timings.cdf.time():
+                response = self._cdf.data_modeling.graphql.query(
+                    self._po.shop_based_day_ahead_bid_process._data_model_id,
+                    _SHOP_RESULT_OUTPUT_TIME_SERIES_QUERY,
+                    {
+                        "space": raw_result["space"],
+                        "externalId": raw_result["externalId"],
+                        "after": page_info["endCursor"],
+                    },
+                )
+            if "errors" in response:
+                raise RuntimeError(response["errors"])
+            pages = [item["outputTimeSeries"] for item in response["getShopResultById"]["items"]]
+            if not pages:
+                raise ValueError(f"ShopResult {raw_result['externalId']} was deleted while retrieving its output")
+            output_time_series["items"].extend(pages[0]["items"])
+            page_info = pages[0]["pageInfo"]
+            retrieved = True
+        return retrieved
+
+    def _raw_graphql_query_all(self, query: str, variables: dict[str, Any]) -> list[dict[str, Any]]:
+        """Like `_graphql_query_all`, but returns the unparsed items, including the page info of nested connections."""
+        items: list[dict[str, Any]] = []
+        cursor = None
+        while True:
+            with self.timings.cdf.time():
+                response = self._cdf.data_modeling.graphql.query(
+                    self._po.shop_based_day_ahead_bid_process._data_model_id, query, {**variables, "after": cursor}
+                )
+            if "errors" in response:
+                raise RuntimeError(response["errors"])
+            (connection,) = response.values()
+            items.extend(connection["items"])
+            page_info = connection.get("pageInfo") or {}
+            if not page_info.get("hasNextPage"):
+                return items
+            cursor = page_info["endCursor"]
+
+    def _graphql_query_all(self, query: str, variables: dict[str, Any]) -> GraphQLList:
+        """Run a paginated GraphQL query with an `$after` cursor variable, returning the items of all pages."""
+        items = GraphQLList([])
+        cursor = None
+        while True:
+            with self.timings.cdf.time():
+                page = self._po.shop_based_day_ahead_bid_process.graphql_query(query, {**variables, "after": cursor})
+            items.extend(page)
+            if page.page_info is None or not page.page_info.has_next_page:
+                return items
+            cursor = page.page_info.end_cursor
+
+
+# The latest timestamp accepted by CDF, used when a SHOP case has no end time
+_MAX_TIMESTAMP_MS = 4102444799999
+
+
+def _created_time(item: GraphQLCore) -> datetime.datetime:
+    if item.data_record is None or item.data_record.created_time is None:
+        return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+    return item.data_record.created_time
+
+
+_OUTPUT_TIME_SERIES_FIELDS = """
+        items {
+          attributeName
+          createdTime
+          externalId
+          lastUpdatedTime
+          objectName
+          objectType
+          space
+          timeSeries {
+            externalId
+          }
+        }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }"""
+
+# Results with more than 1000 output time series get the rest with `_SHOP_RESULT_OUTPUT_TIME_SERIES_QUERY`
+_SHOP_RESULTS_QUERY = f"""
+query ListShopResultsByCase($caseExternalIds: [String!], $space: String, $after: String) {{
+  listShopResult(
+    filter: {{case: {{externalId: {{in: $caseExternalIds}}, space: {{eq: $space}}}}}}
+    first: 1000
+    after: $after
+  ) {{
+    items {{
+      __typename
+      createdTime
+      externalId
+      lastUpdatedTime
+      space
+      case {{
+        createdTime
+        endTime
+        externalId
+        lastUpdatedTime
+        space
+        startTime
+        status
+      }}
+      outputTimeSeries(first: 1000) {{{_OUTPUT_TIME_SERIES_FIELDS}
+      }}
+    }}
+    pageInfo {{
+      hasNextPage
+      endCursor
+    }}
+  }}
+}}
+"""
+
+_SHOP_RESULT_OUTPUT_TIME_SERIES_QUERY = f"""
+query RetrieveShopResultOutputTimeSeries($space: String!, $externalId: String!, $after: String) {{
+  getShopResultById(instance: {{space: $space, externalId: $externalId}}) {{
+    items {{
+      outputTimeSeries(first: 1000, after: $after) {{{_OUTPUT_TIME_SERIES_FIELDS}
+      }}
+    }}
+  }}
+}}
+"""
+
+
+# The fields of a ShopCase with its scenario, model, output definitions and ordered SHOP files
+_SHOP_CASE_FIELDS = """
           __typename
           createdTime
           endTime
@@ -296,15 +745,15 @@ def _shop_case_query(external_id: str, space: str = DEFAULT_INSTANCE_SPACE) -> s
           space
           startTime
           status
-          scenario {{
+          scenario {
             createdTime
             externalId
             lastUpdatedTime
             name
             source
             space
-            outputDefinition {{
-              items {{
+            outputDefinition {
+              items {
                 attributeName
                 createdTime
                 externalId
@@ -315,9 +764,9 @@ def _shop_case_query(external_id: str, space: str = DEFAULT_INSTANCE_SPACE) -> s
                 objectType
                 space
                 unit
-              }}
-            }}
-            model {{
+              }
+            }
+            model {
               createdTime
               externalId
               lastUpdatedTime
@@ -325,10 +774,10 @@ def _shop_case_query(external_id: str, space: str = DEFAULT_INSTANCE_SPACE) -> s
               name
               shopVersion
               space
-            }}
-          }}
-          shopFiles (sort: {{order: ASC}}) {{
-            items {{
+            }
+          }
+          shopFiles (sort: {order: ASC}) {
+            items {
               createdTime
               externalId
               fileReferencePrefix
@@ -338,13 +787,37 @@ def _shop_case_query(external_id: str, space: str = DEFAULT_INSTANCE_SPACE) -> s
               name
               order
               space
-              fileReference {{
+              fileReference {
                 externalId
-              }}
-            }}
-          }}
+              }
+            }
+          }"""
+
+_SHOP_CASES_QUERY = f"""
+query ListShopCasesByExternalId($externalIds: [String!], $space: String, $after: String) {{
+  listShopCase(filter: {{externalId: {{in: $externalIds}}, space: {{eq: $space}}}}, first: 1000, after: $after) {{
+    items {{{_SHOP_CASE_FIELDS}
+    }}
+    pageInfo {{
+      hasNextPage
+      endCursor
+    }}
+  }}
+}}
+"""
+
+
+# Helper function for rendering graphql queries
+
+
+def _shop_case_query(external_id: str, space: str = DEFAULT_INSTANCE_SPACE) -> str:
+    """Render a GraphQL query to fetch a ShopCase instance by external_id."""
+    query_template = """
+    query RetrieveShopCaseByExternalId {{
+      getShopCaseById(instance: {{ space: "{space}", externalId: "{external_id}" }}) {{
+        items {{{fields}
         }}
       }}
     }}
     """
-    return query_template.format(space=space, external_id=external_id)
+    return query_template.format(space=space, external_id=external_id, fields=_SHOP_CASE_FIELDS)
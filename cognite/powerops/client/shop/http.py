@@ -0,0 +1,164 @@
+"""HTTP session and request timings used by `CogShopAPI` for the calls to CogSHOP as a Service (CShaaS).
+
+The session keeps its connections alive between triggers, so only the first request to CShaaS pays for the TCP/TLS
+handshake, and retries failed requests with exponential backoff and jitter. A `Retry-After` header in the response is
+honored instead of the backoff.
+
+Triggering a SHOP case is not idempotent: after a 500/502/504 or a read timeout CShaaS may already have accepted the
+runs, and sending them again would start duplicate SHOP runs. Requests that are not idempotent (e.g. POST) are
+therefore only retried when they were not sent (connection errors), or when CShaaS rejected them with a 429 or 503
+with `Retry-After`.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# The responses to a non-idempotent request that say it was not processed and should be sent again later
+NON_IDEMPOTENT_RETRY_STATUS_CODES = frozenset({429, 503})
+
+
+class JitteredRetry(Retry):
+    """`urllib3` retry configuration that adds a random jitter of up to `jitter` seconds to the backoff.
+
+    The jitter spreads out the retries of many clients that failed at the same time, e.g. when CShaaS restarts.
+    When the response has a `Retry-After` header, it is used instead of the backoff.
+
+    Requests with a method that is not idempotent are only retried on a 429 or 503 response with `Retry-After`,
+    regardless of `status_forcelist`.
+
+    Example:
+        >>> retry = JitteredRetry(total=3, backoff_factor=0, jitter=0.5)
+        >>> retry.get_backoff_time()
+        0
+        >>> retry = retry.increment()
+        >>> retry.jitter, 0 <= retry.get_backoff_time() <= 0.5
+        (0.5, True)
+        >>> retry = JitteredRetry(total=3, status_forcelist=RETRY_STATUS_CODES, allowed_methods=None)
+        >>> retry.is_retry("POST", 502), retry.is_retry("POST", 503, has_retry_after=True), retry.is_retry("GET", 502)
+        (False, True, True)
+    """
+
+    # Not the `backoff_jitter` of urllib3 >= 2, as requests also supports urllib3 1.26
+    def __init__(self, *args: Any, jitter: float = 0.0, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.jitter = jitter
+
+    def new(self, **kwargs: Any) -> JitteredRetry:
+        kwargs.setdefault("jitter", self.jitter)
+        return super().new(**kwargs)  # type: ignore[return-value]
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() not in Retry.DEFAULT_ALLOWED_METHODS and not (
+            status_code in NON_IDEMPOTENT_RETRY_STATUS_CODES and has_retry_after
+        ):
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if self.jitter and self.history:
+            backoff += random.uniform(0, self.jitter)
+        return backoff
+
+
+def create_session(
+    pool_size: int = 10, max_retries: int = 5, backoff_factor: float = 0.5, backoff_jitter: float = 0.5
+) -> requests.Session:
+    """Create a session with a pool of keep-alive connections that retries failed requests.
+
+    Connection errors are retried for all requests, as the request was not sent. Responses with a 5xx or 429 status
+    are retried for idempotent requests, and only 429 and 503 with `Retry-After` for others (e.g. POST). Read errors
+    are never retried, as the server may have processed the request.
+
+    Args:
+        pool_size: The maximum number of connections kept alive per host
+        max_retries: The maximum number of retries of a request
+        backoff_factor: The factor of the exponential backoff between retries, in seconds
+        backoff_jitter: The maximum random number of seconds added to the backoff
+
+    Returns:
+        The session
+    """
+    retry = JitteredRetry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        jitter=backoff_jitter,
+        # A read error happens after the request was sent, so it may already have been processed
+        read=0,
+        other=0,
+        status_forcelist=RETRY_STATUS_CODES,
+        # Let `is_retry` decide on the status retries of POSTs, which are not retried at all by default
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        # Return the last response instead of raising, so `raise_for_status` gives the status of the final attempt
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@dataclass
+class LatencyStats:
+    """The number of requests to a service and the time spent waiting for them, including retries."""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Record the time spent in the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+
+@dataclass
+class RequestTimings:
+    """The latency of the requests `CogShopAPI` makes to CShaaS and to CDF, kept separately.
+
+    Example:
+        >>> timings = RequestTimings()
+        >>> timings.cdf.record(0.25)
+        >>> timings.cdf.record(0.75)
+        >>> timings.cdf.count, timings.cdf.mean_seconds, timings.cdf.max_seconds
+        (2, 0.5, 0.75)
+        >>> timings.cshaas.count
+        0
+    """
+
+    cshaas: LatencyStats = field(default_factory=LatencyStats)
+    cdf: LatencyStats = field(default_factory=LatencyStats)
+
+    def reset(self) -> None:
+        self.cshaas = LatencyStats()
+        self.cdf = LatencyStats()
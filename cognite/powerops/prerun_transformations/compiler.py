@@ -0,0 +1,154 @@
+"""Compiles chains of prerun transformations into fused NumPy kernels.
+
+A mapping's transformations are applied in sequence, each one to the output of the previous. Instead of creating a
+new `pd.Series` for every step, `compile_transformations` groups consecutive elementwise transformations (and the
+offset transformations, whose index changes only depend on the input index) into one kernel. The index of each kernel
+is computed up front, and the values are then transformed as a single NumPy array.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from cognite.powerops.prerun_transformations.transformations import (
+    AddFromOffset,
+    MultiplyFromOffset,
+    Transformation,
+    _ffill,
+    _has_sorted_naive_index,
+    _plan_from_offset,
+)
+
+_OffsetTransformation = AddFromOffset | MultiplyFromOffset
+
+
+@dataclass
+class _OffsetStep:
+    """The index change and per-timestamp operand of an offset transformation, precomputed for a given input index."""
+
+    operation: Callable[[np.ndarray, np.ndarray], np.ndarray]
+    positions: np.ndarray | None  # Positions of the input timestamps in the output index, None if unchanged
+    output_length: int
+    operand: np.ndarray
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        if self.positions is not None:
+            reindexed = np.full(self.output_length, np.nan)
+            reindexed[self.positions] = values
+            values = reindexed
+        return self.operation(_ffill(values), self.operand)
+
+
+def _offset_step(
+    transformation: _OffsetTransformation, index: pd.DatetimeIndex
+) -> tuple[_OffsetStep, pd.DatetimeIndex]:
+    """Plan an offset transformation for the input `index`, like `AddFromOffset.apply`/`MultiplyFromOffset.apply`."""
+    offsets = transformation.offsets
+    output_index, positions, operand = _plan_from_offset(
+        index, offsets.offset_minutes, offsets.offset_values, transformation._shift_minutes, transformation.fill_value
+    )
+    return _OffsetStep(transformation.operation, positions, len(output_index), operand), output_index
+
+
+@dataclass
+class _Kernel:
+    """A run of transformations that are applied to the values of a single time series as one NumPy array."""
+
+    transformations: list[Transformation] = field(default_factory=list)
+
+    def __call__(self, time_series: pd.Series) -> pd.Series:
+        if not _has_sorted_naive_index(time_series):
+            # Edge cases are left to the transformations themselves
+            for transformation in self.transformations:
+                time_series = transformation.apply((time_series,))
+            return time_series
+
+        # Index changes are planned first, only looking at the index
+        index, name = time_series.index, time_series.name
+        steps: list[Callable[[np.ndarray], np.ndarray]] = []
+        for transformation in self.transformations:
+            if isinstance(transformation, _OffsetTransformation):
+                step, index = _offset_step(transformation, index)
+                steps.append(step)
+                name = None  # Adding the (unnamed) offsets drops the name, like in pandas
+            else:
+                steps.append(transformation.apply_array)
+
+        values = time_series.to_numpy()
+        for step in steps:
+            values = step(values)
+        return pd.Series(values, index=index, name=name)
+
+
+@dataclass
+class CompiledTransformations:
+    """A chain of transformations, where consecutive fusable transformations run as one kernel.
+
+    Use `compile_transformations` to create one.
+    """
+
+    stages: list[Transformation | _Kernel]
+
+    def apply(self, time_series_data: tuple[pd.Series, ...]) -> pd.Series:
+        """Apply the transformations in sequence, like calling `apply` on each transformation with the previous output.
+
+        Args:
+            time_series_data: The input time series. All of them are passed to the first transformation, later
+                transformations only get the output of the previous one.
+
+        Returns:
+            The transformed time series
+        """
+        if not self.stages:
+            return time_series_data[0]
+        for stage in self.stages:
+            if isinstance(stage, _Kernel):
+                time_series = stage(time_series_data[0])
+            else:
+                time_series = stage.apply(time_series_data)
+            time_series_data = (time_series,)
+        return time_series
+
+
+def _is_fusable(transformation: Transformation) -> bool:
+    return transformation.is_elementwise or isinstance(transformation, _OffsetTransformation)
+
+
+def compile_transformations(transformations: Sequence[Transformation]) -> CompiledTransformations:
+    """Compile a chain of transformations into fused kernels.
+
+    Elementwise transformations (e.g. `MultiplyConstant`, `Round` and `ToInt`) and the offset transformations
+    (`AddFromOffset` and `MultiplyFromOffset`) are fused. Others, like `SumTimeseries` (combining several time series)
+    and `AddWaterInTransit` (resampling), run on their own.
+
+    Args:
+        transformations: The transformations of a mapping, in the order they are applied
+
+    Returns:
+        The compiled transformations, giving the same result as applying the transformations one by one
+
+    Example:
+        >>> from cognite.powerops.prerun_transformations.transformations import MultiplyConstant, Round, ToInt
+        >>> compiled = compile_transformations([MultiplyConstant(constant=1.5), Round(digits=0), ToInt()])
+        >>> compiled.apply((pd.Series([1.0, 2.0, 3.0], index=pd.date_range("2022-01-01", periods=3, freq="h")),))
+        2022-01-01 00:00:00    2
+        2022-01-01 01:00:00    3
+        2022-01-01 02:00:00    4
+        Freq: h, dtype: int64
+    """
+    stages: list[Transformation | _Kernel] = []
+    for transformation in transformations:
+        if not _is_fusable(transformation):
+            stages.append(transformation)
+            continue
+        # Fusable transformations only use the first input time series
+        if not stages or not isinstance(stages[-1], _Kernel):
+            stages.append(_Kernel())
+        kernel = stages[-1]
+        if isinstance(kernel, _Kernel):
+            kernel.transformations.append(transformation)
+    return CompiledTransformations(stages)
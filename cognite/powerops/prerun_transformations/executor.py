@@ -0,0 +1,127 @@
+"""Parallel application of the transformations of many attribute mappings.
+
+The transformation chains of different mappings are independent, so they can be applied concurrently. A thread pool
+suits most chains, as the NumPy kernels release the GIL. Chains dominated by pandas code (e.g. `AddWaterInTransit`)
+can use a process pool instead, in which case the transformations and time series are pickled to the workers.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Literal
+
+import pandas as pd
+
+from cognite.powerops.prerun_transformations.compiler import compile_transformations
+from cognite.powerops.prerun_transformations.plans import TransformationPlan
+from cognite.powerops.prerun_transformations.transformations import Transformation
+
+logger = getLogger(__name__)
+
+
+class TransformationError(Exception):
+    """Raised when the transformations of one or more mappings failed.
+
+    Args:
+        errors: The error of each failed mapping, by mapping id
+    """
+
+    def __init__(self, errors: dict[str, Exception]):
+        self.errors = errors
+        details = "\n".join(f"  {mapping_id}: {type(error).__name__}: {error}" for mapping_id, error in errors.items())
+        super().__init__(f"Transformations failed for {len(errors)} mapping(s):\n{details}")
+
+
+@dataclass
+class MappingResults:
+    """The outputs of the mappings that were transformed, and the errors of those that failed.
+
+    Both are ordered like the mappings given to `apply_transformations`.
+    """
+
+    outputs: dict[str, pd.Series] = field(default_factory=dict)
+    errors: dict[str, Exception] = field(default_factory=dict)
+
+    def raise_for_errors(self) -> None:
+        """Raise a `TransformationError` if the transformations of any mapping failed."""
+        if self.errors:
+            raise TransformationError(self.errors)
+
+
+def _apply(
+    transformations: TransformationPlan | Sequence[Transformation], time_series_data: tuple[pd.Series, ...]
+) -> pd.Series:
+    if isinstance(transformations, TransformationPlan):
+        return transformations.apply(time_series_data)
+    return compile_transformations(transformations).apply(time_series_data)
+
+
+def apply_transformations(
+    transformations: Mapping[str, TransformationPlan | Sequence[Transformation]],
+    inputs: Mapping[str, tuple[pd.Series, ...]],
+    executor: Literal["thread", "process"] | Executor = "thread",
+    max_workers: int | None = None,
+) -> MappingResults:
+    """Apply the transformations of many mappings concurrently.
+
+    Dynamic transformations must have run `pre_apply` before, e.g. with `pre_apply_transformations`.
+
+    Args:
+        transformations: The transformations (or plan) of each mapping, by mapping id
+        inputs: The input time series of each mapping, by mapping id
+        executor: "thread" or "process" for a new thread or process pool, or an existing executor to submit to
+        max_workers: The maximum number of workers of a new pool, defaults to the default of the pool
+
+    Returns:
+        The output of each mapping, and the error of each mapping that failed. A mapping without input is reported
+        as failed with a `KeyError`.
+
+    Example:
+        >>> from cognite.powerops.prerun_transformations.transformations import AddConstant, MultiplyConstant
+        >>> time_series = pd.Series([1.0, 2.0], index=pd.date_range("2022-01-01", periods=2, freq="h"))
+        >>> results = apply_transformations(
+        ...     {"double": [MultiplyConstant(constant=2)], "plus_one": [AddConstant(constant=1)]},
+        ...     {"double": (time_series,), "plus_one": (time_series,)},
+        ... )
+        >>> {mapping_id: output.tolist() for mapping_id, output in results.outputs.items()}
+        {'double': [2.0, 4.0], 'plus_one': [2.0, 3.0]}
+    """
+    if isinstance(executor, Executor):
+        pool, owns_pool = executor, False
+    elif executor == "thread":
+        pool, owns_pool = ThreadPoolExecutor(max_workers=max_workers), True
+    elif executor == "process":
+        pool, owns_pool = ProcessPoolExecutor(max_workers=max_workers), True
+    else:
+        raise ValueError(f"executor must be 'thread', 'process' or an Executor, got {executor!r}")
+
+    outcomes: dict[str, pd.Series | Exception] = {}
+    try:
+        futures = {}
+        for mapping_id, mapping_transformations in transformations.items():
+            if mapping_id not in inputs:
+                outcomes[mapping_id] = KeyError(f"Missing input time series for mapping {mapping_id}")
+                continue
+            futures[mapping_id] = pool.submit(_apply, mapping_transformations, inputs[mapping_id])
+        for mapping_id, future in futures.items():
+            if isinstance(error := future.exception(), Exception):
+                logger.warning(f"Transformations failed for mapping {mapping_id}: {type(error).__name__}: {error}")
+                outcomes[mapping_id] = error
+            else:
+                outcomes[mapping_id] = future.result()
+    finally:
+        if owns_pool:
+            pool.shutdown()
+
+    # Ordered like the given mappings, independent of the order the workers finish in
+    results = MappingResults()
+    for mapping_id in transformations:
+        outcome = outcomes[mapping_id]
+        if isinstance(outcome, Exception):
+            results.errors[mapping_id] = outcome
+        else:
+            results.outputs[mapping_id] = outcome
+    return results
@@ -0,0 +1,106 @@
+"""Memoization of transformation chains applied to identical inputs.
+
+The scenarios of a scenario set share most of their attribute mappings, so the same chain of transformations is often
+applied to the same input time series many times in one run. `TransformationMemo` computes each chain once per input
+and shares the result.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Hashable, Sequence
+from logging import getLogger
+
+import pandas as pd
+
+from cognite.powerops.prerun_transformations.compiler import compile_transformations
+from cognite.powerops.prerun_transformations.transformations import DynamicTransformation, Transformation
+from cognite.powerops.utils.cache import TTLCache
+
+logger = getLogger(__name__)
+
+
+def _fingerprint(time_series: pd.Series) -> Hashable:
+    """A hashable key identifying the index, values, dtype and name of a time series."""
+    digest = hashlib.blake2b(pd.util.hash_pandas_object(time_series, index=True).to_numpy().tobytes(), digest_size=16)
+    index = time_series.index
+    return (
+        digest.hexdigest(),
+        len(time_series),
+        str(time_series.dtype),
+        str(index.dtype),
+        getattr(index, "freqstr", None),
+        time_series.name,
+    )
+
+
+def _transformation_key(transformation: Transformation) -> Hashable:
+    """A hashable key identifying the class and parameters of a transformation."""
+    private = sorted((transformation.__pydantic_private__ or {}).items())
+    return (
+        type(transformation).__name__,
+        json.dumps(transformation.parameters_to_dict(), sort_keys=True),
+        repr(private),
+    )
+
+
+class TransformationMemo:
+    """A bounded LRU memo of transformation chains, keyed by a fingerprint of the inputs and the parameters.
+
+    Chains with a `DynamicTransformation` (e.g. `AddWaterInTransit` or `StaticValues`) depend on state set in
+    `pre_apply`, which is not part of their parameters, and are always computed.
+
+    Args:
+        maxsize: The maximum number of results to keep
+        ttl: Seconds a result is kept, None for no expiry
+
+    Example:
+        >>> from cognite.powerops.prerun_transformations.transformations import MultiplyConstant
+        >>> memo = TransformationMemo(maxsize=128)
+        >>> time_series = pd.Series([1.0, 2.0], index=pd.date_range("2022-01-01", periods=2, freq="h"))
+        >>> memo.apply([MultiplyConstant(constant=2)], (time_series,)).tolist()
+        [2.0, 4.0]
+        >>> memo.apply([MultiplyConstant(constant=2)], (time_series.copy(),)).tolist()  # Computed once
+        [2.0, 4.0]
+        >>> memo.hits, memo.misses
+        (1, 1)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self._cache: TTLCache[Hashable, pd.Series] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def apply(self, transformations: Sequence[Transformation], time_series_data: tuple[pd.Series, ...]) -> pd.Series:
+        """Apply a chain of transformations, like `compile_transformations(transformations).apply(time_series_data)`.
+
+        Args:
+            transformations: The transformations of a mapping, in the order they are applied
+            time_series_data: The input time series
+
+        Returns:
+            The transformed time series. This is a copy, so it can be modified without changing the memoized result.
+        """
+        if any(isinstance(transformation, DynamicTransformation) for transformation in transformations):
+            return compile_transformations(transformations).apply(time_series_data)
+
+        key = (
+            tuple(_fingerprint(time_series) for time_series in time_series_data),
+            tuple(_transformation_key(transformation) for transformation in transformations),
+        )
+        if (result := self._cache.get(key)) is None:
+            self.misses += 1
+            result = compile_transformations(transformations).apply(time_series_data)
+            self._cache.set(key, result.copy())
+        else:
+            self.hits += 1
+            logger.debug(f"Reusing memoized result of {len(transformations)} transformation(s)")
+        return result.copy()
+
+    def invalidate(self) -> None:
+        """Remove all memoized results."""
+        self._cache.invalidate()
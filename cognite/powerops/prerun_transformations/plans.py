@@ -0,0 +1,102 @@
+"""Cached, ready-to-run transformation plans for SHOP attribute mappings.
+
+The transformations of a `ShopAttributeMapping` are stored as dicts in the data model, and loading them runs pydantic
+validation and a class lookup for every transformation. Mappings rarely change, so `TransformationPlanCache` keeps the
+loaded and compiled transformations of each mapping version, keyed by the mapping and its `lastUpdatedTime`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from cognite.powerops.client._generated.data_classes import ShopAttributeMapping
+from cognite.powerops.prerun_transformations.compiler import CompiledTransformations, compile_transformations
+from cognite.powerops.prerun_transformations.transformations import DynamicTransformation, Transformation
+from cognite.powerops.utils.cache import TTLCache
+
+
+@dataclass
+class TransformationPlan:
+    """The loaded transformations of a mapping, compiled to run in sequence.
+
+    Args:
+        transformations: The transformations, in the order they are applied
+    """
+
+    transformations: list[Transformation]
+    compiled: CompiledTransformations = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.compiled = compile_transformations(self.transformations)
+
+    @property
+    def dynamic_transformations(self) -> list[DynamicTransformation]:
+        """The transformations that need `pre_apply` before the plan is applied."""
+        return [
+            transformation
+            for transformation in self.transformations
+            if isinstance(transformation, DynamicTransformation)
+        ]
+
+    def apply(self, time_series_data: tuple[pd.Series, ...]) -> pd.Series:
+        return self.compiled.apply(time_series_data)
+
+
+def load_transformations(transformations: Iterable[dict] | None) -> list[Transformation]:
+    """Load the transformation dicts of a mapping, e.g. `[{"MultiplyConstant": {"parameters": {"constant": 2}}}]`."""
+    return [Transformation.load(transformation) for transformation in transformations or []]
+
+
+class TransformationPlanCache:
+    """Cache of loaded transformations per mapping version.
+
+    Entries are keyed by the space, external id and `lastUpdatedTime` of the mapping, so an updated mapping is loaded
+    again. Static transformations are shared between the plans of a mapping, while dynamic transformations, which
+    keep the state set in `pre_apply`, are copied for every plan.
+
+    Args:
+        maxsize: The maximum number of mapping versions to keep
+
+    Example:
+        ```python
+        plans = transformation_plan_cache.get_many(
+            client.powermodel.day_ahead_bid.shop_attribute_mapping.list(limit=-1)
+        )
+        for mapping_id, plan in plans.items():
+            pre_apply_transformations(client, plan.dynamic_transformations, shop_model, start, end)
+            output = plan.apply((input_time_series[mapping_id],))
+        ```
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self._cache: TTLCache[Hashable, tuple[Transformation, ...]] = TTLCache(maxsize=maxsize, ttl=None)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, mapping: ShopAttributeMapping) -> TransformationPlan:
+        """The plan for the transformations of a mapping, only loading them if this version is not cached."""
+        key = (mapping.space, mapping.external_id, mapping.data_record.last_updated_time)
+        if (transformations := self._cache.get(key)) is None:
+            transformations = tuple(load_transformations(mapping.transformations))
+            self._cache.set(key, transformations)
+        return TransformationPlan(
+            [
+                transformation.model_copy() if isinstance(transformation, DynamicTransformation) else transformation
+                for transformation in transformations
+            ]
+        )
+
+    def get_many(self, mappings: Iterable[ShopAttributeMapping]) -> dict[str, TransformationPlan]:
+        """The plans for many mappings, by the external id of the mapping."""
+        return {mapping.external_id: self.get(mapping) for mapping in mappings}
+
+    def invalidate(self) -> None:
+        """Remove all cached plans."""
+        self._cache.invalidate()
+
+
+transformation_plan_cache = TransformationPlanCache()
@@ -0,0 +1,75 @@
+"""Scenario-level pre-apply phase for the dynamic prerun transformations.
+
+Instead of letting every `DynamicTransformation` retrieve its own datapoints in `pre_apply`, the datapoints needed by
+all transformations of a scenario are collected first and retrieved in one batch per end time and resolution.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from logging import getLogger
+
+import pandas as pd
+from cognite.client import CogniteClient
+
+from cognite.powerops.prerun_transformations.transformations import (
+    DynamicTransformation,
+    Transformation,
+    ms_to_datetime_tz_naive,
+)
+from cognite.powerops.utils.retrieve import retrieve_range
+
+logger = getLogger(__name__)
+
+
+def pre_apply_transformations(
+    client: CogniteClient, transformations: Iterable[Transformation], shop_model: dict, start: int, end: int
+) -> None:
+    """Run `pre_apply` for all dynamic transformations, retrieving the datapoints they need in batches.
+
+    The datapoints requests of the transformations (see `DynamicTransformation.datapoints_request`) are grouped by
+    end time and resolution. Each group is retrieved with a single `retrieve_range` call from the earliest start in
+    the group, and each transformation gets the part of its time series from its own start.
+
+    Args:
+        client: CogniteClient authenticated to the project to retrieve datapoints from
+        transformations: The transformations of all mappings of a scenario. Non-dynamic transformations are ignored
+        shop_model: SHOP model dict
+        start: SHOP start time in milliseconds since epoch
+        end: SHOP end time in milliseconds since epoch
+    """
+    dynamic = [
+        transformation for transformation in transformations if isinstance(transformation, DynamicTransformation)
+    ]
+    requests = {
+        id(transformation): transformation.datapoints_request(shop_model, start, end) for transformation in dynamic
+    }
+
+    requests_by_end: dict[tuple[int, str], list[tuple[str, int]]] = defaultdict(list)
+    for request in requests.values():
+        if request is not None:
+            external_id, request_start, request_end, resolution = request
+            requests_by_end[(request_end, resolution)].append((external_id, request_start))
+
+    datapoints_by_end: dict[tuple[int, str], dict[str, pd.Series]] = {}
+    for (request_end, resolution), external_ids_and_starts in requests_by_end.items():
+        external_ids = list(dict.fromkeys(external_id for external_id, _ in external_ids_and_starts))
+        earliest_start = min(request_start for _, request_start in external_ids_and_starts)
+        logger.debug(f"Retrieving datapoints for {len(external_ids_and_starts)} dynamic transformations in one batch")
+        datapoints_by_end[(request_end, resolution)] = retrieve_range(
+            client, external_ids, start=earliest_start, end=request_end, resolution=resolution
+        )
+
+    for transformation in dynamic:
+        if (request := requests[id(transformation)]) is None:
+            transformation.pre_apply(client=client, shop_model=shop_model, start=start, end=end)
+            continue
+        external_id, request_start, request_end, resolution = request
+        datapoints = datapoints_by_end[(request_end, resolution)].get(
+            external_id, pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+        )
+        datapoints = datapoints[datapoints.index >= ms_to_datetime_tz_naive(request_start)]
+        transformation.pre_apply(  # type: ignore[call-arg]
+            client=client, shop_model=shop_model, start=start, end=end, datapoints=datapoints.copy()
+        )
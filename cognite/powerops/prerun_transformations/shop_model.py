@@ -0,0 +1,133 @@
+"""Parsed SHOP model files shared by the dynamic prerun transformations.
+
+`HeightToVolume` and `AddWaterInTransit` read tables from the SHOP model in `pre_apply`. Instead of parsing the model
+file for every use, `ShopModelCache` parses each version of a file once, with the C YAML loader when available, and
+pre-extracts the tables as NumPy arrays.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Hashable
+from logging import getLogger
+
+import numpy as np
+import yaml
+from cognite.client import CogniteClient
+from cognite.client.data_classes import FileMetadata
+
+from cognite.powerops.utils.cache import TTLCache
+from cognite.powerops.utils.require import require
+
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _SafeLoader  # type: ignore[assignment]
+
+logger = getLogger(__name__)
+
+
+class ParsedShopModel(dict):
+    """The `model` section of a SHOP model file, with the tables used by the dynamic transformations as NumPy arrays.
+
+    It is a dict of object type to object name to attributes, so it can be passed as `shop_model` to `pre_apply` of
+    any dynamic transformation. It is shared between transformations and should not be modified.
+
+    Args:
+        model: The `model` section of a SHOP model file
+
+    Example:
+        >>> model = ParsedShopModel({"reservoir": {"Dale": {"vol_head": {"x": [0, 10], "y": [900, 1000]}}}})
+        >>> model.vol_heads["reservoir", "Dale"]
+        (array([ 0., 10.]), array([ 900., 1000.]))
+        >>> model["reservoir"]["Dale"]["vol_head"]["x"]
+        [0, 10]
+    """
+
+    def __init__(self, model: dict):
+        super().__init__(model)
+        # (object type, object name) -> (volumes, heights)
+        self.vol_heads: dict[tuple[str, str], tuple[np.ndarray, np.ndarray]] = {}
+        # (object type, object name) -> (delays in minutes, share of the discharge arriving after each delay)
+        self.delay_shapes: dict[tuple[str, str], tuple[np.ndarray, np.ndarray]] = {}
+        for object_type, objects in self.items():
+            if not isinstance(objects, dict):
+                continue
+            for object_name, attributes in objects.items():
+                if not isinstance(attributes, dict):
+                    continue
+                key = (object_type, object_name)
+                if "vol_head" in attributes:
+                    vol_head = attributes["vol_head"]
+                    self.vol_heads[key] = (
+                        np.asarray(vol_head["x"], dtype=float),
+                        np.asarray(vol_head["y"], dtype=float),
+                    )
+                if "shape_discharge" in attributes:
+                    shape = attributes["shape_discharge"]
+                    self.delay_shapes[key] = (np.asarray(shape["x"]), np.asarray(shape["y"]))
+                elif "time_delay" in attributes:
+                    self.delay_shapes[key] = (np.asarray([attributes["time_delay"]]), np.asarray([1]))
+
+    @classmethod
+    def parse(cls, content: str | bytes) -> ParsedShopModel:
+        """Parse a SHOP model file, using the `model` section if there is one."""
+        document = yaml.load(content, Loader=_SafeLoader) or {}
+        return cls(document.get("model", document))
+
+
+class ShopModelCache:
+    """Cache of parsed SHOP model files, keyed by CDF project, file id and `lastUpdatedTime`.
+
+    Args:
+        maxsize: The maximum number of parsed model files to keep
+
+    Example:
+        ```python
+        shop_model = shop_model_cache.retrieve(client, model.model)
+        pre_apply_transformations(client, transformations, shop_model, start, end)
+        ```
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self._cache: TTLCache[Hashable, ParsedShopModel] = TTLCache(maxsize=maxsize, ttl=None)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def retrieve(self, client: CogniteClient, file: FileMetadata | int | str) -> ParsedShopModel:
+        """The parsed SHOP model file, only downloading and parsing it if this version is not cached.
+
+        Args:
+            client: CogniteClient authenticated to the project of the file
+            file: The file metadata (e.g. `ShopModel.model`), or the id or external id of the file
+
+        Returns:
+            The parsed model
+        """
+        if not isinstance(file, FileMetadata) or file.id is None or file.last_updated_time is None:
+            # The last updated time is needed to know if the cached version is current
+            if isinstance(file, FileMetadata):
+                file = file.id if file.id is not None else require(file.external_id)
+            retrieved = (
+                client.files.retrieve(id=file) if isinstance(file, int) else client.files.retrieve(external_id=file)
+            )
+            if retrieved is None:
+                raise ValueError(f"SHOP model file {file} does not exist")
+            file = retrieved
+
+        key = (client.config.project, file.id, file.last_updated_time)
+        with self._lock:
+            if (model := self._cache.get(key)) is None:
+                logger.debug(f"Parsing SHOP model file {file.external_id or file.id}")
+                model = ParsedShopModel.parse(client.files.download_bytes(id=require(file.id)))
+                self._cache.set(key, model)
+        return model
+
+    def invalidate(self) -> None:
+        """Remove all parsed model files."""
+        self._cache.invalidate()
+
+
+shop_model_cache = ShopModelCache()
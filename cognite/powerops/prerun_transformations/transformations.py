@@ -1,9 +1,11 @@
 import inspect
 import sys
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from logging import getLogger
-from typing import Any, Literal
+from typing import Any, ClassVar, Literal
 
 import arrow
 import numpy as np
@@ -12,6 +14,8 @@ from cognite.client import CogniteClient
 from pydantic import BaseModel
 from typing_extensions import Self
 
+from cognite.powerops.prerun_transformations.shop_model import ParsedShopModel
+from cognite.powerops.utils.cache import TTLCache
 from cognite.powerops.utils.retrieve import retrieve_range
 
 logger = getLogger(__name__)
@@ -39,6 +43,77 @@ class RelativeDatapoint(BaseModel):
     offset_value: float
 
 
+@dataclass(frozen=True)
+class RelativeDatapointArrays:
+    """Relative datapoints as two NumPy arrays, used when applying `StaticValues`, `AddFromOffset` and
+    `MultiplyFromOffset`.
+
+    Args:
+        offset_minutes: Whole minutes from the start time, truncated like when relative datapoints are applied
+        offset_values: The values to apply from each offset minute
+
+    Example:
+        >>> offsets = RelativeDatapointArrays.from_fdm_parameters({"0": "1.5", "1440": "-2.0"})
+        >>> offsets.offset_minutes, offsets.offset_values
+        (array([   0, 1440]), array([ 1.5, -2. ]))
+        >>> offsets.to_fdm_parameters()
+        {'0': '1.5', '1440': '-2.0'}
+    """
+
+    offset_minutes: np.ndarray
+    offset_values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offset_minutes)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RelativeDatapointArrays):
+            return NotImplemented
+        return np.array_equal(self.offset_minutes, other.offset_minutes) and np.array_equal(
+            self.offset_values, other.offset_values
+        )
+
+    @classmethod
+    def from_relative_datapoints(cls, relative_datapoints: list[RelativeDatapoint]) -> Self:
+        return cls(
+            np.array([int(dp.offset_minute) for dp in relative_datapoints], dtype=np.int64),
+            np.array([dp.offset_value for dp in relative_datapoints], dtype=float),
+        )
+
+    @classmethod
+    def from_fdm_parameters(cls, parameters: dict) -> Self:
+        """From the parameters stored in the data model, offset minutes to offset values."""
+        return cls(
+            np.array([int(float(minute)) for minute in parameters], dtype=np.int64),
+            np.array([float(value) for value in parameters.values()], dtype=float),
+        )
+
+    def to_fdm_parameters(self) -> dict[str, str]:
+        """To the parameters stored in the data model, see `Transformation.parameters_to_dict`."""
+        return {
+            f"{minute}": f"{value}"
+            for minute, value in zip(self.offset_minutes.tolist(), self.offset_values.tolist(), strict=True)
+        }
+
+    def to_relative_datapoints(self) -> list[RelativeDatapoint]:
+        return [
+            RelativeDatapoint.model_construct(offset_minute=float(minute), offset_value=value)
+            for minute, value in zip(self.offset_minutes.tolist(), self.offset_values.tolist(), strict=True)
+        ]
+
+    def to_series(self, start_time: datetime, shift_minutes: int = 0) -> pd.Series:
+        """The values at `start_time` plus the offset minutes, see `_relative_datapoints_to_series`."""
+        if start_time.tzinfo is not None:
+            index = pd.DatetimeIndex(
+                [start_time + timedelta(minutes=minute + shift_minutes) for minute in self.offset_minutes.tolist()]
+            )
+        else:
+            index = pd.DatetimeIndex(
+                np.datetime64(start_time, "ns") + (self.offset_minutes + shift_minutes).astype("m8[m]")
+            )
+        return pd.Series(self.offset_values, index=index)
+
+
 def _relative_datapoints_to_series(
     relative_datapoints: list[RelativeDatapoint], start_time: datetime, shift_minutes: int = 0
 ) -> pd.Series:
@@ -57,14 +132,172 @@ def _relative_datapoints_to_series(
         2000-01-02 12:00:00    4200.0
         dtype: float64
     """
-    datapoint_values = [dp.offset_value for dp in relative_datapoints]  # consider creating class method for this
-    return pd.Series(
-        datapoint_values,
-        index=[start_time + timedelta(minutes=int(dp.offset_minute) + shift_minutes) for dp in relative_datapoints],
+    return RelativeDatapointArrays.from_relative_datapoints(relative_datapoints).to_series(start_time, shift_minutes)
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """Forward fill NaN values along the last axis, like `Series.ffill`.
+
+    Example:
+        >>> _ffill(np.array([np.nan, 1.0, np.nan, 3.0, np.nan]))
+        array([nan,  1.,  1.,  3.,  3.])
+    """
+    if values.dtype.kind != "f" or values.shape[-1] == 0:
+        return values
+    positions = np.where(np.isnan(values), 0, np.arange(values.shape[-1]))
+    return np.take_along_axis(values, np.maximum.accumulate(positions, axis=-1), axis=-1)
+
+
+def _step_values(
+    timestamps: np.ndarray, offset_timestamps: np.ndarray, offset_values: np.ndarray, fill_value: float
+) -> np.ndarray:
+    """Evaluate the piecewise-constant functions stepping to `offset_values` at `offset_timestamps`, at `timestamps`.
+
+    Each function is `fill_value` before its first offset, like `offsets.reindex(timestamps).ffill().fillna(fill_value)`
+    for the offsets as a series. Many offset vectors for the same offset timestamps are broadcast at once, given
+    `offset_values` of shape (..., K) the result has shape (..., T).
+
+    Example:
+        >>> offset_values = np.array([[1.0, 2.0], [3.0, 4.0]])
+        >>> _step_values(np.array([0, 5, 10, 15]), np.array([5, 12]), offset_values, fill_value=0.0)
+        array([[0., 1., 1., 2.],
+               [0., 3., 3., 4.]])
+    """
+    offset_values = np.asarray(offset_values, dtype=float)
+    if len(offset_timestamps) == 0:
+        return np.full((*offset_values.shape[:-1], len(timestamps)), fill_value)
+    order = np.argsort(offset_timestamps, kind="stable")
+    sorted_timestamps = offset_timestamps[order]
+    if (np.diff(sorted_timestamps) == 0).any():
+        raise ValueError("Relative datapoints must have unique offset minutes")
+    sorted_values = _ffill(offset_values[..., order])
+    positions = np.searchsorted(sorted_timestamps, timestamps, side="right") - 1
+    stepped = sorted_values[..., np.maximum(positions, 0)]
+    stepped[..., positions < 0] = fill_value
+    return np.where(np.isnan(stepped), fill_value, stepped)
+
+
+def _has_sorted_naive_index(time_series: pd.Series) -> bool:
+    """Whether the time series has a non-empty, sorted and unique time zone naive `DatetimeIndex`."""
+    index = time_series.index
+    return (
+        isinstance(index, pd.DatetimeIndex)
+        and index.tz is None
+        and len(index) > 0
+        and index.is_monotonic_increasing
+        and index.is_unique
     )
 
 
+def _plan_from_offset(
+    index: pd.DatetimeIndex,
+    offset_minutes: np.ndarray,
+    offset_values: np.ndarray,
+    shift_minutes: int,
+    fill_value: float,
+) -> tuple[pd.DatetimeIndex, np.ndarray | None, np.ndarray]:
+    """Plan applying relative datapoints to a time series, see `_has_sorted_naive_index` for the supported indexes.
+
+    The offset timestamps are mapped onto the input timestamps with `searchsorted`, instead of reindexing on the union
+    of both indexes.
+
+    Args:
+        index: The index of the input time series
+        offset_minutes: Minutes from the first timestamp of `index`, as integers, of the relative datapoints
+        offset_values: The values of the relative datapoints, with shape (..., K) for many offset vectors
+        shift_minutes: Minutes to shift all offsets with
+        fill_value: The operand before the first offset
+
+    Returns:
+        The output index (in nanoseconds, like the union with the offsets), the positions of the input timestamps in
+        the output index (None if the timestamps are unchanged) and the operand for each output timestamp with shape
+        (..., T)
+    """
+    index = index.as_unit("ns")
+    timestamps = index.asi8
+    offset_timestamps = timestamps[0] + (np.asarray(offset_minutes, dtype=np.int64) + shift_minutes) * 60_000_000_000
+    output_timestamps = np.union1d(timestamps, offset_timestamps)
+    positions = None
+    if len(output_timestamps) != len(timestamps):
+        positions = np.searchsorted(output_timestamps, timestamps)
+    if positions is not None or len(offset_timestamps) != len(timestamps):
+        # The union of two different indexes infers the frequency
+        index = pd.DatetimeIndex(output_timestamps.view("M8[ns]"), freq="infer")
+    return index, positions, _step_values(output_timestamps, offset_timestamps, offset_values, fill_value)
+
+
+def _apply_from_offset(
+    time_series: pd.Series,
+    offsets: RelativeDatapointArrays,
+    shift_minutes: int,
+    operation: np.ufunc,
+    fill_value: float,
+) -> pd.Series:
+    """Apply `operation` to a time series and relative datapoints, as done by `AddFromOffset`/`MultiplyFromOffset`.
+
+    If a timestamp of the relative datapoints does not exist in the time series, it is added with a forward filled
+    value.
+    """
+    index = time_series.index
+    if not _has_sorted_naive_index(time_series) or time_series.dtype.kind not in "iuf":
+        # Edge cases are left to pandas
+        offset_series = offsets.to_series(min(index), shift_minutes)
+        union_index = index.union(offset_series.index)
+        offset_series = offset_series.reindex(union_index).ffill().fillna(fill_value)
+        return operation(time_series.reindex(union_index).ffill(), offset_series)
+
+    output_index, positions, operand = _plan_from_offset(
+        index, offsets.offset_minutes, offsets.offset_values, shift_minutes, fill_value
+    )
+    values = time_series.to_numpy()
+    if positions is not None:
+        reindexed = np.full(len(output_index), np.nan)
+        reindexed[positions] = values
+        values = reindexed
+    return pd.Series(operation(_ffill(values), operand), index=output_index)
+
+
+def _apply_many_from_offset(
+    time_series: pd.Series,
+    transformations: Sequence["AddFromOffset | MultiplyFromOffset"],
+    operation: np.ufunc,
+    fill_value: float,
+) -> tuple[pd.DatetimeIndex, np.ndarray]:
+    """Apply many sets of relative datapoints to the same time series in one pass, see `Transformation.apply_many`.
+
+    Every set is evaluated at the offsets of all sets, so they share the offset timestamps and are broadcast as one
+    (N, K) matrix.
+    """
+    offset_minutes = [
+        transformation.offsets.offset_minutes + transformation._shift_minutes for transformation in transformations
+    ]
+    all_offset_minutes = np.unique(np.concatenate(offset_minutes))
+    offset_values = np.stack(
+        [
+            _step_values(
+                all_offset_minutes,
+                minutes,
+                transformation.offsets.offset_values,
+                fill_value,
+            )
+            for minutes, transformation in zip(offset_minutes, transformations, strict=False)
+        ]
+    )
+    output_index, positions, operand = _plan_from_offset(
+        time_series.index, all_offset_minutes, offset_values, 0, fill_value
+    )
+    values = time_series.to_numpy()
+    if positions is not None:
+        reindexed = np.full(len(output_index), np.nan)
+        reindexed[positions] = values
+        values = reindexed
+    return output_index, operation(_ffill(values), operand)
+
+
 class Transformation(BaseModel, ABC):
+    # Elementwise transformations keep the index and implement `apply_array`, so they can be fused into one kernel
+    is_elementwise: ClassVar[bool] = False
+
     @property
     def name(self):
         return self.__repr_name__()
@@ -88,21 +321,67 @@ class Transformation(BaseModel, ABC):
     @classmethod
     def load_from_fdm(cls, transformation_type: str, transformation_parameters: dict) -> Self:
         if transformation_type in _TRANSFORMATIONS_RELATIVE_DATAPOINTS:
-            transformation_parameters = {
-                "relative_datapoints": [
-                    {"offset_minute": m, "offset_value": v} for m, v in transformation_parameters.items()
-                ]
-            }
+            return _TRANSFORMATIONS_BY_CLASS_NAME[transformation_type].from_offsets(
+                RelativeDatapointArrays.from_fdm_parameters(transformation_parameters)
+            )
         return cls.load({transformation_type: {"parameters": transformation_parameters}})
 
     @abstractmethod
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series: ...
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        """Apply the transformation to the values of a single time series, for elementwise transformations."""
+        raise NotImplementedError(f"{self.name} is not an elementwise transformation")
+
+    @classmethod
+    def apply_many(
+        cls, time_series_data: tuple[pd.Series, ...], transformations: Sequence[Self]
+    ) -> tuple[pd.Index, np.ndarray]:
+        """Apply many parameter sets of this transformation to the same input, e.g. one per scenario.
+
+        Transformations with a vectorized implementation (elementwise transformations, `AddFromOffset` and
+        `MultiplyFromOffset`) compute all parameter sets in one pass, the others call `apply` once per parameter set.
+
+        Args:
+            time_series_data: The input time series, like for `apply`
+            transformations: N transformations of this class, with different parameters
+
+        Returns:
+            The shared time axis of length T, the union of the output timestamps, and an (N, T) array with the output
+            of `apply` for each transformation, forward filled onto the shared time axis
+
+        Example:
+            >>> index = pd.date_range("2022-01-01", periods=3, freq="h")
+            >>> scenarios = [MultiplyConstant(constant=constant) for constant in (1, 2)]
+            >>> MultiplyConstant.apply_many((pd.Series([1.0, 2.0, 3.0], index=index),), scenarios)[1]
+            array([[1., 2., 3.],
+                   [2., 4., 6.]])
+        """
+        if cls.is_elementwise:
+            time_series = time_series_data[0]
+            values = time_series.to_numpy()
+            matrix = np.stack([transformation.apply_array(values) for transformation in transformations])
+            return time_series.index, matrix.reshape(len(transformations), len(values))
+        outputs = [transformation.apply(time_series_data) for transformation in transformations]
+        if not outputs:
+            return time_series_data[0].index, np.empty((0, len(time_series_data[0])))
+        frame = pd.concat(outputs, axis=1, ignore_index=True).sort_index().ffill()
+        return frame.index, frame.to_numpy().T
+
 
 class DynamicTransformation(Transformation):
     @abstractmethod
     def pre_apply(self, client: CogniteClient, shop_model: dict, start: int, end: int): ...
 
+    def datapoints_request(self, shop_model: dict, start: int, end: int) -> tuple[str, int, int, str] | None:
+        """The datapoints `pre_apply` retrieves, as (external id, start, end, resolution), or None if it does not
+        retrieve any.
+
+        Used to retrieve the datapoints of many transformations in one batch, see `pre_apply_transformations`.
+        Transformations returning a request must accept the retrieved datapoints as `pre_apply(..., datapoints=...)`.
+        """
+        return None
+
 
 class AddConstant(Transformation):
     """
@@ -110,6 +389,8 @@ class AddConstant(Transformation):
         constant: The value to add to the time series data
     """
 
+    is_elementwise: ClassVar[bool] = True
+
     constant: float
 
     def parameters_to_dict(self) -> dict:
@@ -128,6 +409,9 @@ class AddConstant(Transformation):
         single_ts = time_series_data[0]
         return single_ts + self.constant
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        return values + self.constant
+
 
 class Round(Transformation):
     """
@@ -135,6 +419,7 @@ class Round(Transformation):
         digits: The number of decimal places to round to
     """
 
+    is_elementwise: ClassVar[bool] = True
     digits: int
 
     def parameters_to_dict(self) -> dict:
@@ -154,6 +439,9 @@ class Round(Transformation):
         single_ts = time_series_data[0]
         return single_ts.round(decimals=self.digits)
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        return np.round(values, decimals=self.digits)
+
 
 class SumTimeseries(Transformation):
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
@@ -223,6 +511,7 @@ class MultiplyConstant(Transformation):
         constant: The value to multiply the time series data with
     """
 
+    is_elementwise: ClassVar[bool] = True
     constant: float
 
     def parameters_to_dict(self) -> dict:
@@ -242,22 +531,64 @@ class MultiplyConstant(Transformation):
         single_ts = time_series_data[0]
         return single_ts * self.constant
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        return values * self.constant
+
+
+class _RelativeDatapointsMixin(BaseModel):
+    """The relative datapoints of `StaticValues`, `AddFromOffset` and `MultiplyFromOffset`, also as arrays.
+
+    The arrays are cached by the contents of `relative_datapoints`, so they are only built again when the datapoints
+    change.
+
+    Example:
+        >>> transformation = AddFromOffset(relative_datapoints=[RelativeDatapoint(offset_minute=0, offset_value=1)])
+        >>> transformation.relative_datapoints.append(RelativeDatapoint(offset_minute=60, offset_value=100))
+        >>> transformation.parameters_to_dict()
+        {'0': '1.0', '60': '100.0'}
+        >>> AddFromOffset.from_offsets(transformation.offsets) == transformation
+        True
+    """
+
+    relative_datapoints: list[RelativeDatapoint]
+
+    @property
+    def offsets(self) -> RelativeDatapointArrays:
+        key = tuple((dp.offset_minute, dp.offset_value) for dp in self.relative_datapoints)
+        if (offsets := _offsets_by_relative_datapoints.get(key)) is None:
+            offsets = RelativeDatapointArrays.from_relative_datapoints(self.relative_datapoints)
+            # Shared by all transformations with the same datapoints
+            offsets.offset_minutes.setflags(write=False)
+            offsets.offset_values.setflags(write=False)
+            _offsets_by_relative_datapoints.set(key, offsets)
+        return offsets
+
+    @classmethod
+    def from_offsets(cls, offsets: RelativeDatapointArrays) -> Self:
+        """Create the transformation from relative datapoints as arrays, without validating each datapoint."""
+        return cls(relative_datapoints=offsets.to_relative_datapoints())
+
+    def parameters_to_dict(self) -> dict:
+        return self.offsets.to_fdm_parameters()
+
 
-class StaticValues(DynamicTransformation):
+# The relative datapoints as arrays, by the offset minutes and values of the datapoints
+_offsets_by_relative_datapoints: TTLCache[tuple[tuple[float, float], ...], RelativeDatapointArrays] = TTLCache(
+    maxsize=1024
+)
+
+
+class StaticValues(_RelativeDatapointsMixin, DynamicTransformation):
     """Provides a list of static values from SHOP start time.
 
     Args:
         relative_datapoints: The relative datapoints to apply to
     """
 
-    relative_datapoints: list[RelativeDatapoint]
     _shift_minutes: int = 0  # This could be given at runtime - looks like default value of 0 is always used for now
     _pre_apply_has_run: bool = False
     _start: datetime
 
-    def parameters_to_dict(self) -> dict:
-        return {f"{int(r_point.offset_minute)}": f"{r_point.offset_value}" for r_point in self.relative_datapoints}
-
     @property
     def start(self):
         return self._start
@@ -327,7 +658,7 @@ class StaticValues(DynamicTransformation):
         """
         if not self.pre_apply_has_run:
             raise ValueError("pre_apply function has not run - missing necessary properties to run transformation")
-        return _relative_datapoints_to_series(self.relative_datapoints, self.start, self._shift_minutes)
+        return self.offsets.to_series(self.start, self._shift_minutes)
 
 
 class ToBool(Transformation):
@@ -335,6 +666,8 @@ class ToBool(Transformation):
     "Greater than 0" transformation of time series data to a series of 0s and 1s. 1s if the value is > 0.
     """
 
+    is_elementwise: ClassVar[bool] = True
+
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         """
         Args:
@@ -364,12 +697,17 @@ class ToBool(Transformation):
         single_ts = time_series_data[0]
         return (single_ts > 0).astype("int64")
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        return (values > 0).astype("int64")
+
 
 class ToInt(Transformation):
     """
     Transformation to round all values in a time series to get an Int using the "round half to even" method
     """
 
+    is_elementwise: ClassVar[bool] = True
+
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         """
         Args:
@@ -383,12 +721,22 @@ class ToInt(Transformation):
         single_ts = time_series_data[0]
         return single_ts.apply(round)
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        if values.dtype.kind in "iub":
+            return values.astype("int64")
+        if np.isnan(values).any():
+            raise ValueError("cannot convert float NaN to integer")
+        # np.rint rounds half to even, like the built-in round
+        return np.rint(values).astype("int64")
+
 
 class ZeroIfNotOne(Transformation):
     """
     Transforms time series data to a series of 0s and 1s. 1s if the value is exactly 1.
     """
 
+    is_elementwise: ClassVar[bool] = True
+
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         """
         Args:
@@ -418,12 +766,17 @@ class ZeroIfNotOne(Transformation):
         single_ts = time_series_data[0]
         return (single_ts == 1).astype("int64")
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        return (values == 1).astype("int64")
+
 
 class OneIfTwo(Transformation):
     """
     Transforms time series data to a series of 0s and 1s. 1s if the value is exactly 2.
     """
 
+    is_elementwise: ClassVar[bool] = True
+
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         """
         Args:
@@ -453,17 +806,22 @@ class OneIfTwo(Transformation):
         single_ts = time_series_data[0]
         return (single_ts == 2).astype("int64")
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        return (values == 2).astype("int64")
+
 
 class HeightToVolume(DynamicTransformation):
     """
     TODO
     """
 
+    is_elementwise: ClassVar[bool] = True
     object_type: str
     object_name: str
     _pre_apply_has_run: bool = False
     _volumes: list[float]
     _heights: list[float]
+    _height_bounds: tuple[float, float]
 
     @property
     def volumes(self):
@@ -493,14 +851,42 @@ class HeightToVolume(DynamicTransformation):
         return {"object_type": self.object_type, "object_name": self.object_name}
 
     @staticmethod
-    def height_to_volume(time_series_data: pd.Series, heights: list[float], volumes: list[float]) -> pd.Series:
-        def interpolate(height: float) -> float:
-            """Height to volume"""
-            if height < min(heights) or max(heights) < height:
-                logger.warning(f"Outside interpolation bounds [{min(heights)}, {max(heights)}]. Got {height}.")
-            return float(np.interp(height, heights, volumes))
+    def height_to_volume_array(
+        values: np.ndarray,
+        heights: list[float],
+        volumes: list[float],
+        bounds: tuple[float, float] | None = None,
+    ) -> np.ndarray:
+        """Interpolate volumes for an array of heights, holding the end volumes outside the interpolation bounds.
+
+        Heights outside the bounds (by default the min and max of `heights`) are reported in a single warning.
+
+        Example:
+            >>> HeightToVolume.height_to_volume_array(np.array([3.0, 5.0]), heights=[2, 4, 6], volumes=[10, 20, 40])
+            array([15., 30.])
+        """
+        values = np.asarray(values, dtype=float)
+        lower, upper = bounds if bounds is not None else (min(heights), max(heights))
+        outside = (values < lower) | (upper < values)
+        if n_outside := int(np.count_nonzero(outside)):
+            logger.warning(
+                f"Outside interpolation bounds [{lower}, {upper}]. Got {n_outside} value(s) outside, "
+                f"ranging from {values[outside].min()} to {values[outside].max()}."
+            )
+        return np.interp(values, heights, volumes)
 
-        return time_series_data.map(interpolate)
+    @staticmethod
+    def height_to_volume(
+        time_series_data: pd.Series,
+        heights: list[float],
+        volumes: list[float],
+        bounds: tuple[float, float] | None = None,
+    ) -> pd.Series:
+        return pd.Series(
+            HeightToVolume.height_to_volume_array(time_series_data.to_numpy(), heights, volumes, bounds),
+            index=time_series_data.index,
+            name=time_series_data.name,
+        )
 
     def pre_apply(self, client: CogniteClient, shop_model: dict, start: int, end: int):
         """Preprocessing step that needs to run before `apply()` to set the volumes and heights from shop case file.
@@ -525,8 +911,12 @@ class HeightToVolume(DynamicTransformation):
         Out[4]: [10, 20, 40, 80, 160]
         ```
         """
-        self.volumes = shop_model[self.object_type][self.object_name]["vol_head"]["x"]
-        self.heights = shop_model[self.object_type][self.object_name]["vol_head"]["y"]
+        if isinstance(shop_model, ParsedShopModel) and (self.object_type, self.object_name) in shop_model.vol_heads:
+            self.volumes, self.heights = shop_model.vol_heads[(self.object_type, self.object_name)]
+        else:
+            self.volumes = shop_model[self.object_type][self.object_name]["vol_head"]["x"]
+            self.heights = shop_model[self.object_type][self.object_name]["vol_head"]["y"]
+        self._height_bounds = (np.min(self.heights), np.max(self.heights))
         self.pre_apply_has_run = True
 
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
@@ -567,21 +957,31 @@ class HeightToVolume(DynamicTransformation):
         """
         if self.pre_apply_has_run:
             single_ts = time_series_data[0]
-            return self.height_to_volume(single_ts, self.heights, self.volumes)
+            return self.height_to_volume(single_ts, self.heights, self.volumes, self._height_bounds)
         else:
             raise ValueError("pre_apply function has not run - missing necessary properties to run transformation")
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        if not self.pre_apply_has_run:
+            raise ValueError("pre_apply function has not run - missing necessary properties to run transformation")
+        return self.height_to_volume_array(values, self.heights, self.volumes, self._height_bounds)
+
 
 class DoNothing(Transformation):
     """
     Don't apply any transformations, just return the unchanged Series
     """
 
+    is_elementwise: ClassVar[bool] = True
+
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         return time_series_data[0]
 
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        return values
 
-class AddFromOffset(Transformation):
+
+class AddFromOffset(_RelativeDatapointsMixin, Transformation):
     """
     Adds values to input timeseries based on a list of relative datapoints with values to be added to corresponding
     offset minute from start time
@@ -590,11 +990,10 @@ class AddFromOffset(Transformation):
         relative_datapoints: The values to add to existing time series based at offset minute times from time series
     """
 
-    relative_datapoints: list[RelativeDatapoint]
     _shift_minutes: int = 0
-
-    def parameters_to_dict(self) -> dict:
-        return {f"{int(r_point.offset_minute)}": f"{r_point.offset_value}" for r_point in self.relative_datapoints}
+    # The operation applied to the input and the relative datapoints, and the operand before the first offset
+    operation: ClassVar[np.ufunc] = np.add
+    fill_value: ClassVar[float] = 0.0
 
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         """
@@ -641,19 +1040,21 @@ class AddFromOffset(Transformation):
 
         ```
         """
-        single_ts = time_series_data[0]
-        first_timestamp = min(single_ts.index)
-        non_relative_datapoints = _relative_datapoints_to_series(
-            self.relative_datapoints, first_timestamp, self._shift_minutes
+        return _apply_from_offset(
+            time_series_data[0], self.offsets, self._shift_minutes, self.operation, self.fill_value
         )
-        union_index = single_ts.index.union(non_relative_datapoints.index)
-        # fillna(0) since we are adding
-        non_relative_datapoints = non_relative_datapoints.reindex(union_index).ffill().fillna(0)
-        # If a timestamp does not exist in the original datapoints we add that timestamp with a forwardfilled value
-        return single_ts.reindex(union_index).ffill() + non_relative_datapoints
+
+    @classmethod
+    def apply_many(
+        cls, time_series_data: tuple[pd.Series, ...], transformations: Sequence[Self]
+    ) -> tuple[pd.Index, np.ndarray]:
+        time_series = time_series_data[0]
+        if not transformations or not _has_sorted_naive_index(time_series) or time_series.dtype.kind not in "iuf":
+            return super().apply_many(time_series_data, transformations)
+        return _apply_many_from_offset(time_series, transformations, cls.operation, cls.fill_value)
 
 
-class MultiplyFromOffset(Transformation):
+class MultiplyFromOffset(_RelativeDatapointsMixin, Transformation):
     """Multiplies values to input timeseries based on a list of relative datapoints
 
     Args:
@@ -661,11 +1062,10 @@ class MultiplyFromOffset(Transformation):
                                 is used - the multiply from offset will be applied to each value in this time series
     """
 
-    relative_datapoints: list[RelativeDatapoint]
     _shift_minutes: int = 0
-
-    def parameters_to_dict(self) -> dict:
-        return {f"{int(r_point.offset_minute)}": f"{r_point.offset_value}" for r_point in self.relative_datapoints}
+    # The operation applied to the input and the relative datapoints, and the operand before the first offset
+    operation: ClassVar[np.ufunc] = np.multiply
+    fill_value: ClassVar[float] = 1.0
 
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         """
@@ -699,16 +1099,18 @@ class MultiplyFromOffset(Transformation):
 
         ```
         """
-        single_ts = time_series_data[0]
-        first_timestamp = min(single_ts.index)
-        non_relative_datapoints = _relative_datapoints_to_series(
-            self.relative_datapoints, first_timestamp, self._shift_minutes
+        return _apply_from_offset(
+            time_series_data[0], self.offsets, self._shift_minutes, self.operation, self.fill_value
         )
-        union_index = single_ts.index.union(non_relative_datapoints.index)
-        # fillna(1) since we are multiplying
-        non_relative_datapoints = non_relative_datapoints.reindex(union_index).ffill().fillna(1)
-        # If a timestamp does not exist in the original datapoints we add that timestamp with a forwardfilled value
-        return single_ts.reindex(union_index).ffill() * non_relative_datapoints
+
+    @classmethod
+    def apply_many(
+        cls, time_series_data: tuple[pd.Series, ...], transformations: Sequence[Self]
+    ) -> tuple[pd.Index, np.ndarray]:
+        time_series = time_series_data[0]
+        if not transformations or not _has_sorted_naive_index(time_series) or time_series.dtype.kind not in "iuf":
+            return super().apply_many(time_series_data, transformations)
+        return _apply_many_from_offset(time_series, transformations, cls.operation, cls.fill_value)
 
 
 class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
@@ -718,11 +1120,13 @@ class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
         discharge_ts_external_id: external id of discharge timeseries to retrieve from CDF
         transit_object_type: gate or plant
         transit_object_name: name of gate or plant
+        resolution_minutes: resolution of the inflow and discharge grid in minutes, e.g. 15 for a 15-minute SHOP run
     """
 
     discharge_ts_external_id: str
     transit_object_type: Literal["plant", "gate"]
     transit_object_name: str
+    resolution_minutes: int = 60
     _pre_apply_has_run: bool = False
     _start: int
     _end: int
@@ -769,15 +1173,28 @@ class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
     def pre_apply_has_run(self, value: bool):
         self._pre_apply_has_run = value
 
+    @property
+    def resolution(self) -> str:
+        """The resolution the discharge is retrieved at and water in transit is added on, e.g. "15min"."""
+        return f"{self.resolution_minutes}min"
+
     def parameters_to_dict(self) -> dict:
-        return {
+        parameters: dict[str, Any] = {
             "discharge_ts_external_id": self.discharge_ts_external_id,
             "transit_object_type": self.transit_object_type,
             "transit_object_name": self.transit_object_name,
         }
+        # Only stored when set, so the parameters of the existing hourly transformations are unchanged
+        if self.resolution_minutes != 60:
+            parameters["resolution_minutes"] = self.resolution_minutes
+        return parameters
 
     @staticmethod
     def get_shape(model: dict, transit_object_type: str, transit_object_name: str) -> dict[int, float]:
+        if isinstance(model, ParsedShopModel) and (transit_object_type, transit_object_name) in model.delay_shapes:
+            delays, shares = model.delay_shapes[(transit_object_type, transit_object_name)]
+            return dict(zip(delays.tolist(), shares.tolist(), strict=False))
+
         gate_or_plant = model[transit_object_type][transit_object_name]  # Get description of gate/plant
 
         # Get shape and time_delay values as Dict[delay,water_percentage]
@@ -794,7 +1211,17 @@ class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
 
         return shape
 
-    def pre_apply(self, client: CogniteClient, shop_model: dict, start: int, end: int):
+    def datapoints_request(self, shop_model: dict, start: int, end: int) -> tuple[str, int, int, str]:
+        """The discharge datapoints needed to add water in transit: from the longest delay before start, until start."""
+        shape = self.get_shape(
+            model=shop_model, transit_object_type=self.transit_object_type, transit_object_name=self.transit_object_name
+        )
+        longest_delay_ms = 60 * 1000 * max(shape)  # longest delay in milliseconds
+        return self.discharge_ts_external_id, start - longest_delay_ms, start, self.resolution
+
+    def pre_apply(
+        self, client: CogniteClient, shop_model: dict, start: int, end: int, datapoints: pd.Series | None = None
+    ):
         """Preprocessing step that needs to run before `apply()` to set the shape,
            retrieve and set discharge time series data, and set SHOP start and end times
 
@@ -803,6 +1230,7 @@ class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
             shop_model: SHOP model dict
             start: SHOP start time in milliseconds since epoch
             end: SHOP end time in milliseconds since epoch
+            datapoints: Discharge datapoints already retrieved for `datapoints_request`, so they are not retrieved here
 
         Example:
         ```python
@@ -826,15 +1254,19 @@ class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
             model=shop_model, transit_object_type=self.transit_object_type, transit_object_name=self.transit_object_name
         )
 
-        longest_delay = max(self.shape)  # longest delay in minutes
-        longest_delay_ms = 60 * 1000 * longest_delay  # longest delay in milliseconds
+        if datapoints is not None:
+            discharge = datapoints
+        else:
+            longest_delay = max(self.shape)  # longest delay in minutes
+            longest_delay_ms = 60 * 1000 * longest_delay  # longest delay in milliseconds
 
-        discharge = retrieve_range(  # Get discharge datapoints from time-series
-            client=client,
-            external_ids=[self.discharge_ts_external_id],
-            start=self.start - longest_delay_ms,  # Shift start time based on longest delay
-            end=self.start,
-        )[self.discharge_ts_external_id]
+            discharge = retrieve_range(  # Get discharge datapoints from time-series
+                client=client,
+                external_ids=[self.discharge_ts_external_id],
+                start=self.start - longest_delay_ms,  # Shift start time based on longest delay
+                end=self.start,
+                resolution=self.resolution,
+            )[self.discharge_ts_external_id]
 
         if discharge.empty:
             logger.warning("Cannot add 'water in transit' - did not get any 'discharge' datapoints!")
@@ -842,30 +1274,94 @@ class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
         self.discharge = discharge
         self.pre_apply_has_run = True
 
+    @staticmethod
+    def _delayed_discharge_kernel(shape: dict[int, float], step: pd.Timedelta) -> tuple[np.ndarray, np.ndarray] | None:
+        """The shape as convolution kernels of water percentages and delays, or None if a delay is not on the grid.
+
+        Example:
+            >>> AddWaterInTransit._delayed_discharge_kernel({0: 0.1, 60: 0.5, 180: 0.4}, pd.Timedelta("1h"))
+            (array([0.1, 0.5, 0. , 0.4]), array([1., 1., 0., 1.]))
+        """
+        delay_steps = {}
+        for delay, water_percentage in shape.items():
+            steps, remainder = divmod(pd.Timedelta(minutes=delay), step)
+            if remainder or steps < 0:
+                return None
+            delay_steps[int(steps)] = water_percentage
+        kernel = np.zeros(max(delay_steps) + 1)
+        has_delay = np.zeros(max(delay_steps) + 1)
+        for steps, water_percentage in delay_steps.items():
+            kernel[steps] = water_percentage
+            has_delay[steps] = 1
+        return kernel, has_delay
+
     @staticmethod
     def add_water_in_transit(
-        inflow: pd.Series, discharge: pd.Series, shape: dict[int, float], start: datetime, end: datetime
+        inflow: pd.Series,
+        discharge: pd.Series,
+        shape: dict[int, float],
+        start: datetime,
+        end: datetime,
+        freq: str | timedelta = "1h",
     ) -> pd.Series:
-        # Forward fill discharge for all (hour) timestamps until start
-        one_hour = pd.Timedelta("1h")
-        if start - one_hour not in discharge.index:
-            discharge[start - one_hour] = np.nan
-        discharge = discharge.resample(one_hour).ffill().ffill()
+        step = pd.Timedelta(freq)
+        # Forward fill discharge for all timestamps on the grid until start
+        if start - step not in discharge.index:
+            discharge[start - step] = np.nan
+        discharge = discharge.resample(step).ffill().ffill()
 
-        # Make sure inflow has values for all (hour) timestamps up until end (exclusive)
+        # Make sure inflow has values for all timestamps on the grid up until end (exclusive)
         if end not in inflow.index:
             inflow[end] = np.nan
-        inflow = inflow.resample(one_hour).ffill().ffill()
-
-        for delay, water_percentage in shape.items():
-            delayed_discharge = discharge.shift(delay, freq="min") * water_percentage
-            inflow = inflow.add(delayed_discharge, fill_value=0)
+        inflow = inflow.resample(step).ffill().ffill()
+
+        kernels = AddWaterInTransit._delayed_discharge_kernel(shape, step)
+        if kernels is None or (inflow.index[0] - discharge.index[0]) % step:
+            # Delays off the grid add timestamps between the grid points, so shift and add the delays one by one
+            for delay, water_percentage in shape.items():
+                delayed_discharge = discharge.shift(delay, freq="min") * water_percentage
+                inflow = inflow.add(delayed_discharge, fill_value=0)
+        else:
+            inflow = AddWaterInTransit._convolve_discharge(inflow, discharge, *kernels, step=step)
 
         # Only include delayed discharge that will affect the selected time range
         between_start_and_end = (start <= inflow.index) & (inflow.index < end)
 
         return inflow.loc[between_start_and_end]
 
+    @staticmethod
+    def _convolve_discharge(
+        inflow: pd.Series, discharge: pd.Series, kernel: np.ndarray, has_delay: np.ndarray, step: pd.Timedelta
+    ) -> pd.Series:
+        """Add the delayed discharge to the inflow, with inflow and discharge on the same grid.
+
+        Gives the same result as adding `discharge.shift(delay) * water_percentage` for each delay with
+        `inflow.add(..., fill_value=0)`: the result covers the union of the timestamps, and missing values count as 0
+        unless all values at a timestamp are missing.
+        """
+        first = min(inflow.index[0], discharge.index[0])
+        last = max(inflow.index[-1], discharge.index[-1] + (len(kernel) - 1) * step)
+        grid = pd.date_range(first, last, freq=step)
+
+        def on_grid(series: pd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+            """Values (missing as 0), whether the value is not missing, and whether the timestamp exists."""
+            positions = (series.index - first) // step
+            values, valid, exists = np.zeros(len(grid)), np.zeros(len(grid)), np.zeros(len(grid))
+            series_values = series.to_numpy(dtype=float)
+            values[positions] = np.nan_to_num(series_values)
+            valid[positions] = ~np.isnan(series_values)
+            exists[positions] = 1
+            return values, valid, exists
+
+        inflow_values, inflow_valid, inflow_exists = on_grid(inflow)
+        discharge_values, discharge_valid, discharge_exists = on_grid(discharge)
+        delayed = np.convolve(discharge_values, kernel)[: len(grid)]
+        valid = inflow_valid + np.convolve(discharge_valid, has_delay)[: len(grid)] > 0
+        exists = inflow_exists + np.convolve(discharge_exists, has_delay)[: len(grid)] > 0
+
+        result = pd.Series(np.where(valid, inflow_values + delayed, np.nan), index=grid)
+        return result[exists]
+
     def apply(self, time_series_data: tuple[pd.Series]) -> pd.Series:
         """Run `apply()` after preprocessing step to add water in transit to add water in transit (discharge water) to
            inflow time series
@@ -918,6 +1414,7 @@ class AddWaterInTransit(DynamicTransformation, arbitrary_types_allowed=True):
                 shape=self.shape,
                 start=ms_to_datetime_tz_naive(self.start),
                 end=ms_to_datetime_tz_naive(self.end),
+                freq=self.resolution,
             )
         else:
             raise ValueError("pre_apply function has not run - missing necessary properties to run transformation")
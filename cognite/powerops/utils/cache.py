@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generic, TypeVar
+
+import numpy as np
+import pandas as pd
+from cognite.client import CogniteClient
+from cognite.client.data_classes import DatapointsQuery, TimeSeries, TimeSeriesList
+
+from cognite.powerops.utils.require import require
+
+logger = logging.getLogger(__name__)
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class TTLCache(Generic[_K, _V]):
+    """A thread-safe, size-bounded cache where entries expire after a given time.
+
+    When the cache is full, the least recently used entry is evicted.
+
+    Args:
+        maxsize: The maximum number of entries in the cache
+        ttl: Seconds an entry is valid after it was set, None for no expiry
+
+    Example:
+        >>> cache = TTLCache(maxsize=2, ttl=None)
+        >>> cache.set("a", 1)
+        >>> cache.set("b", 2)
+        >>> cache.get("a")
+        1
+        >>> cache.set("c", 3)  # Evicts "b", the least recently used entry
+        >>> cache.get("b") is None
+        True
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[_K, tuple[float, _V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: _K) -> _V | None:
+        with self._lock:
+            if (entry := self._entries.get(key)) is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: _K, value: _V) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[_K] | None = None) -> None:
+        """Remove the given keys from the cache, or all entries if no keys are given."""
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class TimeSeriesMetadataCache:
+    """Process-wide cache of time series metadata (e.g. `is_step` and `unit`) used by the retrieval utilities.
+
+    Entries are keyed by CDF project and external id, so clients for the same project share the cached metadata.
+
+    Args:
+        maxsize: The maximum number of time series to keep metadata for
+        ttl: Seconds the metadata of a time series is cached, None for no expiry
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float | None = 3600):
+        self._cache: TTLCache[tuple[str, str], TimeSeries] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def retrieve(self, client: CogniteClient, external_ids: list[str]) -> TimeSeriesList:
+        """Retrieve metadata for the given time series, only requesting the ones not in the cache from CDF.
+
+        Unknown external ids are ignored, like `client.time_series.retrieve_multiple(..., ignore_unknown_ids=True)`.
+        """
+        project = client.config.project
+        cached = {external_id: self._cache.get((project, external_id)) for external_id in dict.fromkeys(external_ids)}
+        if missing := [external_id for external_id, time_series in cached.items() if time_series is None]:
+            logger.debug(f"Retrieving time series metadata for {len(missing)} of {len(cached)} time series")
+            for time_series in client.time_series.retrieve_multiple(external_ids=missing, ignore_unknown_ids=True):
+                if time_series.external_id is not None:
+                    self._cache.set((project, time_series.external_id), time_series)
+                    cached[time_series.external_id] = time_series
+        return TimeSeriesList([time_series for time_series in cached.values() if time_series is not None])
+
+    def invalidate(self, client: CogniteClient | None = None, external_ids: Iterable[str] | None = None) -> None:
+        """Remove cached metadata for the given external ids (in the project of the client), or everything."""
+        if client is None or external_ids is None:
+            self._cache.invalidate()
+        else:
+            self._cache.invalidate((client.config.project, external_id) for external_id in external_ids)
+
+
+time_series_metadata_cache = TimeSeriesMetadataCache()
+
+
+@dataclass
+class _CachedDatapoints:
+    """Raw datapoints of a time series, complete for the covered interval [start, end)."""
+
+    external_id: str
+    start: int
+    end: int
+    timestamps: np.ndarray
+    values: np.ndarray
+
+    def between(self, start: int, end: int) -> tuple[np.ndarray, np.ndarray]:
+        first, last = np.searchsorted(self.timestamps, [start, end], side="left")
+        return self.timestamps[first:last], self.values[first:last]
+
+
+class DatapointCache:
+    """Optional on-disk cache of raw datapoints, used by the retrieval utilities to only fetch uncovered intervals.
+
+    The datapoints of each time series are stored as NumPy arrays (timestamps and values) that are memory-mapped when
+    read, together with the interval they cover. Each update writes new files instead of replacing files that may
+    still be open. On each retrieval only the part of the requested range that is not
+    covered is fetched from CDF and merged into the cache. The covered interval ends `refetch_window` seconds before
+    the time of retrieval, so datapoints in the future (e.g. forecasts) and recent datapoints that may still arrive late
+    or be corrected are always fetched from CDF.
+
+    The cache can be shared between the threads of a process, but not between processes: each process should use its
+    own directory, as the lock does not protect the files from concurrent writes by another process.
+
+    Args:
+        directory: Directory to store the cached datapoints in
+        max_age: Seconds since a time series was last updated before it is evicted, None for no limit
+        max_bytes: Total size of the cache before the least recently updated time series are evicted, None for no limit
+        refetch_window: Seconds before the time of retrieval where the datapoints are not cached, but always fetched
+
+    Example:
+        ```python
+        cache = DatapointCache("/tmp/powerops-datapoints", max_age=24 * 3600)
+        retrieve_range(client, ["inflow"], start, end, cache=cache)
+        ```
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        max_age: float | None = 7 * 24 * 3600,
+        max_bytes: int | None = 1024**3,
+        refetch_window: float = 24 * 3600,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.refetch_window = refetch_window
+        self._lock = threading.Lock()
+
+    def _path(self, project: str, external_id: str) -> Path:
+        return self.directory / project / hashlib.sha256(external_id.encode()).hexdigest()
+
+    def _load(
+        self, project: str, external_id: str, start: int | None = None, end: int | None = None
+    ) -> _CachedDatapoints | None:
+        """The cached datapoints of a time series, only the ones in [start, end) if given.
+
+        The datapoints are copied out of the memory-mapped files, so only the requested part is read and no file is left
+        open. Open files can not be replaced or removed on Windows.
+        """
+        path = self._path(project, external_id)
+        try:
+            meta = json.loads((path / "meta.json").read_text())
+            timestamps = np.load(path / f"timestamps.{meta['version']}.npy", mmap_mode="r")
+            values = np.load(path / f"values.{meta['version']}.npy", mmap_mode="r")
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+        first, last = np.searchsorted(
+            timestamps, [meta["start"] if start is None else start, meta["end"] if end is None else end], side="left"
+        )
+        return _CachedDatapoints(
+            external_id, meta["start"], meta["end"], np.array(timestamps[first:last]), np.array(values[first:last])
+        )
+
+    def _store(self, project: str, datapoints: _CachedDatapoints) -> None:
+        path = self._path(project, datapoints.external_id)
+        path.mkdir(parents=True, exist_ok=True)
+        # Every update is written to new files, and "meta.json" is replaced last to switch to them
+        version = uuid.uuid4().hex
+        np.save(path / f"timestamps.{version}.npy", np.asarray(datapoints.timestamps, dtype=np.int64))
+        np.save(path / f"values.{version}.npy", np.asarray(datapoints.values, dtype=np.float64))
+        meta = {
+            "external_id": datapoints.external_id,
+            "start": datapoints.start,
+            "end": datapoints.end,
+            "version": version,
+        }
+        tmp_meta = path / f"meta.{version}.json"
+        tmp_meta.write_text(json.dumps(meta))
+        tmp_meta.replace(path / "meta.json")
+        for file in path.glob("*.npy"):
+            if not file.name.endswith(f".{version}.npy"):
+                # Still open in another process on Windows, it is removed with a later update instead
+                with contextlib.suppress(OSError):
+                    file.unlink()
+
+    def retrieve_dataframe(self, client: CogniteClient, external_ids: list[str], start: int, end: int) -> pd.DataFrame:
+        """Raw datapoints in [start, end) as one column per time series, like `client.time_series.data.retrieve`.
+
+        Only the parts of the range not covered by the cache are retrieved from CDF, in a single request. The lock is
+        only held while reading and writing the cache, so retrievals from CDF run concurrently.
+        """
+        project = client.config.project
+        # Datapoints after this may still arrive late or be corrected, so they are never covered
+        settled = int((time.time() - self.refetch_window) * 1000)
+        cached: dict[str, _CachedDatapoints | None] = {}
+        # Fetch the uncovered tail, or the full range if the cache does not cover the start of the range
+        to_fetch: dict[str, tuple[int, int]] = {}
+        with self._lock:
+            for external_id in dict.fromkeys(external_ids):
+                entry = self._load(project, external_id, start, end)
+                if entry is not None and entry.start <= start <= entry.end < end:
+                    # All cached datapoints are needed to store the extended entry
+                    entry = self._load(project, external_id)
+                if entry is None or not entry.start <= start <= entry.end:
+                    to_fetch[external_id] = (start, end)
+                    entry = None
+                elif entry.end < end:
+                    to_fetch[external_id] = (entry.end, end)
+                cached[external_id] = entry
+
+        fetched: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        if to_fetch:
+            logger.debug(f"Retrieving uncovered datapoints for {len(to_fetch)} of {len(cached)} time series")
+            queries = [
+                DatapointsQuery(external_id=external_id, start=fetch_start, end=fetch_end)
+                for external_id, (fetch_start, fetch_end) in to_fetch.items()
+            ]
+            for datapoints in client.time_series.data.retrieve(external_id=queries, ignore_unknown_ids=True):
+                external_id = require(datapoints.external_id)
+                timestamps = np.asarray(datapoints.timestamp, dtype=np.int64)
+                values = np.asarray(datapoints.value, dtype=np.float64)
+                if (entry := cached[external_id]) is not None:
+                    cached_timestamps, cached_values = entry.between(entry.start, to_fetch[external_id][0])
+                    timestamps = np.concatenate([cached_timestamps, timestamps])
+                    values = np.concatenate([cached_values, values])
+                fetched[external_id] = (timestamps, values)
+
+        if fetched:
+            with self._lock:
+                for external_id, (timestamps, values) in fetched.items():
+                    covered_start = entry.start if (entry := cached[external_id]) is not None else start
+                    covered_end = max(covered_start, min(end, settled))
+                    keep = timestamps < covered_end
+                    self._store(
+                        project,
+                        _CachedDatapoints(external_id, covered_start, covered_end, timestamps[keep], values[keep]),
+                    )
+                # Scanning the directory is only worth it when the cache has grown
+                self._evict()
+
+        columns = {}
+        for external_id, entry in cached.items():
+            if external_id in fetched:
+                timestamps, values = fetched[external_id]
+                in_range = (start <= timestamps) & (timestamps < end)
+                timestamps, values = timestamps[in_range], values[in_range]
+            elif entry is not None:
+                timestamps, values = entry.between(start, end)
+            else:
+                continue  # Unknown time series
+            index = pd.DatetimeIndex(timestamps.astype("datetime64[ms]")).as_unit("ns")
+            columns[external_id] = pd.Series(values, index=index)
+        return pd.DataFrame(columns)
+
+    def latest_before(
+        self, client: CogniteClient, queries: list[tuple[str, int]]
+    ) -> dict[tuple[str, int], tuple[int, float]]:
+        """The latest cached datapoint before each (external id, before) pair, where the cache covers it.
+
+        Pairs not covered by the cache are left out, and must be retrieved from CDF.
+        """
+        project = client.config.project
+        latest = {}
+        with self._lock:
+            for external_id, before in queries:
+                if (datapoint := self._latest_before(project, external_id, before)) is not None:
+                    latest[(external_id, before)] = datapoint
+        return latest
+
+    def _latest_before(self, project: str, external_id: str, before: int) -> tuple[int, float] | None:
+        path = self._path(project, external_id)
+        try:
+            meta = json.loads((path / "meta.json").read_text())
+            if not meta["start"] < before <= meta["end"]:
+                return None
+            timestamps = np.load(path / f"timestamps.{meta['version']}.npy", mmap_mode="r")
+            values = np.load(path / f"values.{meta['version']}.npy", mmap_mode="r")
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+        # Only the latest datapoint is read, without copying the datapoints before it
+        position = int(np.searchsorted(timestamps, before, side="left"))
+        if position == 0:
+            return None
+        return int(timestamps[position - 1]), float(values[position - 1])
+
+    def _entries(self) -> list[tuple[Path, float, int]]:
+        """(path, last updated, size in bytes) of all cached time series."""
+        entries = []
+        for meta in self.directory.glob("*/*/meta.json"):
+            path = meta.parent
+            files = list(path.iterdir())
+            entries.append((path, meta.stat().st_mtime, sum(file.stat().st_size for file in files)))
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        if self.max_age is not None:
+            too_old = time.time() - self.max_age
+            for path, _, _ in [entry for entry in entries if entry[1] < too_old]:
+                shutil.rmtree(path, ignore_errors=True)
+            entries = [entry for entry in entries if entry[1] >= too_old]
+        if self.max_bytes is not None:
+            total = sum(size for _, _, size in entries)
+            for path, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def evict(self) -> None:
+        """Remove time series that are older than `max_age`, and the least recently updated beyond `max_bytes`."""
+        with self._lock:
+            self._evict()
+
+    def invalidate(self, client: CogniteClient | None = None, external_ids: Iterable[str] | None = None) -> None:
+        """Remove cached datapoints for the given external ids (in the project of the client), or everything."""
+        with self._lock:
+            if client is None or external_ids is None:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                return
+            for external_id in external_ids:
+                shutil.rmtree(self._path(client.config.project, external_id), ignore_errors=True)
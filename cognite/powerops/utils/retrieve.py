@@ -1,18 +1,42 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Literal
+import math
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Literal, TypeVar, Union, overload
 
 import numpy as np
 import pandas as pd
 from cognite.client import CogniteClient
-from cognite.client.data_classes import DatapointsList, DataSet
+from cognite.client.data_classes import (
+    Datapoints,
+    DatapointsList,
+    DatapointsQuery,
+    DataSet,
+    LatestDatapointQuery,
+    TimeSeriesList,
+)
 from cognite.client.utils import ms_to_datetime
 
+from cognite.powerops.client._generated.data_classes import ShopTimeResolution, ShopTimeResolutionWrite
 from cognite.powerops.client.powerops_client import PowerOpsClient
+from cognite.powerops.utils.cache import DatapointCache, time_series_metadata_cache
 from cognite.powerops.utils.require import require
 
 DataSetType = Literal["READ", "WRITE", "MONITOR", "PROCESS"]
+# A fixed resolution (e.g. "1h", "15min" or a timedelta), or the (possibly non-uniform) SHOP time resolution
+TimeResolution = Union[str, timedelta, ShopTimeResolution, ShopTimeResolutionWrite]
+# Download all "raw" datapoints and interpolate them locally, or let CDF interpolate with "aggregates"
+RetrievalMode = Literal["raw", "aggregates"]
+
+_T = TypeVar("_T")
+
+# Default number of concurrent CDF requests for the async retrieval utilities
+DEFAULT_MAX_CONCURRENCY = 8
 
 logger = logging.getLogger(__name__)
 
@@ -36,30 +60,150 @@ def merge_dicts(*args: dict) -> dict:
     return merged
 
 
-def _retrieve_range(client: CogniteClient, external_ids: list[str], start: int, end: int) -> pd.DataFrame:
-    # TODO: Upgrade cognite-sdk to v5 (or later), and see how much of the code we can replace with direct SDK calls
-    # - client.time_series.data.retrieve_dataframe(…, uniform_index=True) should give us almost what we want,
-    # but maybe we need to be careful with cases where there is more than 1 hour between values
-    # (I do not remember if this is an issue only for some aggregates like average, or for all).
-    # And maybe we need to parametrise the "minimum resolution"
-    # (seems to assume 1 hour, but we should support sub-hourly resolution)
-    # Retrieve raw datapoints
-    external_ids = remove_duplicates(external_ids)
-    if not external_ids:
-        return pd.DataFrame()
+def _resample_grid(raw_index: pd.Index, freq: str | timedelta) -> pd.DatetimeIndex:
+    """Target timestamps for resampling `raw_index` to `freq`.
 
-    start_dt = ms_to_datetime(start).replace(tzinfo=None)  # UTC implied
-    end_dt = ms_to_datetime(end).replace(tzinfo=None)  # UTC implied
-    logger.debug(f"Retrieving {external_ids} between '{start_dt}' and '{end_dt}'")
-    df_range = client.time_series.data.retrieve(
-        external_id=external_ids, start=start, end=end, ignore_unknown_ids=True
-    ).to_pandas()
+    Matches the labels produced by `DataFrame.resample(freq)`: the grid is anchored at midnight of the first day and
+    spans from the first to the last raw timestamp (both floored to the grid).
 
-    # Retrieve latest datapoints before start
-    df_latest = client.time_series.data.retrieve_latest(
-        external_id=external_ids, before=start, ignore_unknown_ids=True
-    ).to_pandas()
+    Example:
+        >>> raw_index = pd.DatetimeIndex(["2022-01-01 00:30", "2022-01-01 02:10", "2022-01-01 05:45"])
+        >>> _resample_grid(raw_index, freq="1h").strftime("%H:%M").tolist()
+        ['00:00', '01:00', '02:00', '03:00', '04:00', '05:00']
+    """
+    if raw_index.empty:
+        return pd.DatetimeIndex([], dtype="datetime64[ns]")
+    first, last = pd.Timestamp(raw_index.min()), pd.Timestamp(raw_index.max())
+    step = pd.Timedelta(freq)
+    origin = first.normalize()
+    grid_first = origin + ((first - origin) // step) * step
+    return pd.date_range(grid_first, last, freq=step, unit="ns")
+
+
+def _time_resolution_grid(
+    start: datetime, end: datetime, minutes_after_start: list[int], time_resolution_minutes: list[int]
+) -> pd.DatetimeIndex:
+    """Target timestamps for a SHOP time resolution made up of segments with different resolutions.
+
+    Segment `i` starts `minutes_after_start[i]` minutes after `start` and uses a resolution of
+    `time_resolution_minutes[i]` minutes until the next segment starts. The first segment always starts at `start`,
+    and the last segment includes `end`.
+
+    Example:
+        >>> start, end = datetime(2022, 1, 1), datetime(2022, 1, 1, 3)
+        >>> grid = _time_resolution_grid(start, end, minutes_after_start=[0, 60], time_resolution_minutes=[15, 60])
+        >>> grid.strftime("%H:%M").tolist()
+        ['00:00', '00:15', '00:30', '00:45', '01:00', '02:00', '03:00']
+    """
+    if not minutes_after_start or len(minutes_after_start) != len(time_resolution_minutes):
+        raise ValueError(
+            "Time resolution must have the same (non-zero) number of 'minutes_after_start' and "
+            f"'time_resolution_minutes', got {minutes_after_start} and {time_resolution_minutes}"
+        )
+    segments = sorted(zip(minutes_after_start, time_resolution_minutes, strict=True))
+    segment_starts = [pd.Timestamp(start)] + [pd.Timestamp(start) + pd.Timedelta(minutes=m) for m, _ in segments[1:]]
+    segment_ends = [*segment_starts[1:], pd.Timestamp(end)]
+    pieces = [
+        pd.date_range(
+            segment_start,
+            min(segment_end, pd.Timestamp(end)),
+            freq=pd.Timedelta(minutes=resolution_minutes),
+            inclusive="both" if i == len(segments) - 1 else "left",
+            unit="ns",
+        )
+        for i, (segment_start, segment_end, (_, resolution_minutes)) in enumerate(
+            zip(segment_starts, segment_ends, segments, strict=True)
+        )
+        if segment_start <= pd.Timestamp(end)
+    ]
+    return pd.DatetimeIndex(np.concatenate([piece.to_numpy() for piece in pieces]))
+
+
+def _target_grid(raw_index: pd.Index, start: datetime, end: datetime, resolution: TimeResolution) -> pd.DatetimeIndex:
+    """Target timestamps within [start, end] (and not after the last raw timestamp) to resample to."""
+    if raw_index.empty:
+        return pd.DatetimeIndex([], dtype="datetime64[ns]")
+    if isinstance(resolution, str | timedelta):
+        grid = _resample_grid(raw_index, freq=resolution)
+    else:
+        grid = _time_resolution_grid(
+            start,
+            end,
+            minutes_after_start=resolution.minutes_after_start,
+            time_resolution_minutes=resolution.time_resolution_minutes,
+        )
+    return grid[(grid >= start) & (grid <= end) & (grid <= raw_index.max())]
+
+
+def _resample_to_grid(
+    df_raw: pd.DataFrame, grid: pd.DatetimeIndex, step_columns: list[str], linear_columns: list[str]
+) -> pd.DataFrame:
+    """Evaluates step and linear interpolation of raw datapoints at the `grid` timestamps.
+
+    All columns are interpolated at once, and no intermediate (finer) grid is built, so memory use is proportional to
+    the raw data and the output grid. Before the first datapoint of a column the result is NaN, after the last
+    datapoint the last value is held.
 
+    Args:
+        df_raw: Raw datapoints, one column per time series, indexed by (sorted) timestamps
+        grid: The timestamps to evaluate the time series at
+        step_columns: Columns to interpolate as step functions (last value is held until the next datapoint)
+        linear_columns: Columns to interpolate linearly in time between datapoints
+
+    Example:
+        >>> raw_index = pd.DatetimeIndex(["2022-01-01 00:30", "2022-01-01 02:30", "2022-01-01 03:00"])
+        >>> df_raw = pd.DataFrame({"step": [1.0, 3.0, None], "linear": [1.0, 3.0, None]}, index=raw_index)
+        >>> grid = pd.date_range("2022-01-01 00:00", "2022-01-01 03:00", freq="1h")
+        >>> _resample_to_grid(df_raw, grid, step_columns=["step"], linear_columns=["linear"])
+                             step  linear
+        2022-01-01 00:00:00   NaN     NaN
+        2022-01-01 01:00:00   1.0     1.5
+        2022-01-01 02:00:00   1.0     2.5
+        2022-01-01 03:00:00   3.0     3.0
+    """
+    columns = [*step_columns, *linear_columns]
+    raw_ns = df_raw.index.to_numpy(dtype="datetime64[ns]").view("int64")
+    grid_ns = grid.to_numpy(dtype="datetime64[ns]").view("int64")
+    values = df_raw[columns].to_numpy(dtype=float)
+    n_rows = len(raw_ns)
+
+    # Row numbers of the last valid datapoint at or before, and the first valid datapoint at or after, each raw row
+    valid = ~np.isnan(values)
+    rows = np.arange(n_rows)[:, np.newaxis]
+    previous_valid = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    next_valid = np.minimum.accumulate(np.where(valid, rows, n_rows)[::-1], axis=0)[::-1]
+
+    # Map the grid onto the raw rows: last raw row at or before, and first raw row at or after, each grid timestamp
+    before = np.searchsorted(raw_ns, grid_ns, side="right") - 1
+    after = np.searchsorted(raw_ns, grid_ns, side="left")
+    no_rows = np.full((len(grid_ns), len(columns)), -1)
+    previous_row = np.where((before >= 0)[:, np.newaxis], previous_valid[before.clip(0)], no_rows)
+    next_row = np.where((after < n_rows)[:, np.newaxis], next_valid[after.clip(max=n_rows - 1)], no_rows + n_rows + 1)
+
+    column_index = np.arange(len(columns))
+    has_previous = previous_row >= 0
+    previous_value = np.where(has_previous, values[previous_row.clip(0), column_index], np.nan)
+
+    # Step columns (and linear columns without a later datapoint) hold the previous value
+    result = previous_value
+    n_step = len(step_columns)
+    linear_previous, linear_next = previous_row[:, n_step:], next_row[:, n_step:]
+    interpolate = has_previous[:, n_step:] & (linear_next < n_rows) & (linear_next != linear_previous)
+    if interpolate.any():
+        previous_ts = raw_ns[linear_previous.clip(0)]
+        next_ts = raw_ns[linear_next.clip(max=n_rows - 1)]
+        next_value = values[linear_next.clip(max=n_rows - 1), column_index[n_step:]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = (grid_ns[:, np.newaxis] - previous_ts) / (next_ts - previous_ts)
+        linear_value = result[:, n_step:]
+        interpolated = linear_value + (next_value - linear_value) * weight
+        result[:, n_step:] = np.where(interpolate, interpolated, linear_value)
+
+    return pd.DataFrame(result, index=grid, columns=columns)
+
+
+def _combine_with_latest(df_range: pd.DataFrame, df_latest: pd.DataFrame, start: int) -> pd.DataFrame:
+    """Raw datapoints in range together with the latest datapoints before start."""
     # Make sure we have a start timestamp in range
     if df_range.empty:
         df_range = pd.DataFrame(
@@ -69,46 +213,322 @@ def _retrieve_range(client: CogniteClient, external_ids: list[str], start: int,
         )
 
     # Add the latest datapoints to the DataFrame
-    df_raw = df_range.combine_first(df_latest)
+    return df_range.combine_first(df_latest)
 
-    # Must retrieve time series metadata to correctly resample and aggregate datapoints
-    time_series = client.time_series.retrieve_multiple(external_ids=external_ids, ignore_unknown_ids=True)
-    step_columns = [ts.external_id for ts in time_series if ts.is_step]
-    linear_columns = [ts.external_id for ts in time_series if not ts.is_step]
+
+def _resample_range(
+    df_raw: pd.DataFrame, time_series: TimeSeriesList, start: int, end: int, resolution: TimeResolution
+) -> pd.DataFrame:
+    """Interpolate raw datapoints to the target timestamps between start and end, using `is_step` of each series."""
+    step_columns = [require(ts.external_id) for ts in time_series if ts.is_step]
+    linear_columns = [require(ts.external_id) for ts in time_series if not ts.is_step]
     logger.debug(f"time_series.is_step: True [{len(step_columns)}] False [{len(linear_columns)}]")
 
-    # Step interpolation of time series with .is_step=False
-    # NOTE: do not need to upsample when forward filling
-    # TODO: note 2x ffill()
-    df_step = df_raw[step_columns].ffill().resample("1h").ffill()
+    # Evaluate step and linear interpolation directly at the target timestamps within the range
+    start_dt = ms_to_datetime(start).replace(tzinfo=None)  # UTC implied
+    end_dt = ms_to_datetime(end).replace(tzinfo=None)  # UTC implied
+    grid = _target_grid(df_raw.index, start_dt, end_dt, resolution)
+    return _resample_to_grid(df_raw, grid, step_columns=step_columns, linear_columns=linear_columns)
 
-    # Linear interpolation of time series with .is_step=False
-    # TODO: must upsample before downsampling?
-    # TODO: confirm operations
-    intermediate_df = df_raw[linear_columns].resample("1min").interpolate()
-    df_linear = intermediate_df.resample("1h").interpolate()
 
-    # Merge the step interpolated and linearly interpolated DataFrames
-    df_combined = df_step.combine_first(df_linear)
+def _granularity(resolution: TimeResolution) -> str:
+    """CDF aggregate granularity for a time resolution.
 
-    # Only return datapoints within the range
-    df_filtered = df_combined[start_dt:end_dt]  # type: ignore[misc]
+    For a SHOP time resolution with segments of different resolutions, the greatest common divisor is used.
 
-    return df_filtered
+    Example:
+        >>> _granularity("1h"), _granularity("15min"), _granularity(timedelta(days=1))
+        ('1h', '15m', '1d')
+    """
+    if isinstance(resolution, str | timedelta):
+        step = pd.Timedelta(resolution)
+    else:
+        step = pd.Timedelta(minutes=math.gcd(*resolution.time_resolution_minutes))
+    seconds = int(step.total_seconds())
+    if seconds < 1:
+        raise ValueError(f"Resolution must be at least one second, got {resolution}")
+    for unit, unit_seconds in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds % unit_seconds == 0:
+            return f"{seconds // unit_seconds}{unit}"
+    return f"{seconds}s"
+
+
+def _retrieve_aggregates(
+    client: CogniteClient, time_series: TimeSeriesList, start: int, end: int, resolution: TimeResolution
+) -> pd.DataFrame:
+    """Retrieve CDF `step_interpolation` or `interpolation` aggregates (based on `is_step`) at the target granularity.
+
+    This transfers one value per output step and time series, instead of all raw datapoints.
+    """
+    queries = [
+        DatapointsQuery(
+            external_id=ts.external_id, aggregates=["step_interpolation" if ts.is_step else "interpolation"]
+        )
+        for ts in time_series
+    ]
+    if not queries:
+        return pd.DataFrame()
+    granularity = _granularity(resolution)
+    logger.debug(f"Retrieving {granularity} aggregates for {len(queries)} time series")
+    return client.time_series.data.retrieve(
+        external_id=queries, start=start, end=end, granularity=granularity, ignore_unknown_ids=True
+    ).to_pandas(include_aggregate_name=False)
+
+
+def _boundary_datapoints(
+    latest: dict[tuple[str, int], Datapoints], external_ids: list[str], start: int, end: int
+) -> pd.DataFrame:
+    """Raw datapoints before start and the last raw datapoints before end, to complete aggregates at the boundaries.
+
+    CDF does not return interpolation aggregates before the first or after the last datapoint, so these are used to
+    interpolate from the latest value before start, and to hold the last value until end.
+    """
+    df_before_start = _latest_to_frame(latest, external_ids, start, at_before=False)
+    df_before_end = _latest_to_frame(latest, external_ids, end, at_before=False)
+    return df_before_start.combine_first(df_before_end)
+
+
+def _retrieve_range(
+    client: CogniteClient,
+    external_ids: list[str],
+    start: int,
+    end: int,
+    resolution: TimeResolution = "1h",
+    mode: RetrievalMode = "raw",
+    cache: DatapointCache | None = None,
+) -> pd.DataFrame:
+    # TODO: Upgrade cognite-sdk to v5 (or later), and see how much of the code we can replace with direct SDK calls
+    # - client.time_series.data.retrieve_dataframe(…, uniform_index=True) should give us almost what we want,
+    # but maybe we need to be careful with cases where there is more than 1 hour between values
+    # (I do not remember if this is an issue only for some aggregates like average, or for all).
+    external_ids = remove_duplicates(external_ids)
+    if not external_ids:
+        return pd.DataFrame()
+
+    logger.debug(f"Retrieving {external_ids} between '{ms_to_datetime(start)}' and '{ms_to_datetime(end)}'")
+    if mode == "aggregates":
+        # Time series metadata decides which aggregate to request for each time series
+        time_series = time_series_metadata_cache.retrieve(client, external_ids)
+        df_aggregates = _retrieve_aggregates(client, time_series, start, end, resolution)
+        latest = _retrieve_latest_queries(client, [(xid, before) for before in (start, end) for xid in external_ids])
+        df_raw = _combine_with_latest(df_aggregates, _boundary_datapoints(latest, external_ids, start, end), start)
+        return _resample_range(df_raw, time_series, start, end, resolution)
+
+    if cache is not None:
+        # Only the datapoints not already in the cache are retrieved from CDF
+        df_range = cache.retrieve_dataframe(client, external_ids, start, end)
+        latest = _retrieve_latest_cached(client, [(xid, start) for xid in external_ids], cache)
+        df_latest = _latest_to_frame(latest, external_ids, start, at_before=False)
+    else:
+        # Retrieve raw datapoints
+        df_range = client.time_series.data.retrieve(
+            external_id=external_ids, start=start, end=end, ignore_unknown_ids=True
+        ).to_pandas()
 
+        # Retrieve latest datapoints before start
+        df_latest = client.time_series.data.retrieve_latest(
+            external_id=external_ids, before=start, ignore_unknown_ids=True
+        ).to_pandas()
 
-def retrieve_range(client: CogniteClient, external_ids: list[str], start: int, end: int) -> dict[str, pd.Series]:
-    retrieved_range_df = _retrieve_range(client=client, external_ids=external_ids, start=start, end=end)
+    df_raw = _combine_with_latest(df_range, df_latest, start)
+
+    # Must retrieve time series metadata to correctly resample and aggregate datapoints
+    time_series = time_series_metadata_cache.retrieve(client, external_ids)
+    return _resample_range(df_raw, time_series, start, end, resolution)
+
+
+def retrieve_range(
+    client: CogniteClient,
+    external_ids: list[str],
+    start: int,
+    end: int,
+    resolution: TimeResolution = "1h",
+    mode: RetrievalMode = "raw",
+    cache: DatapointCache | None = None,
+) -> dict[str, pd.Series]:
+    """Retrieve datapoints between start and end, interpolated to the given time resolution.
+
+    Args:
+        client: CogniteClient authenticated to the project to retrieve datapoints from
+        external_ids: External ids of the time series to retrieve
+        start: Start time in milliseconds since epoch
+        end: End time in milliseconds since epoch
+        resolution: A fixed resolution like "1h" or "15min", or a SHOP time resolution
+            (e.g. `ShopScenario.time_resolution`) with possibly different resolutions for different time segments
+        mode: "raw" downloads all datapoints in the range and interpolates them locally. "aggregates" lets CDF
+            interpolate (`interpolation` or `step_interpolation`, based on `is_step`) at the target granularity,
+            and only downloads raw datapoints at the boundaries. Recommended for long ranges.
+        cache: On-disk cache of raw datapoints, so only datapoints not already cached are downloaded.
+            Only used in "raw" mode.
+
+    Returns:
+        The interpolated datapoints as a Series per external id
+    """
+    retrieved_range_df = _retrieve_range(
+        client=client,
+        external_ids=external_ids,
+        start=start,
+        end=end,
+        resolution=resolution,
+        mode=mode,
+        cache=cache,
+    )
     return {col: retrieved_range_df[col].dropna() for col in retrieved_range_df.columns}
 
 
+def _datapoints_to_series(datapoints: Datapoints) -> pd.Series:
+    index = pd.DatetimeIndex(np.asarray(datapoints.timestamp, dtype="datetime64[ms]")).as_unit("ns")
+    return pd.Series(np.asarray(datapoints.value, dtype=float), index=index, name=datapoints.external_id)
+
+
+def _retrieve_window(
+    client: CogniteClient, external_ids: list[str], window_start: int, window_end: int, end: int
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Raw datapoints in the window, and the first datapoint after the window (before end) of each time series.
+
+    Both are retrieved in a single request.
+    """
+    in_window: dict[str, pd.Series] = {}
+    after_window: dict[str, pd.Series] = {}
+    queries = []
+    for external_id in external_ids:
+        queries.append((DatapointsQuery(external_id=external_id, start=window_start, end=window_end), in_window))
+        if window_end < end:
+            queries.append((DatapointsQuery(external_id=external_id, start=window_end, end=end, limit=1), after_window))
+    datapoints_list = client.time_series.data.retrieve(
+        external_id=[query for query, _ in queries], ignore_unknown_ids=True
+    )
+
+    # The results are returned in the order of the queries, but unknown ids are skipped
+    remaining = iter(queries)
+    for datapoints in datapoints_list:
+        query, target = next(remaining)
+        while query.identifier.as_primitive() != datapoints.external_id:
+            query, target = next(remaining)
+        if len(datapoints) > 0:
+            target[require(datapoints.external_id)] = _datapoints_to_series(datapoints)
+    return pd.DataFrame(in_window), pd.DataFrame(after_window)
+
+
+def _last_valid(df: pd.DataFrame) -> pd.DataFrame:
+    """The last valid datapoint of each column, with its original timestamp."""
+    last = {}
+    for column in df.columns:
+        valid = df[column].dropna()
+        if not valid.empty:
+            last[column] = valid.iloc[-1:]
+    return pd.DataFrame(last)
+
+
+def retrieve_range_in_windows(
+    client: CogniteClient,
+    external_ids: list[str],
+    start: int,
+    end: int,
+    resolution: TimeResolution = "1h",
+    window: timedelta = timedelta(days=30),
+) -> Iterator[pd.DataFrame]:
+    """Retrieve and interpolate raw datapoints between start and end one time window at a time.
+
+    Gives the same result as `retrieve_range` (in "raw" mode), but only the raw datapoints of one window are held in
+    memory at a time, so peak memory does not grow with the length of the range. The last datapoint of each time
+    series is carried over to the next window, and the first datapoint after each window is retrieved together with
+    the window, so linear interpolation is exact across window boundaries.
+
+    Args:
+        client: CogniteClient authenticated to the project to retrieve datapoints from
+        external_ids: External ids of the time series to retrieve
+        start: Start time in milliseconds since epoch
+        end: End time in milliseconds since epoch
+        resolution: Time resolution to interpolate the datapoints to, see `retrieve_range`
+        window: Length of the time windows to retrieve datapoints in
+
+    Yields:
+        The interpolated datapoints of each window, one column per time series. Timestamps before the first
+        datapoint of a time series are NaN.
+
+    Example:
+        ```python
+        for chunk in retrieve_range_in_windows(client, external_ids, start, end, window=timedelta(days=90)):
+            chunk.to_parquet(f"backfill_{chunk.index[0]:%Y%m%d}.parquet")
+        ```
+    """
+    window_ms = int(pd.Timedelta(window).total_seconds() * 1000)
+    if window_ms <= 0:
+        raise ValueError(f"Window must be positive, got {window}")
+    external_ids = list(dict.fromkeys(external_ids))
+    if not external_ids:
+        return
+
+    time_series = time_series_metadata_cache.retrieve(client, external_ids)
+    step_columns = [require(ts.external_id) for ts in time_series if ts.is_step]
+    linear_columns = [require(ts.external_id) for ts in time_series if not ts.is_step]
+    start_dt = pd.Timestamp(ms_to_datetime(start).replace(tzinfo=None))  # UTC implied
+    end_dt = pd.Timestamp(ms_to_datetime(end).replace(tzinfo=None))  # UTC implied
+    step: pd.Timedelta | None = None
+    segments_grid = pd.DatetimeIndex([], dtype="datetime64[ns]")
+    if isinstance(resolution, str | timedelta):
+        step = pd.Timedelta(resolution)
+    else:
+        segments_grid = _time_resolution_grid(
+            start_dt,
+            end_dt,
+            minutes_after_start=resolution.minutes_after_start,
+            time_resolution_minutes=resolution.time_resolution_minutes,
+        )
+
+    latest = _retrieve_latest_queries(client, [(external_id, start) for external_id in external_ids])
+    df_carry = _latest_to_frame(latest, external_ids, start, at_before=False)
+    grid_first, last_in_range = None, start_dt
+    for window_start in range(start, max(end, start + 1), window_ms):
+        window_end = min(window_start + window_ms, end)
+        is_last = window_end >= end
+        df_window, df_after = _retrieve_window(client, external_ids, window_start, window_end, end)
+        df_raw = df_window.combine_first(df_carry).combine_first(df_after)
+        if df_raw.empty:
+            # No datapoints before, in or after this window
+            break
+        if not df_window.empty:
+            last_in_range = max(last_in_range, df_window.index.max())
+
+        window_start_dt = pd.Timestamp(ms_to_datetime(window_start).replace(tzinfo=None))
+        window_end_dt = pd.Timestamp(ms_to_datetime(window_end).replace(tzinfo=None))
+        if step is not None:
+            # Anchored like `DataFrame.resample` at midnight of the first raw datapoint, which is in the first window
+            # (including the latest datapoints before start and the first datapoints after the window)
+            if grid_first is None:
+                first = df_raw.index.min()
+                grid_first = first.normalize() + ((first - first.normalize()) // step) * step
+            grid_start = grid_first + max(-((grid_first - window_start_dt) // step), 0) * step
+            grid = pd.date_range(grid_start, window_end_dt, freq=step, unit="ns")
+        else:
+            grid = segments_grid
+        grid = grid[(grid >= window_start_dt) & ((grid <= window_end_dt) if is_last else (grid < window_end_dt))]
+        if df_after.empty:
+            # No datapoints after this window, so the last datapoint in range ends the output, like `retrieve_range`
+            grid = grid[grid <= last_in_range]
+        yield _resample_to_grid(df_raw, grid, step_columns=step_columns, linear_columns=linear_columns)
+
+        if df_after.empty:
+            break
+        df_carry = _last_valid(df_window.combine_first(df_carry))
+
+
 # TODO: refactor
 # TODO: naming: time_series vs. datapoints
-def retrieve_latest(client: CogniteClient, external_ids: list[str | None], before: int) -> dict[str, pd.Series]:
+def retrieve_latest(
+    client: CogniteClient, external_ids: list[str | None], before: int, cache: DatapointCache | None = None
+) -> dict[str, pd.Series]:
     if not external_ids:
         return {}
     external_ids = remove_duplicates(external_ids)
     logger.debug(f"Retrieving {external_ids} before '{ms_to_datetime(before)}'")
+    if cache is not None:
+        known_external_ids = [xid for xid in external_ids if xid is not None]
+        latest = _retrieve_latest_cached(client, [(xid, before) for xid in known_external_ids], cache)
+        df_latest = _latest_to_frame(latest, known_external_ids, before, at_before=True)
+        return {column: df_latest[column] for column in df_latest.columns}
+
     time_series: DatapointsList = client.time_series.data.retrieve_latest(
         external_id=external_ids, before=before, ignore_unknown_ids=True
     )
@@ -128,25 +548,311 @@ def retrieve_latest(client: CogniteClient, external_ids: list[str | None], befor
     return res
 
 
-def retrieve_time_series_datapoints(  # type: ignore[no-untyped-def]
-    client: CogniteClient, mappings, start: int, end: int
-) -> dict[str, pd.Series]:
-    time_series_start = retrieve_latest(
-        client=client,
-        external_ids=[mapping.cdf_time_series for mapping in mappings if mapping.retrieve == "START"],
-        before=start,
-    )
-    time_series_end = retrieve_latest(
-        client=client,
-        external_ids=[mapping.cdf_time_series for mapping in mappings if mapping.retrieve == "END"],
-        before=end,
-    )
-    time_series_range = retrieve_range(
-        client=client,
-        external_ids=[mapping.cdf_time_series for mapping in mappings if mapping.retrieve == "RANGE"],
-        start=start,
-        end=end,
+@dataclass
+class _DatapointsRequestPlan:
+    """The CDF requests needed to retrieve datapoints for a set of attribute mappings.
+
+    Mappings retrieving START/END datapoints and the latest datapoints before start needed for RANGE mappings are
+    merged into a single `retrieve_latest` request, deduplicated by external id and `before` timestamp.
+
+    Args:
+        start: Start time in milliseconds since epoch
+        end: End time in milliseconds since epoch
+        start_external_ids: External ids to retrieve the latest datapoint before start for
+        end_external_ids: External ids to retrieve the latest datapoint before end for
+        range_external_ids: External ids to retrieve (interpolated) datapoints between start and end for
+        mode: How to retrieve datapoints for RANGE mappings, see `retrieve_range`
+    """
+
+    start: int
+    end: int
+    start_external_ids: list[str] = field(default_factory=list)
+    end_external_ids: list[str] = field(default_factory=list)
+    range_external_ids: list[str] = field(default_factory=list)
+    mode: RetrievalMode = "raw"
+
+    @classmethod
+    def from_mappings(
+        cls, mappings: Iterable, start: int, end: int, mode: RetrievalMode = "raw"
+    ) -> _DatapointsRequestPlan:
+        external_ids_by_retrieve: dict[str, dict[str, None]] = {"START": {}, "END": {}, "RANGE": {}}
+        for mapping in mappings:
+            if mapping.retrieve in external_ids_by_retrieve and mapping.cdf_time_series:
+                external_ids_by_retrieve[mapping.retrieve][mapping.cdf_time_series] = None
+        return cls(
+            start=start,
+            end=end,
+            start_external_ids=list(external_ids_by_retrieve["START"]),
+            end_external_ids=list(external_ids_by_retrieve["END"]),
+            range_external_ids=list(external_ids_by_retrieve["RANGE"]),
+            mode=mode,
+        )
+
+    @property
+    def latest_queries(self) -> list[tuple[str, int]]:
+        """Deduplicated (external id, before) pairs to retrieve the latest datapoint for."""
+        before_start = [
+            (external_id, self.start) for external_id in [*self.start_external_ids, *self.range_external_ids]
+        ]
+        before_end = [(external_id, self.end) for external_id in self.end_external_ids]
+        if self.mode == "aggregates":
+            # The last datapoints in range are needed to complete the aggregates at the end of the range
+            before_end += [(external_id, self.end) for external_id in self.range_external_ids]
+        return list(dict.fromkeys([*before_start, *before_end]))
+
+
+def _retrieve_latest_queries(
+    client: CogniteClient, queries: list[tuple[str, int]]
+) -> dict[tuple[str, int], Datapoints]:
+    """Retrieve the latest datapoints for many (external id, before) pairs in a single request."""
+    if not queries:
+        return {}
+    datapoints_list: DatapointsList = client.time_series.data.retrieve_latest(
+        external_id=[LatestDatapointQuery(external_id=external_id, before=before) for external_id, before in queries],
+        ignore_unknown_ids=True,
     )
+    # The results are returned in the order of the queries, but unknown ids are skipped
+    by_query: dict[tuple[str, int], Datapoints] = {}
+    remaining = iter(queries)
+    for datapoints in datapoints_list:
+        query = next(remaining)
+        while query[0] != datapoints.external_id:
+            query = next(remaining)
+        by_query[query] = datapoints
+    return by_query
+
+
+def _retrieve_latest_cached(
+    client: CogniteClient, queries: list[tuple[str, int]], cache: DatapointCache | None
+) -> dict[tuple[str, int], Datapoints]:
+    """Like `_retrieve_latest_queries`, but answering the queries covered by the cache without requesting CDF."""
+    if cache is None:
+        return _retrieve_latest_queries(client, queries)
+    latest = {
+        query: Datapoints(external_id=query[0], timestamp=[timestamp], value=[value])
+        for query, (timestamp, value) in cache.latest_before(client, queries).items()
+    }
+    latest.update(_retrieve_latest_queries(client, [query for query in queries if query not in latest]))
+    return latest
+
+
+def _latest_to_frame(
+    latest: dict[tuple[str, int], Datapoints], external_ids: list[str], before: int, at_before: bool
+) -> pd.DataFrame:
+    """The latest datapoints of `external_ids` as one column each.
+
+    If `at_before` is set, the datapoints are moved to the `before` timestamp (like `retrieve_latest` does), otherwise
+    they keep their original timestamps.
+    """
+    series = {}
+    for external_id in external_ids:
+        datapoints = latest.get((external_id, before))
+        if datapoints is None or len(datapoints) == 0:
+            continue
+        timestamp = np.array([before if at_before else datapoints.timestamp[0]], dtype="datetime64[ms]")
+        value = datapoints.value[0]  # type: ignore[index]
+        series[external_id] = pd.Series([value], index=pd.DatetimeIndex(timestamp).as_unit("ns"))
+    if at_before and (missing := set(external_ids).difference(series)):
+        logger.warning(f"Missing: {', '.join(map(str, missing))}")
+    return pd.DataFrame(series)
+
+
+def _retrieve_plan_range(
+    client: CogniteClient,
+    plan: _DatapointsRequestPlan,
+    time_series: TimeSeriesList,
+    resolution: TimeResolution,
+    cache: DatapointCache | None,
+) -> pd.DataFrame:
+    """Retrieve the datapoints between start and end for the RANGE time series of a plan."""
+    if plan.mode == "aggregates":
+        # The aggregate to request depends on the time series metadata
+        return _retrieve_aggregates(client, time_series, plan.start, plan.end, resolution)
+    elif cache is not None:
+        return cache.retrieve_dataframe(client, plan.range_external_ids, plan.start, plan.end)
+    return client.time_series.data.retrieve(
+        external_id=plan.range_external_ids, start=plan.start, end=plan.end, ignore_unknown_ids=True
+    ).to_pandas()
+
+
+def _assemble_planned_datapoints(
+    plan: _DatapointsRequestPlan,
+    latest: dict[tuple[str, int], Datapoints],
+    time_series: TimeSeriesList | None,
+    df_range: pd.DataFrame | None,
+    resolution: TimeResolution,
+) -> pd.DataFrame:
+    """Combine the responses to the requests of a plan into one DataFrame."""
+    frames = [
+        _latest_to_frame(latest, plan.start_external_ids, plan.start, at_before=True),
+        _latest_to_frame(latest, plan.end_external_ids, plan.end, at_before=True),
+    ]
+    if plan.range_external_ids and time_series is not None and df_range is not None:
+        if plan.mode == "aggregates":
+            df_latest = _boundary_datapoints(latest, plan.range_external_ids, plan.start, plan.end)
+        else:
+            df_latest = _latest_to_frame(latest, plan.range_external_ids, plan.start, at_before=False)
+        df_raw = _combine_with_latest(df_range, df_latest, plan.start)
+        frames.append(_resample_range(df_raw, time_series, plan.start, plan.end, resolution))
+
+    columns = [column for frame in frames for column in frame.columns]
+    if overlap := sorted({column for column in columns if columns.count(column) > 1}):
+        raise Exception(f"Key collision on '{overlap}' when merging dictionaries!")
+    if not columns:
+        return pd.DataFrame()
+    return pd.concat([frame for frame in frames if not frame.columns.empty], axis=1)
+
+
+def _retrieve_planned_datapoints(
+    client: CogniteClient,
+    plan: _DatapointsRequestPlan,
+    resolution: TimeResolution = "1h",
+    cache: DatapointCache | None = None,
+) -> pd.DataFrame:
+    """Execute a request plan, running the CDF requests concurrently, and return all datapoints in one DataFrame."""
+    time_series, df_range = None, None
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        latest_future = executor.submit(_retrieve_latest_cached, client, plan.latest_queries, cache)
+        if plan.range_external_ids:
+            start_dt, end_dt = ms_to_datetime(plan.start), ms_to_datetime(plan.end)
+            logger.debug(f"Retrieving {plan.range_external_ids} between '{start_dt}' and '{end_dt}'")
+            time_series_future = executor.submit(time_series_metadata_cache.retrieve, client, plan.range_external_ids)
+            if plan.mode == "aggregates":
+                range_future = executor.submit(
+                    lambda: _retrieve_plan_range(client, plan, time_series_future.result(), resolution, cache)
+                )
+            else:
+                range_future = executor.submit(
+                    _retrieve_plan_range, client, plan, TimeSeriesList([]), resolution, cache
+                )
+            time_series, df_range = time_series_future.result(), range_future.result()
+        latest = latest_future.result()
+    return _assemble_planned_datapoints(plan, latest, time_series, df_range, resolution)
+
+
+@dataclass(frozen=True)
+class DatapointsBlock:
+    """Datapoints of many time series aligned on one time axis, backed by NumPy arrays.
+
+    Missing values are NaN. Columns can be viewed as arrays without copying, e.g. by downstream transformations.
+
+    Args:
+        timestamps: The shared time axis, as a `datetime64[ns]` array of length T
+        matrix: A (T, N) float array, with one column per time series
+        columns: External ids of the N time series, in column order
+
+    Example:
+        >>> block = DatapointsBlock(
+        ...     timestamps=np.array(["2022-01-01T00", "2022-01-01T01"], dtype="datetime64[ns]"),
+        ...     matrix=np.array([[1.0, np.nan], [2.0, 3.0]]),
+        ...     columns=["a", "b"],
+        ... )
+        >>> block["b"]
+        array([nan,  3.])
+        >>> block.to_dict()["b"].tolist()
+        [3.0]
+    """
+
+    timestamps: np.ndarray
+    matrix: np.ndarray
+    columns: list[str]
+
+    def __post_init__(self) -> None:
+        if self.matrix.shape != (len(self.timestamps), len(self.columns)):
+            raise ValueError(
+                f"Expected matrix of shape {(len(self.timestamps), len(self.columns))}, got {self.matrix.shape}"
+            )
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> DatapointsBlock:
+        if df.columns.empty:
+            return cls(np.array([], dtype="datetime64[ns]"), np.empty((0, 0)), [])
+        return cls(
+            timestamps=df.index.to_numpy(dtype="datetime64[ns]"),
+            matrix=df.to_numpy(dtype=np.float64),
+            columns=[str(column) for column in df.columns],
+        )
+
+    def __getitem__(self, external_id: str) -> np.ndarray:
+        """The values of one time series, as a view into `matrix`."""
+        return self.matrix[:, self.columns.index(external_id)]
+
+    def __contains__(self, external_id: object) -> bool:
+        return external_id in self.columns
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def to_pandas(self) -> pd.DataFrame:
+        return pd.DataFrame(self.matrix, index=pd.DatetimeIndex(self.timestamps), columns=self.columns, copy=False)
+
+    def to_dict(self) -> dict[str, pd.Series]:
+        """The datapoints as a Series per external id without missing values, like `retrieve_time_series_datapoints`."""
+        index = pd.DatetimeIndex(self.timestamps)
+        result = {}
+        for i, external_id in enumerate(self.columns):
+            column = self.matrix[:, i]
+            valid = ~np.isnan(column)
+            result[external_id] = pd.Series(column[valid], index=index[valid], name=external_id)
+        return result
+
+
+@overload
+def retrieve_time_series_datapoints(
+    client: CogniteClient,
+    mappings: Iterable,
+    start: int,
+    end: int,
+    resolution: TimeResolution = ...,
+    mode: RetrievalMode = ...,
+    cache: DatapointCache | None = ...,
+    columnar: Literal[False] = ...,
+) -> dict[str, pd.Series]: ...
+
+
+@overload
+def retrieve_time_series_datapoints(
+    client: CogniteClient,
+    mappings: Iterable,
+    start: int,
+    end: int,
+    resolution: TimeResolution = ...,
+    mode: RetrievalMode = ...,
+    cache: DatapointCache | None = ...,
+    *,
+    columnar: Literal[True],
+) -> DatapointsBlock: ...
+
+
+def retrieve_time_series_datapoints(  # type: ignore[no-untyped-def]
+    client: CogniteClient,
+    mappings,
+    start: int,
+    end: int,
+    resolution: TimeResolution = "1h",
+    mode: RetrievalMode = "raw",
+    cache: DatapointCache | None = None,
+    columnar: bool = False,
+) -> dict[str, pd.Series] | DatapointsBlock:
+    """Retrieve datapoints for the time series of attribute mappings, based on `mapping.retrieve`.
+
+    All CDF requests are planned up front: START, END and RANGE mappings are merged into one `retrieve_latest`
+    request, which runs concurrently with the raw datapoints and metadata requests for the RANGE mappings.
+
+    Args:
+        client: CogniteClient authenticated to the project to retrieve datapoints from
+        mappings: Attribute mappings with `cdf_time_series` and `retrieve` ("START", "END", "RANGE" or None)
+        start: Start time in milliseconds since epoch
+        end: End time in milliseconds since epoch
+        resolution: Time resolution to interpolate RANGE datapoints to, see `retrieve_range`
+        mode: How to retrieve datapoints for RANGE mappings, see `retrieve_range`
+        cache: On-disk cache of raw datapoints, see `retrieve_range`
+        columnar: Return all datapoints as one `DatapointsBlock` aligned on a shared time axis, instead of a Series
+            per external id
+
+    Returns:
+        The datapoints as a Series per external id, or as a `DatapointsBlock` if `columnar` is set
+    """
     _time_series_none = [
         ".".join(filter(None, [mapping.shop_object_type, mapping.shop_object_name, mapping.shop_attribute_name]))
         for mapping in mappings
@@ -154,7 +860,118 @@ def retrieve_time_series_datapoints(  # type: ignore[no-untyped-def]
     ]
     logger.debug(f"Not retrieving datapoints for {_time_series_none}")
 
-    return merge_dicts(time_series_start, time_series_end, time_series_range)
+    plan = _DatapointsRequestPlan.from_mappings(mappings, start=start, end=end, mode=mode)
+    df_datapoints = _retrieve_planned_datapoints(client, plan, resolution=resolution, cache=cache)
+    if columnar:
+        return DatapointsBlock.from_dataframe(df_datapoints)
+    return {column: df_datapoints[column].dropna() for column in df_datapoints.columns}
+
+
+async def _run_limited(semaphore: asyncio.Semaphore, function: Callable[..., _T], *args: object) -> _T:
+    """Run a blocking CDF request in the default executor, once the semaphore allows it."""
+    async with semaphore:
+        return await asyncio.to_thread(function, *args)
+
+
+async def _retrieve_planned_datapoints_async(
+    client: CogniteClient,
+    plan: _DatapointsRequestPlan,
+    resolution: TimeResolution,
+    cache: DatapointCache | None,
+    semaphore: asyncio.Semaphore,
+) -> pd.DataFrame:
+    """Async version of `_retrieve_planned_datapoints`, running the CDF requests under the semaphore."""
+    latest_task = asyncio.create_task(
+        _run_limited(semaphore, _retrieve_latest_cached, client, plan.latest_queries, cache)
+    )
+    time_series, df_range = None, None
+    if plan.range_external_ids:
+        start_dt, end_dt = ms_to_datetime(plan.start), ms_to_datetime(plan.end)
+        logger.debug(f"Retrieving {plan.range_external_ids} between '{start_dt}' and '{end_dt}'")
+        time_series_task = asyncio.create_task(
+            _run_limited(semaphore, time_series_metadata_cache.retrieve, client, plan.range_external_ids)
+        )
+        if plan.mode == "aggregates":
+            # The aggregate to request depends on the time series metadata
+            time_series = await time_series_task
+            df_range = await _run_limited(semaphore, _retrieve_plan_range, client, plan, time_series, resolution, cache)
+        else:
+            time_series, df_range = await asyncio.gather(
+                time_series_task,
+                _run_limited(semaphore, _retrieve_plan_range, client, plan, TimeSeriesList([]), resolution, cache),
+            )
+    latest = await latest_task
+    return _assemble_planned_datapoints(plan, latest, time_series, df_range, resolution)
+
+
+async def retrieve_range_async(
+    client: CogniteClient,
+    external_ids: list[str],
+    start: int,
+    end: int,
+    resolution: TimeResolution = "1h",
+    mode: RetrievalMode = "raw",
+    cache: DatapointCache | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> dict[str, pd.Series]:
+    """Async version of `retrieve_range`, running the CDF requests concurrently.
+
+    Args:
+        client: CogniteClient authenticated to the project to retrieve datapoints from
+        external_ids: External ids of the time series to retrieve
+        start: Start time in milliseconds since epoch
+        end: End time in milliseconds since epoch
+        resolution: Time resolution to interpolate the datapoints to, see `retrieve_range`
+        mode: How to retrieve the datapoints, see `retrieve_range`
+        cache: On-disk cache of raw datapoints, see `retrieve_range`
+        semaphore: Limits the number of concurrent CDF requests. Share one semaphore between calls to bound the total
+            number of requests, e.g. when preprocessing many scenarios in one event loop. Defaults to a new semaphore
+            allowing `DEFAULT_MAX_CONCURRENCY` requests.
+
+    Returns:
+        The interpolated datapoints as a Series per external id
+
+    Example:
+        ```python
+        semaphore = asyncio.Semaphore(10)
+        results = await asyncio.gather(
+            *(retrieve_range_async(client, external_ids, start, end, semaphore=semaphore) for start, end in periods)
+        )
+        ```
+    """
+    plan = _DatapointsRequestPlan(start=start, end=end, range_external_ids=list(dict.fromkeys(external_ids)), mode=mode)
+    semaphore = semaphore or asyncio.Semaphore(DEFAULT_MAX_CONCURRENCY)
+    df_range = await _retrieve_planned_datapoints_async(client, plan, resolution, cache, semaphore)
+    return {col: df_range[col].dropna() for col in df_range.columns}
+
+
+async def retrieve_latest_async(
+    client: CogniteClient,
+    external_ids: list[str | None],
+    before: int,
+    cache: DatapointCache | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> dict[str, pd.Series]:
+    """Async version of `retrieve_latest`. See `retrieve_range_async` for `semaphore`."""
+    semaphore = semaphore or asyncio.Semaphore(DEFAULT_MAX_CONCURRENCY)
+    return await _run_limited(semaphore, retrieve_latest, client, external_ids, before, cache)
+
+
+async def retrieve_time_series_datapoints_async(  # type: ignore[no-untyped-def]
+    client: CogniteClient,
+    mappings,
+    start: int,
+    end: int,
+    resolution: TimeResolution = "1h",
+    mode: RetrievalMode = "raw",
+    cache: DatapointCache | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> dict[str, pd.Series]:
+    """Async version of `retrieve_time_series_datapoints`. See `retrieve_range_async` for `semaphore`."""
+    plan = _DatapointsRequestPlan.from_mappings(mappings, start=start, end=end, mode=mode)
+    semaphore = semaphore or asyncio.Semaphore(DEFAULT_MAX_CONCURRENCY)
+    df_datapoints = await _retrieve_planned_datapoints_async(client, plan, resolution, cache, semaphore)
+    return {column: df_datapoints[column].dropna() for column in df_datapoints.columns}
 
 
 def get_data_set_from_config(client: PowerOpsClient, data_set_type: DataSetType = "READ") -> DataSet:
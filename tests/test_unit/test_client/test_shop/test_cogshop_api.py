@@ -1,10 +1,28 @@
 import datetime
+import http.server
+import threading
 from unittest import mock
 
+import numpy as np
+import pandas as pd
 import pytest
+import requests
+from cognite.client import data_modeling as dm
+from cognite.client.data_classes import DatapointsArray
+from urllib3.response import HTTPResponse
 
-from cognite.powerops.client._generated.data_classes import ShopCaseWrite, ShopModelWrite, ShopScenarioWrite
+from cognite.powerops.client._generated._api._core import GraphQLQueryResponse
+from cognite.powerops.client._generated.data_classes import (
+    DataRecord,
+    ShopCase,
+    ShopCaseWrite,
+    ShopModelWrite,
+    ShopScenarioWrite,
+)
 from cognite.powerops.client.shop.cogshop_api import CogShopAPI
+from cognite.powerops.client.shop.http import JitteredRetry
+
+DATA_RECORD = DataRecord(version=1, last_updated_time=0, created_time=0)
 
 
 @pytest.fixture
@@ -27,6 +45,34 @@ def cogshop_api(mock_cdf, mock_po):
     return CogShopAPI(mock_cdf, mock_po)
 
 
+@pytest.fixture
+def cshaas_server():
+    """A local CShaaS stand-in answering trigger requests with the queued responses, then 200."""
+    responses: list[tuple[int, dict[str, str]]] = []
+    requests_received: list[bytes] = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            requests_received.append(self.rfile.read(int(self.headers["Content-Length"])))
+            status, headers = responses.pop(0) if responses else (200, {})
+            self.send_response(status)
+            for name, value in {**headers, "Content-Length": "0"}.items():
+                self.send_header(name, value)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/run-shop-as-service", responses, requests_received
+    server.shutdown()
+    server.server_close()
+
+
 class TestCogShopAPI:
     def test_init_default(self, mock_cdf, mock_po):
         api = CogShopAPI(mock_cdf, mock_po)
@@ -104,3 +150,289 @@ class TestShopCaseMethods:
         assert shop_case.scenario.model.external_id == "test_model_ext_id"
         assert shop_case.scenario.model.name == "test_model"
         assert shop_case.scenario.model.shop_version == "16.0.2"
+
+
+class TestTriggerShopCases:
+    def test_trigger_shop_cases_batches_runs_and_upserts_once(self, cogshop_api, mock_po):
+        with mock.patch.object(cogshop_api._session, "post") as post:
+            result = cogshop_api.trigger_shop_cases(
+                [f"case_{i}" for i in range(5)] + ["case_0"], write_classic_ts=False, batch_size=2
+            )
+
+        assert result.triggered == [f"case_{i}" for i in range(5)]
+        assert result.failed == {}
+        bodies = [call.kwargs["json"] for call in post.call_args_list]
+        assert [[run["case_external_id"] for run in body["runs"]] for body in bodies] == [
+            ["case_0", "case_1"],
+            ["case_2", "case_3"],
+            ["case_4"],
+        ]
+        assert all(body["mode"] == "fdm" and not body["runs"][0]["write_classic_ts"] for body in bodies)
+        mock_po.upsert.assert_called_once()
+        (updates,) = mock_po.upsert.call_args.args
+        assert [(update.external_id, update.status) for update in updates] == [
+            (f"case_{i}", "triggered") for i in range(5)
+        ]
+
+    def test_trigger_shop_cases_reports_failed_batches(self, cogshop_api, mock_po):
+        error = requests.HTTPError("503 Server Error")
+        response = mock.Mock()
+        response.raise_for_status.side_effect = [None, error]
+        with mock.patch.object(cogshop_api._session, "post", return_value=response):
+            result = cogshop_api.trigger_shop_cases(["case_0", "case_1", "case_2"], batch_size=2)
+
+        assert result.triggered == ["case_0", "case_1"]
+        assert result.failed == {"case_2": error}
+        (updates,) = mock_po.upsert.call_args.args
+        assert [update.external_id for update in updates] == ["case_0", "case_1"]
+
+
+class TestCogShopSession:
+    def test_session_pools_and_retries_cshaas_requests(self, mock_cdf, mock_po):
+        api = CogShopAPI(mock_cdf, mock_po, pool_size=4, max_retries=3)
+
+        adapter = api._session.get_adapter(api._shop_url_cshaas())
+        assert adapter._pool_maxsize == 4
+        assert adapter.max_retries.total == 3
+        assert adapter.max_retries.read == 0
+        assert adapter.max_retries.is_retry("POST", 503, has_retry_after=True)
+        assert not adapter.max_retries.is_retry("POST", 503)
+        assert not adapter.max_retries.is_retry("POST", 502)
+
+    @pytest.mark.parametrize("status", [500, 502, 504])
+    def test_trigger_is_not_retried_after_server_error(self, cogshop_api, mock_cdf, mock_po, cshaas_server, status):
+        url, responses, requests_received = cshaas_server
+        responses.append((status, {}))
+        mock_cdf._config.credentials.authorization_header.return_value = ("Authorization", "Bearer token")
+
+        with mock.patch.object(cogshop_api, "_shop_url_cshaas", return_value=url):
+            with pytest.raises(requests.HTTPError):
+                cogshop_api.trigger_shop_case("case_0")
+
+        # CShaaS may have started the run, so it must not be triggered again
+        assert len(requests_received) == 1
+        mock_po.upsert.assert_not_called()
+
+    def test_trigger_is_retried_when_rejected_with_retry_after(self, cogshop_api, mock_cdf, cshaas_server):
+        url, responses, requests_received = cshaas_server
+        responses.extend([(429, {"Retry-After": "0"}), (503, {"Retry-After": "0"})])
+        mock_cdf._config.credentials.authorization_header.return_value = ("Authorization", "Bearer token")
+
+        with mock.patch.object(cogshop_api, "_shop_url_cshaas", return_value=url):
+            cogshop_api.trigger_shop_case("case_0")
+
+        assert len(requests_received) == 3
+
+    def test_retry_honors_retry_after(self):
+        retry = JitteredRetry(total=3, backoff_factor=10, jitter=1, respect_retry_after_header=True)
+        response = HTTPResponse(status=429, headers={"Retry-After": "2"})
+
+        assert retry.get_retry_after(response) == 2
+        with mock.patch("time.sleep") as sleep:
+            retry.sleep(response)
+        sleep.assert_called_once_with(2)
+
+    def test_timings_separate_cshaas_and_cdf(self, cogshop_api, mock_po):
+        with mock.patch.object(cogshop_api._session, "post"):
+            cogshop_api.trigger_shop_case("case_0")
+        cogshop_api.retrieve_shop_case("case_0")
+
+        assert cogshop_api.timings.cshaas.count == 1
+        assert cogshop_api.timings.cdf.count == 2
+
+
+class TestWaitForCases:
+    @staticmethod
+    def _cases(*external_ids: str, status: str = "completed") -> list[ShopCase]:
+        return [
+            ShopCase(external_id=external_id, status=status, data_record=DATA_RECORD) for external_id in external_ids
+        ]
+
+    def test_wait_for_cases_yields_cases_as_they_finish(self, cogshop_api, mock_po):
+        shop_case_api = mock_po.shop_based_day_ahead_bid_process.shop_case
+        shop_case_api.list.side_effect = [
+            [],
+            [],
+            self._cases("case_1"),
+            [],
+            self._cases("case_0", "case_2", status="failed"),
+        ]
+
+        with mock.patch("time.sleep") as sleep:
+            finished = list(cogshop_api.wait_for_cases(["case_0", "case_1", "case_2"], poll_interval=1))
+
+        assert [(case.external_id, case.status) for case in finished] == [
+            ("case_1", "completed"),
+            ("case_0", "failed"),
+            ("case_2", "failed"),
+        ]
+        # Backs off while nothing finishes, and polls only the pending cases
+        assert [call.args[0] for call in sleep.call_args_list] == [2, 4, 1, 2]
+        assert shop_case_api.list.call_args.kwargs["filter"].dump()["in"]["values"] == ["case_0", "case_2"]
+
+    def test_wait_for_cases_times_out(self, cogshop_api, mock_po):
+        mock_po.shop_based_day_ahead_bid_process.shop_case.list.return_value = self._cases("case_0")
+
+        with mock.patch("time.sleep"), mock.patch("time.monotonic", side_effect=[0, 5, 11]):
+            waiting = cogshop_api.wait_for_cases(["case_0", "case_1"], timeout=10)
+            assert next(waiting).external_id == "case_0"
+            with pytest.raises(TimeoutError, match="case_1"):
+                next(waiting)
+
+
+def _output_time_series_page(result_external_id: str, attributes: list[str], end_cursor: str | None = None) -> dict:
+    return {
+        "items": [
+            {
+                "externalId": f"{result_external_id}_{attribute}",
+                "space": "power_ops_instances",
+                "createdTime": "2023-10-01T00:00:00Z",
+                "lastUpdatedTime": "2023-10-01T00:00:00Z",
+                "objectType": "generator",
+                "objectName": "G1",
+                "attributeName": attribute,
+                "timeSeries": {"externalId": f"{result_external_id}/{attribute}"},
+            }
+            for attribute in attributes
+        ],
+        "pageInfo": {"hasNextPage": end_cursor is not None, "endCursor": end_cursor},
+    }
+
+
+def _shop_result_item(
+    external_id: str, case_external_id: str, created_time: str, attributes: list[str], end_cursor: str | None = None
+) -> dict:
+    return {
+        "__typename": "ShopResult",
+        "externalId": external_id,
+        "space": "power_ops_instances",
+        "createdTime": created_time,
+        "lastUpdatedTime": created_time,
+        "case": {
+            "externalId": case_external_id,
+            "space": "power_ops_instances",
+            "startTime": "2023-10-01T00:00:00Z",
+            "endTime": "2023-10-01T03:00:00Z",
+            "createdTime": created_time,
+            "lastUpdatedTime": created_time,
+        },
+        "outputTimeSeries": _output_time_series_page(external_id, attributes, end_cursor),
+    }
+
+
+class TestFetchResults:
+    def test_fetch_results_returns_wide_frame(self, cogshop_api, mock_cdf, mock_po):
+        responses = [
+            {
+                "listShopResult": {
+                    "items": [
+                        _shop_result_item("old_result", "case_0", "2023-09-30T00:00:00Z", ["production"]),
+                        _shop_result_item(
+                            "result_1", "case_1", "2023-10-01T00:00:00Z", ["discharge"], end_cursor="output_cursor"
+                        ),
+                    ],
+                    "pageInfo": {"hasNextPage": True, "endCursor": "cursor"},
+                }
+            },
+            {
+                "listShopResult": {
+                    "items": [_shop_result_item("result_0", "case_0", "2023-10-01T00:00:00Z", ["production"])],
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                }
+            },
+            # The second page of the output time series of result_1
+            {
+                "getShopResultById": {
+                    "items": [{"outputTimeSeries": _output_time_series_page("result_1", ["production"])}]
+                }
+            },
+        ]
+        mock_cdf.data_modeling.graphql.query.side_effect = responses
+        timestamps = np.array(["2023-10-01T00:00", "2023-10-01T01:00", "2023-10-01T02:00"], dtype="datetime64[ms]")
+        mock_cdf.time_series.data.retrieve_arrays.return_value = [
+            DatapointsArray(external_id="result_0/production", timestamp=timestamps[:2], value=np.array([1.0, 2.0])),
+            DatapointsArray(external_id="result_1/production", timestamp=timestamps[1:], value=np.array([3.0, 4.0])),
+        ]
+
+        results = cogshop_api.fetch_results(["case_0", "case_1", "case_2"], attributes=["production"])
+
+        graphql_calls = mock_cdf.data_modeling.graphql.query.call_args_list
+        data_model_id = mock_po.shop_based_day_ahead_bid_process._data_model_id
+        assert [call.args[0] for call in graphql_calls] == [data_model_id] * 3
+        assert [call.args[2]["after"] for call in graphql_calls] == [None, "cursor", "output_cursor"]
+        assert graphql_calls[2].args[2]["externalId"] == "result_1"
+        queries = mock_cdf.time_series.data.retrieve_arrays.call_args.kwargs["external_id"]
+        assert [query.identifier.as_primitive() for query in queries] == ["result_0/production", "result_1/production"]
+        assert list(results.index.names) == ["case", "object_type", "object_name", "attribute"]
+        assert results.index.tolist() == [
+            ("case_0", "generator", "G1", "production"),
+            ("case_1", "generator", "G1", "production"),
+        ]
+        np.testing.assert_array_equal(results.to_numpy(), [[1.0, 2.0, np.nan], [np.nan, 3.0, 4.0]])
+        assert results.columns.tolist() == [pd.Timestamp(timestamp) for timestamp in timestamps]
+
+
+def _shop_case_item(external_id: str) -> dict:
+    return {
+        "__typename": "ShopCase",
+        "externalId": external_id,
+        "space": "power_ops_instances",
+        "createdTime": "2023-10-01T00:00:00Z",
+        "lastUpdatedTime": "2023-10-01T00:00:00Z",
+        "status": "completed",
+        "scenario": {
+            "externalId": "scenario",
+            "space": "power_ops_instances",
+            "name": "scenario",
+            "createdTime": "2023-10-01T00:00:00Z",
+            "lastUpdatedTime": "2023-10-01T00:00:00Z",
+            "model": {
+                "externalId": "model",
+                "space": "power_ops_instances",
+                "name": "model",
+                "shopVersion": "16.0.2",
+                "createdTime": "2023-10-01T00:00:00Z",
+                "lastUpdatedTime": "2023-10-01T00:00:00Z",
+            },
+        },
+        "shopFiles": {
+            "items": [
+                {
+                    "externalId": f"{external_id}_file_{order}",
+                    "space": "power_ops_instances",
+                    "name": f"file_{order}",
+                    "label": f"file_{order}",
+                    "isAscii": False,
+                    "order": order,
+                    "fileReference": {"externalId": f"file_{order}"},
+                    "createdTime": "2023-10-01T00:00:00Z",
+                    "lastUpdatedTime": "2023-10-01T00:00:00Z",
+                }
+                for order in (1, 2)
+            ]
+        },
+    }
+
+
+class TestRetrieveShopCasesGraphQL:
+    def test_retrieve_shop_cases_graphql_paginates_and_keeps_order(self, cogshop_api, mock_po):
+        pages = [
+            {"items": [_shop_case_item("case_2")], "pageInfo": {"hasNextPage": True, "endCursor": "cursor"}},
+            {"items": [_shop_case_item("case_0")], "pageInfo": {"hasNextPage": False, "endCursor": None}},
+        ]
+        data_model_id = dm.DataModelId("power_ops_core", "compute_ShopBasedDayAhead", "1")
+        mock_po.shop_based_day_ahead_bid_process.graphql_query.side_effect = [
+            GraphQLQueryResponse(data_model_id).parse({"listShopCase": page}) for page in pages
+        ]
+
+        shop_cases = cogshop_api.retrieve_shop_cases_graphql(["case_0", "case_1", "case_2"])
+
+        graphql_calls = mock_po.shop_based_day_ahead_bid_process.graphql_query.call_args_list
+        assert [call.args[1] for call in graphql_calls] == [
+            {"externalIds": ["case_0", "case_1", "case_2"], "space": "power_ops_instances", "after": after}
+            for after in [None, "cursor"]
+        ]
+        assert [shop_case.external_id for shop_case in shop_cases] == ["case_0", "case_2"]
+        assert all(isinstance(shop_case, ShopCase) for shop_case in shop_cases)
+        assert shop_cases[0].scenario.model.name == "model"
+        assert [shop_file.order for shop_file in shop_cases[0].shop_files] == [1, 2]
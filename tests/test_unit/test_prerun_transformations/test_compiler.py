@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cognite.powerops.prerun_transformations.compiler import _Kernel, compile_transformations
+from cognite.powerops.prerun_transformations.transformations import (
+    AddConstant,
+    AddFromOffset,
+    DoNothing,
+    HeightToVolume,
+    MultiplyConstant,
+    MultiplyFromOffset,
+    OneIfTwo,
+    RelativeDatapoint,
+    Round,
+    SumTimeseries,
+    ToBool,
+    ToInt,
+    Transformation,
+    ZeroIfNotOne,
+)
+
+
+def _height_to_volume() -> HeightToVolume:
+    transformation = HeightToVolume(object_type="reservoir", object_name="reservoir1")
+    model = {"reservoir": {"reservoir1": {"vol_head": {"x": [10, 20, 40, 80, 160], "y": [2, 4, 6, 8, 10]}}}}
+    transformation.pre_apply(client=None, shop_model=model, start=0, end=0)
+    return transformation
+
+
+def _relative_datapoints(*offsets: tuple[float, float]) -> list[RelativeDatapoint]:
+    return [RelativeDatapoint(offset_minute=minute, offset_value=value) for minute, value in offsets]
+
+
+def _apply_one_by_one(transformations: list[Transformation], time_series_data: tuple[pd.Series, ...]) -> pd.Series:
+    for transformation in transformations:
+        time_series_data = (transformation.apply(time_series_data),)
+    return time_series_data[0]
+
+
+CHAINS = [
+    pytest.param(
+        [
+            AddFromOffset(relative_datapoints=_relative_datapoints((0, 1), (20, -2), (230, 3))),
+            MultiplyConstant(constant=1.5),
+            Round(digits=0),
+            ToInt(),
+        ],
+        id="AddFromOffset, MultiplyConstant, Round, ToInt",
+    ),
+    pytest.param(
+        [AddConstant(constant=-1), ToBool(), MultiplyConstant(constant=3), DoNothing()],
+        id="AddConstant, ToBool, MultiplyConstant, DoNothing",
+    ),
+    pytest.param(
+        [
+            MultiplyFromOffset(relative_datapoints=_relative_datapoints((30, 2), (90, 0), (150, 1.5))),
+            AddFromOffset(relative_datapoints=_relative_datapoints((45, 1))),
+            Round(digits=1),
+        ],
+        id="MultiplyFromOffset, AddFromOffset, Round",
+    ),
+    pytest.param([ZeroIfNotOne(), OneIfTwo()], id="ZeroIfNotOne, OneIfTwo"),
+    pytest.param([MultiplyConstant(constant=2), _height_to_volume(), Round(digits=2)], id="with HeightToVolume"),
+    pytest.param([SumTimeseries(), AddConstant(constant=1), ToInt()], id="SumTimeseries first"),
+]
+
+
+@pytest.mark.parametrize("transformations", CHAINS)
+@pytest.mark.parametrize("dtype", ["float64", "int64"])
+def test_compiled_transformations_match_one_by_one(transformations: list[Transformation], dtype: str):
+    rng = np.random.default_rng(0)
+    index = pd.date_range(datetime(2022, 1, 1), periods=8, freq="1h")
+    time_series_data = (
+        pd.Series(rng.integers(-2, 10, size=len(index)).astype(dtype), index=index, name="first"),
+        pd.Series(rng.integers(0, 3, size=4).astype(dtype), index=index[::2], name="second"),
+    )
+
+    expected = _apply_one_by_one(transformations, time_series_data)
+    output = compile_transformations(transformations).apply(time_series_data)
+
+    pd.testing.assert_series_equal(output, expected)
+
+
+def test_compile_transformations_fuses_consecutive_transformations():
+    transformations = [
+        SumTimeseries(),
+        AddFromOffset(relative_datapoints=_relative_datapoints((0, 1))),
+        MultiplyConstant(constant=2),
+        ToInt(),
+    ]
+
+    compiled = compile_transformations(transformations)
+
+    assert len(compiled.stages) == 2
+    assert isinstance(compiled.stages[1], _Kernel)
+    assert compiled.stages[1].transformations == transformations[1:]
+
+
+def test_compiled_to_int_raises_on_missing_values():
+    time_series = pd.Series([1.0, np.nan], index=pd.date_range("2022-01-01", periods=2, freq="1h"))
+
+    with pytest.raises(ValueError):
+        compile_transformations([AddConstant(constant=1), ToInt()]).apply((time_series,))
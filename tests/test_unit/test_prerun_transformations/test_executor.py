@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cognite.powerops.prerun_transformations.executor import TransformationError, apply_transformations
+from cognite.powerops.prerun_transformations.plans import TransformationPlan
+from cognite.powerops.prerun_transformations.transformations import (
+    AddConstant,
+    AddFromOffset,
+    MultiplyConstant,
+    RelativeDatapoint,
+    Round,
+    ToInt,
+    Transformation,
+)
+
+
+def _apply_one_by_one(transformations: list[Transformation], time_series: pd.Series) -> pd.Series:
+    for transformation in transformations:
+        time_series = transformation.apply((time_series,))
+    return time_series
+
+
+@pytest.fixture()
+def mappings() -> dict[str, list[Transformation]]:
+    return {
+        f"mapping_{i}": [
+            AddFromOffset(relative_datapoints=[RelativeDatapoint(offset_minute=30 * i, offset_value=i)]),
+            MultiplyConstant(constant=1 + i / 10),
+            Round(digits=1),
+        ]
+        for i in range(20)
+    }
+
+
+@pytest.fixture()
+def inputs(mappings: dict[str, list[Transformation]]) -> dict[str, tuple[pd.Series, ...]]:
+    rng = np.random.default_rng(0)
+    index = pd.date_range(datetime(2022, 1, 1), periods=48, freq="1h")
+    return {mapping_id: (pd.Series(rng.random(len(index)), index=index),) for mapping_id in mappings}
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_apply_transformations_matches_sequential(
+    mappings: dict[str, list[Transformation]], inputs: dict[str, tuple[pd.Series, ...]], executor: str
+):
+    results = apply_transformations(mappings, inputs, executor=executor, max_workers=4)
+
+    assert not results.errors
+    assert list(results.outputs) == list(mappings)
+    for mapping_id, transformations in mappings.items():
+        expected = _apply_one_by_one(transformations, inputs[mapping_id][0])
+        pd.testing.assert_series_equal(results.outputs[mapping_id], expected)
+
+
+def test_apply_transformations_reports_errors_per_mapping(inputs: dict[str, tuple[pd.Series, ...]]):
+    time_series = inputs["mapping_0"][0].copy()
+    time_series.iloc[3] = np.nan
+    transformations = {
+        "ok": TransformationPlan([AddConstant(constant=1)]),
+        "nan_to_int": [ToInt()],
+        "missing_input": [AddConstant(constant=1)],
+    }
+
+    results = apply_transformations(transformations, {"ok": (time_series,), "nan_to_int": (time_series,)})
+
+    assert list(results.outputs) == ["ok"]
+    assert list(results.errors) == ["nan_to_int", "missing_input"]
+    assert isinstance(results.errors["nan_to_int"], ValueError)
+    assert isinstance(results.errors["missing_input"], KeyError)
+    with pytest.raises(TransformationError, match="2 mapping"):
+        results.raise_for_errors()
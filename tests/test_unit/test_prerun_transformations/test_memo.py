@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from cognite.powerops.prerun_transformations.memo import TransformationMemo
+from cognite.powerops.prerun_transformations.transformations import (
+    AddFromOffset,
+    MultiplyConstant,
+    RelativeDatapoint,
+    Round,
+    StaticValues,
+    Transformation,
+    ms_to_datetime_tz_naive,
+)
+
+
+@pytest.fixture()
+def time_series() -> pd.Series:
+    index = pd.date_range(datetime(2022, 1, 1), periods=4, freq="1h")
+    return pd.Series([1.0, 2.5, 3.0, 4.5], index=index, name="price")
+
+
+def _chain(constant: float) -> list[Transformation]:
+    return [
+        AddFromOffset(relative_datapoints=[RelativeDatapoint(offset_minute=60, offset_value=1)]),
+        MultiplyConstant(constant=constant),
+        Round(digits=0),
+    ]
+
+
+def _apply_one_by_one(transformations: list[Transformation], time_series: pd.Series) -> pd.Series:
+    for transformation in transformations:
+        time_series = transformation.apply((time_series,))
+    return time_series
+
+
+def test_memo_computes_identical_chains_once(time_series: pd.Series):
+    memo = TransformationMemo(maxsize=10)
+
+    first = memo.apply(_chain(2), (time_series,))
+    second = memo.apply(_chain(2), (time_series.copy(),))
+    other_parameters = memo.apply(_chain(3), (time_series,))
+    other_input = memo.apply(_chain(2), (time_series + 1,))
+
+    assert (memo.hits, memo.misses) == (1, 3)
+    pd.testing.assert_series_equal(first, second)
+    pd.testing.assert_series_equal(first, _apply_one_by_one(_chain(2), time_series))
+    assert not other_parameters.equals(first)
+    assert not other_input.equals(first)
+
+
+def test_memo_returns_copies(time_series: pd.Series):
+    memo = TransformationMemo(maxsize=10)
+
+    output = memo.apply(_chain(2), (time_series,))
+    output.iloc[0] = 1000
+
+    assert memo.apply(_chain(2), (time_series,)).iloc[0] != 1000
+
+
+def test_memo_evicts_least_recently_used(time_series: pd.Series):
+    memo = TransformationMemo(maxsize=2)
+
+    for constant in [1, 2, 3]:
+        memo.apply(_chain(constant), (time_series,))
+    memo.apply(_chain(1), (time_series,))
+
+    assert len(memo) == 2
+    assert (memo.hits, memo.misses) == (0, 4)
+
+
+def test_memo_skips_dynamic_transformations(time_series: pd.Series):
+    memo = TransformationMemo(maxsize=10)
+    static_values = StaticValues(relative_datapoints=[RelativeDatapoint(offset_minute=0, offset_value=42)])
+
+    for start in [0, 3600 * 1000]:
+        static_values.pre_apply(client=None, shop_model={}, start=start, end=0)
+        output = memo.apply([static_values], (time_series,))
+        assert output.index[0] == ms_to_datetime_tz_naive(start)
+
+    assert len(memo) == 0
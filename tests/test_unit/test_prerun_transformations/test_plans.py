@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from cognite.powerops.client._generated.data_classes import DataRecord, ShopAttributeMapping
+from cognite.powerops.prerun_transformations import plans
+from cognite.powerops.prerun_transformations.plans import TransformationPlanCache
+from cognite.powerops.prerun_transformations.transformations import AddConstant, MultiplyConstant, StaticValues
+
+
+def _mapping(
+    external_id: str, last_updated_time: int, constant: float, with_static_values: bool = True
+) -> ShopAttributeMapping:
+    static_values = {
+        "StaticValues": {"parameters": {"relative_datapoints": [{"offset_minute": 0, "offset_value": 42}]}}
+    }
+    return ShopAttributeMapping(
+        external_id=external_id,
+        space="power_ops_instances",
+        object_type="market",
+        object_name="Dayahead",
+        attribute_name="buy_price",
+        transformations=[
+            {"MultiplyConstant": {"parameters": {"constant": constant}}},
+            {"AddConstant": {"parameters": {"constant": 1.0}}},
+            *([static_values] if with_static_values else []),
+        ],
+        data_record=DataRecord(last_updated_time=last_updated_time, created_time=0, version=1),
+    )
+
+
+@pytest.fixture()
+def count_loads(monkeypatch) -> list[int]:
+    loads = []
+    load_transformations = plans.load_transformations
+
+    def counting(transformations):
+        loads.append(len(transformations))
+        return load_transformations(transformations)
+
+    monkeypatch.setattr(plans, "load_transformations", counting)
+    return loads
+
+
+def test_plan_cache_loads_each_mapping_version_once(count_loads: list[int]):
+    cache = TransformationPlanCache()
+
+    first = cache.get_many([_mapping("a", 1, 2.0), _mapping("b", 1, 3.0)])
+    second = cache.get_many([_mapping("a", 1, 2.0), _mapping("b", 2, 4.0)])
+
+    assert count_loads == [3, 3, 3]
+    assert isinstance(first["a"].transformations[0], MultiplyConstant)
+    assert isinstance(first["a"].transformations[1], AddConstant)
+    assert first["a"].transformations[0] is second["a"].transformations[0]
+    assert second["b"].transformations[0].constant == 4.0
+
+
+def test_plan_cache_copies_dynamic_transformations():
+    cache = TransformationPlanCache()
+    first, second = cache.get(_mapping("a", 1, 2.0)), cache.get(_mapping("a", 1, 2.0))
+
+    first.dynamic_transformations[0].pre_apply(client=None, shop_model={}, start=0, end=0)
+
+    assert isinstance(first.dynamic_transformations[0], StaticValues)
+    assert first.dynamic_transformations[0] is not second.dynamic_transformations[0]
+    assert not second.dynamic_transformations[0].pre_apply_has_run
+
+
+def test_plan_apply():
+    plan = TransformationPlanCache().get(_mapping("a", 1, 2.0, with_static_values=False))
+    time_series = pd.Series([1.0, 2.0], index=pd.date_range(datetime(2022, 1, 1), periods=2, freq="1h"))
+
+    assert plan.apply((time_series,)).tolist() == [3.0, 5.0]
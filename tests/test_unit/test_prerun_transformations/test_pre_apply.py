@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+from cognite.client import CogniteClient
+
+from cognite.powerops.prerun_transformations import pre_apply, transformations
+from cognite.powerops.prerun_transformations.pre_apply import pre_apply_transformations
+from cognite.powerops.prerun_transformations.transformations import (
+    AddConstant,
+    AddWaterInTransit,
+    HeightToVolume,
+)
+
+START = datetime(2022, 5, 20, 22)
+
+
+def _ms(timestamp: datetime) -> int:
+    return int(timestamp.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+@pytest.fixture()
+def retrieve_range_calls(monkeypatch) -> list[tuple[list[str], int, int, str]]:
+    """Replaces `retrieve_range` with discharge datapoints (depending on time only), recording the calls."""
+    calls = []
+
+    def retrieve_range(
+        client: CogniteClient, external_ids: list[str], start: int, end: int, resolution: str = "1h"
+    ) -> dict[str, pd.Series]:
+        calls.append((external_ids, start, end, resolution))
+        index = pd.date_range(pd.Timestamp(start, unit="ms"), pd.Timestamp(end, unit="ms"), freq=resolution)
+        hours = (index - pd.Timestamp(0)) / pd.Timedelta("1h")
+        return {
+            external_id: pd.Series(hours + 1000 * int(external_id[-1]), index=index, dtype=float)
+            for external_id in external_ids
+        }
+
+    monkeypatch.setattr(pre_apply, "retrieve_range", retrieve_range)
+    monkeypatch.setattr(transformations, "retrieve_range", retrieve_range)
+    return calls
+
+
+def _transformations() -> list:
+    return [
+        AddWaterInTransit(discharge_ts_external_id="discharge1", transit_object_type="gate", transit_object_name="g1"),
+        AddWaterInTransit(discharge_ts_external_id="discharge2", transit_object_type="plant", transit_object_name="p1"),
+        AddWaterInTransit(discharge_ts_external_id="discharge1", transit_object_type="gate", transit_object_name="g2"),
+        HeightToVolume(object_type="reservoir", object_name="r1"),
+        AddConstant(constant=1),
+    ]
+
+
+SHOP_MODEL = {
+    "gate": {
+        "g1": {"shape_discharge": {"ref": 0, "x": [0, 60, 120], "y": [0.1, 0.5, 0.4]}},
+        "g2": {"time_delay": 300},
+    },
+    "plant": {"p1": {"time_delay": 180}},
+    "reservoir": {"r1": {"vol_head": {"x": [10, 20, 40], "y": [2, 4, 6]}}},
+}
+
+
+def test_pre_apply_transformations_retrieves_in_one_batch(
+    cognite_client_mock: CogniteClient, retrieve_range_calls: list
+):
+    start, end = _ms(START), _ms(START + timedelta(days=1))
+    expected = _transformations()
+    for transformation in expected:
+        if isinstance(transformation, transformations.DynamicTransformation):
+            transformation.pre_apply(client=cognite_client_mock, shop_model=SHOP_MODEL, start=start, end=end)
+    retrieve_range_calls.clear()
+
+    batched = _transformations()
+    pre_apply_transformations(cognite_client_mock, batched, shop_model=SHOP_MODEL, start=start, end=end)
+
+    assert retrieve_range_calls == [(["discharge1", "discharge2"], start - 300 * 60 * 1000, start, "60min")]
+    for batched_transformation, expected_transformation in zip(batched, expected, strict=True):
+        if isinstance(expected_transformation, AddWaterInTransit):
+            assert batched_transformation.pre_apply_has_run
+            pd.testing.assert_series_equal(batched_transformation.discharge, expected_transformation.discharge)
+            assert batched_transformation.shape == expected_transformation.shape
+        elif isinstance(expected_transformation, HeightToVolume):
+            assert batched_transformation.heights == expected_transformation.heights
+
+
+def test_pre_apply_transformations_batches_by_resolution(
+    cognite_client_mock: CogniteClient, retrieve_range_calls: list
+):
+    start, end = _ms(START), _ms(START + timedelta(days=1))
+    hourly, sub_hourly = (
+        AddWaterInTransit(
+            discharge_ts_external_id="discharge1",
+            transit_object_type="gate",
+            transit_object_name="g1",
+            resolution_minutes=resolution_minutes,
+        )
+        for resolution_minutes in (60, 15)
+    )
+
+    pre_apply_transformations(cognite_client_mock, [hourly, sub_hourly], shop_model=SHOP_MODEL, start=start, end=end)
+
+    assert retrieve_range_calls == [
+        (["discharge1"], start - 120 * 60 * 1000, start, "60min"),
+        (["discharge1"], start - 120 * 60 * 1000, start, "15min"),
+    ]
+    assert len(sub_hourly.discharge) == 4 * len(hourly.discharge) - 3
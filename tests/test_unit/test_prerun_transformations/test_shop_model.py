@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from cognite.client import CogniteClient
+from cognite.client.data_classes import FileMetadata
+
+from cognite.powerops.prerun_transformations.shop_model import ParsedShopModel, ShopModelCache
+from cognite.powerops.prerun_transformations.transformations import AddWaterInTransit, HeightToVolume
+
+SHOP_MODEL_YAML = """
+time:
+  starttime: 2024-05-31 22:00:00
+model:
+  reservoir:
+    Dale:
+      vol_head:
+        x: [0, 10, 20]
+        y: [900, 950, 1000]
+  gate:
+    Dale_gate:
+      time_delay: 120
+  plant:
+    Dale_plant:
+      shape_discharge:
+        x: [0, 60, 120]
+        y: [0.5, 0.3, 0.2]
+"""
+
+
+@pytest.fixture()
+def cognite_client(cognite_client_mock: CogniteClient) -> CogniteClient:
+    cognite_client_mock.config.project = "test-project"
+    cognite_client_mock.files.retrieve.side_effect = lambda id=None, external_id=None: FileMetadata(
+        id=id or 1, external_id=external_id or "shop_model", last_updated_time=100
+    )
+    cognite_client_mock.files.download_bytes.return_value = SHOP_MODEL_YAML.encode()
+    return cognite_client_mock
+
+
+def test_shop_model_cache_parses_each_version_once(cognite_client: CogniteClient):
+    cache = ShopModelCache()
+
+    first = cache.retrieve(cognite_client, "shop_model")
+    second = cache.retrieve(cognite_client, FileMetadata(id=1, external_id="shop_model", last_updated_time=100))
+    updated = cache.retrieve(cognite_client, FileMetadata(id=1, external_id="shop_model", last_updated_time=200))
+
+    assert first is second
+    assert updated is not first
+    assert cognite_client.files.download_bytes.call_count == 2
+    assert set(first) == {"reservoir", "gate", "plant"}
+
+
+def test_parsed_shop_model_matches_dict_model_in_pre_apply():
+    parsed = ParsedShopModel.parse(SHOP_MODEL_YAML)
+    model = dict(parsed)
+
+    for transit_object_type, transit_object_name in [("gate", "Dale_gate"), ("plant", "Dale_plant")]:
+        assert AddWaterInTransit.get_shape(parsed, transit_object_type, transit_object_name) == (
+            AddWaterInTransit.get_shape(model, transit_object_type, transit_object_name)
+        )
+
+    heights = pd.Series([890.0, 925.0, 975.0, 1010.0])
+    outputs = []
+    for shop_model in [parsed, model]:
+        transformation = HeightToVolume(object_type="reservoir", object_name="Dale")
+        transformation.pre_apply(client=None, shop_model=shop_model, start=0, end=0)
+        outputs.append(transformation.apply((heights,)))
+    pd.testing.assert_series_equal(outputs[0], outputs[1])
+    assert outputs[0].tolist() == [0.0, 5.0, 15.0, 20.0]
@@ -5,6 +5,7 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from typing import Any, Literal
 
+import numpy as np
 import pandas as pd
 import pytest
 import pytz
@@ -30,6 +31,7 @@ from cognite.powerops.prerun_transformations.transformations import (
     SumTimeseries,
     ToBool,
     ToInt,
+    Transformation,
     ZeroIfNotOne,
     ms_to_datetime_tz_naive,
 )
@@ -448,6 +450,134 @@ def test_height_to_volume(cognite_client_mock: CogniteClient):
     pd.testing.assert_series_equal(expected_data, output_data, check_dtype=False, check_freq=False)
 
 
+def test_height_to_volume_reports_out_of_bounds_once(cognite_client_mock: CogniteClient, caplog):
+    transformation = HeightToVolume(object_type="reservoir", object_name="Nyhellervann")
+    transformation.pre_apply(
+        client=cognite_client_mock,
+        shop_model={"reservoir": {"Nyhellervann": {"vol_head": {"x": [10, 20, 40], "y": [2, 4, 6]}}}},
+        start=0,
+        end=0,
+    )
+    datapoints = pd.Series([1.0, 3.0, 7.0, 8.0] * 1000)
+
+    with caplog.at_level("WARNING"):
+        output_data = transformation.apply(time_series_data=(datapoints,))
+
+    assert output_data.tolist() == [10.0, 15.0, 40.0, 40.0] * 1000
+    assert len(caplog.records) == 1
+    assert "3000 value(s) outside" in caplog.records[0].message
+
+
+@pytest.mark.parametrize(
+    "transformation_class, expected_values",
+    [(AddFromOffset, [1.0, 3.0, 3.0, 6.0, 7.0]), (MultiplyFromOffset, [1.0, 2.0, 2.0, 9.0, 12.0])],
+)
+def test_offset_transformations_between_timestamps(
+    transformation_class: type[AddFromOffset | MultiplyFromOffset], expected_values: list[float]
+):
+    index = pd.date_range(datetime(2022, 1, 1), periods=4, freq="1h", unit="ms")
+    datapoints = pd.Series([1.0, float("nan"), 3.0, 4.0], index=index)
+    transformation = transformation_class(
+        relative_datapoints=[
+            RelativeDatapoint(offset_minute=120, offset_value=3),
+            RelativeDatapoint(offset_minute=30, offset_value=2),
+        ]
+    )
+
+    output_data = transformation.apply(time_series_data=(datapoints,))
+
+    expected_index = pd.DatetimeIndex(["2022-01-01 00:00", "2022-01-01 00:30", *index[1:].astype(str)])
+    pd.testing.assert_series_equal(output_data, pd.Series(expected_values, index=expected_index.as_unit("ns")))
+
+
+def test_offset_transformations_reject_duplicate_offsets():
+    datapoints = pd.Series([1.0, 2.0], index=pd.date_range(datetime(2022, 1, 1), periods=2, freq="1h"))
+    relative_datapoints = [RelativeDatapoint(offset_minute=m, offset_value=1) for m in (30, 30.5)]
+
+    with pytest.raises(ValueError):
+        AddFromOffset(relative_datapoints=relative_datapoints).apply(time_series_data=(datapoints,))
+
+
+@pytest.mark.parametrize("transformation_class", [StaticValues, AddFromOffset, MultiplyFromOffset])
+def test_relative_datapoints_load_from_fdm(
+    transformation_class: type[StaticValues | AddFromOffset | MultiplyFromOffset],
+):
+    relative_datapoints = [
+        RelativeDatapoint(offset_minute=0, offset_value=1.5),
+        RelativeDatapoint(offset_minute=90.5, offset_value=-2),
+        RelativeDatapoint(offset_minute=1440, offset_value=3),
+    ]
+    transformation = transformation_class(relative_datapoints=relative_datapoints)
+
+    parameters = transformation.parameters_to_dict()
+    loaded = Transformation.load_from_fdm(transformation_class.__name__, parameters)
+
+    assert parameters == {"0": "1.5", "90": "-2.0", "1440": "3.0"}
+    assert type(loaded) is transformation_class
+    assert loaded.parameters_to_dict() == parameters
+    np.testing.assert_array_equal(loaded.offsets.offset_minutes, [0, 90, 1440])
+    np.testing.assert_array_equal(loaded.offsets.offset_values, [1.5, -2.0, 3.0])
+
+
+@pytest.mark.parametrize("transformation_class", [AddFromOffset, MultiplyFromOffset])
+def test_relative_datapoints_assignment_updates_offsets(transformation_class: type[AddFromOffset | MultiplyFromOffset]):
+    time_series = pd.Series([1.0, 2.0], index=pd.date_range(datetime(2022, 1, 1), periods=2, freq="1h"))
+    transformation = transformation_class(relative_datapoints=[RelativeDatapoint(offset_minute=0, offset_value=1.0)])
+    transformation.apply((time_series,))
+
+    transformation.relative_datapoints = [RelativeDatapoint(offset_minute=0, offset_value=100.0)]
+
+    assert transformation.parameters_to_dict() == {"0": "100.0"}
+    expected = transformation_class(relative_datapoints=[RelativeDatapoint(offset_minute=0, offset_value=100.0)])
+    pd.testing.assert_series_equal(transformation.apply((time_series,)), expected.apply((time_series,)))
+
+
+@pytest.mark.parametrize("transformation_class", [AddFromOffset, MultiplyFromOffset])
+def test_relative_datapoints_changes_update_offsets(transformation_class: type[AddFromOffset | MultiplyFromOffset]):
+    time_series = pd.Series([1.0, 2.0], index=pd.date_range(datetime(2022, 1, 1), periods=2, freq="1h"))
+    loaded = Transformation.load_from_fdm(transformation_class.__name__, {"0": "1.0"})
+    loaded.apply((time_series,))
+
+    loaded.relative_datapoints.append(RelativeDatapoint(offset_minute=60, offset_value=100))
+    loaded.relative_datapoints[0].offset_value = 5
+    copied = loaded.model_copy(update={"relative_datapoints": [RelativeDatapoint(offset_minute=0, offset_value=3)]})
+
+    assert loaded.parameters_to_dict() == {"0": "5.0", "60": "100.0"}
+    expected = transformation_class(
+        relative_datapoints=[
+            RelativeDatapoint(offset_minute=0, offset_value=5),
+            RelativeDatapoint(offset_minute=60, offset_value=100),
+        ]
+    )
+    pd.testing.assert_series_equal(loaded.apply((time_series,)), expected.apply((time_series,)))
+    assert loaded == expected
+    assert loaded.model_dump(exclude_unset=True) == expected.model_dump()
+    assert copied.parameters_to_dict() == {"0": "3.0"}
+
+
+@pytest.mark.parametrize("transformation_class", [AddFromOffset, MultiplyFromOffset])
+def test_offset_transformations_apply_many(transformation_class: type[AddFromOffset | MultiplyFromOffset]):
+    index = pd.date_range(datetime(2022, 1, 1), periods=6, freq="1h")
+    datapoints = pd.Series([1.0, 2.0, float("nan"), 4.0, 5.0, 6.0], index=index)
+    scenarios = [
+        transformation_class(
+            relative_datapoints=[
+                RelativeDatapoint(offset_minute=minute, offset_value=value) for minute, value in relative_datapoints
+            ]
+        )
+        for relative_datapoints in [[(0, 1), (90, 2)], [(30, -1), (240, 3)], [(90, 0.5)], []]
+    ]
+
+    output_index, output_values = transformation_class.apply_many((datapoints,), scenarios)
+
+    # Each row is the output of one scenario, forward filled onto the shared time axis
+    outputs = [scenario.apply(time_series_data=(datapoints,)) for scenario in scenarios]
+    expected = pd.concat(outputs, axis=1).sort_index().ffill()
+    assert output_values.shape == (len(scenarios), len(expected))
+    pd.testing.assert_index_equal(output_index, expected.index)
+    np.testing.assert_array_equal(output_values, expected.to_numpy().T)
+
+
 @dataclass
 class AddWaterInTransitTestCase:
     """Test case for testing the AddWaterInTransit class"""
@@ -668,3 +798,84 @@ def test_add_water_in_transit(cognite_client_mock: CogniteClient, test_case: Add
 
         pd.testing.assert_series_equal(expected_data, output_data, check_dtype=False, check_freq=False)
         assert output_shape == test_case.expected_shape
+
+
+def test_add_water_in_transit_sub_hourly():
+    start = datetime(2022, 5, 20, 0)
+    discharge = pd.Series([4.0, 8.0], index=[start - timedelta(minutes=30), start - timedelta(minutes=15)])
+    inflow = pd.Series([1.0] * 4, index=pd.date_range(start, periods=4, freq="15min"))
+
+    output_data = AddWaterInTransit.add_water_in_transit(
+        inflow=inflow,
+        discharge=discharge,
+        shape={15: 0.5, 30: 0.5},
+        start=start,
+        end=start + timedelta(hours=1),
+        freq="15min",
+    )
+
+    # 00:00 gets half of the discharge at 23:45 and 23:30, 00:15 gets the other half of the discharge at 23:45
+    expected_data = pd.Series([7.0, 5.0, 1.0, 1.0], index=pd.date_range(start, periods=4, freq="15min"))
+    pd.testing.assert_series_equal(expected_data, output_data, check_freq=False)
+
+
+def test_add_water_in_transit_apply_sub_hourly():
+    start = datetime(2022, 5, 20, 0)
+    start_ms = int(start.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    end_ms = start_ms + 60 * 60 * 1000
+    model = {"gate": {"gate1": {"shape_discharge": {"ref": 0, "x": [15, 30], "y": [0.5, 0.5]}}}}
+    discharge = pd.Series([4.0, 8.0], index=[start - timedelta(minutes=30), start - timedelta(minutes=15)])
+    inflow = pd.Series([1.0] * 4, index=pd.date_range(start, periods=4, freq="15min"))
+    transformation = Transformation.load(
+        {
+            "AddWaterInTransit": {
+                "parameters": {
+                    "discharge_ts_external_id": "discharge_ts",
+                    "transit_object_type": "gate",
+                    "transit_object_name": "gate1",
+                    "resolution_minutes": 15,
+                }
+            }
+        }
+    )
+
+    transformation.pre_apply(client=None, shop_model=model, start=start_ms, end=end_ms, datapoints=discharge)
+    output_data = transformation.apply((inflow,))
+
+    expected_data = pd.Series([7.0, 5.0, 1.0, 1.0], index=pd.date_range(start, periods=4, freq="15min"))
+    pd.testing.assert_series_equal(expected_data, output_data, check_freq=False)
+    assert transformation.parameters_to_dict()["resolution_minutes"] == 15
+
+
+def test_add_water_in_transit_interpolates_discharge_sub_hourly(cognite_client_mock: CogniteClient):
+    start = datetime(2022, 5, 20, 0)
+    start_ms = int(start.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    hour_ms = 60 * 60 * 1000
+    # Linear discharge, 4 per hour, retrieved at 15 minutes as 4, 5, 6 and 7 in the hour before start
+    cognite_client_mock.time_series.data.retrieve.return_value = Datapoints(
+        external_id="discharge_ts", value=[4.0, 8.0], timestamp=[start_ms - hour_ms, start_ms]
+    )
+    cognite_client_mock.time_series.data.retrieve_latest.return_value = Datapoints(
+        external_id="discharge_ts", value=[4.0], timestamp=[start_ms - hour_ms]
+    )
+    cognite_client_mock.time_series.retrieve_multiple.return_value = [
+        TimeSeries(external_id="discharge_ts", is_step=False)
+    ]
+    transformation = AddWaterInTransit(
+        discharge_ts_external_id="discharge_ts",
+        transit_object_type="gate",
+        transit_object_name="gate1",
+        resolution_minutes=15,
+    )
+    inflow = pd.Series([0.0] * 4, index=pd.date_range(start, periods=4, freq="15min"))
+
+    transformation.pre_apply(
+        client=cognite_client_mock,
+        shop_model={"gate": {"gate1": {"time_delay": 60}}},
+        start=start_ms,
+        end=start_ms + hour_ms,
+    )
+    output_data = transformation.apply((inflow,))
+
+    expected_data = pd.Series([4.0, 5.0, 6.0, 7.0], index=pd.date_range(start, periods=4, freq="15min"))
+    pd.testing.assert_series_equal(expected_data, output_data, check_freq=False)
@@ -0,0 +1,232 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from cognite.client import CogniteClient
+from cognite.client.data_classes import Datapoints, DatapointsList, DatapointsQuery, TimeSeries
+from cognite.client.testing import monkeypatch_cognite_client
+
+from cognite.powerops.utils.cache import DatapointCache, TimeSeriesMetadataCache, TTLCache
+
+
+@pytest.fixture()
+def cognite_client() -> CogniteClient:
+    with monkeypatch_cognite_client() as client:
+        client.config.project = "test-project"
+        client.time_series.retrieve_multiple.side_effect = lambda external_ids, ignore_unknown_ids: [
+            TimeSeries(external_id=external_id, is_step=True)
+            for external_id in external_ids
+            if external_id != "unknown"
+        ]
+        yield client
+
+
+def test_ttl_cache_expiry(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+
+    cache.set("a", 1)
+    now[0] = 59
+    assert cache.get("a") == 1
+    now[0] = 61
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(maxsize=2)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_invalidate():
+    cache: TTLCache[str, int] = TTLCache(maxsize=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate(["a"])
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_time_series_metadata_cache(cognite_client: CogniteClient):
+    cache = TimeSeriesMetadataCache()
+
+    first = cache.retrieve(cognite_client, ["a", "b", "unknown"])
+    second = cache.retrieve(cognite_client, ["b", "c"])
+
+    assert [ts.external_id for ts in first] == ["a", "b"]
+    assert [ts.external_id for ts in second] == ["b", "c"]
+    # Only time series missing from the cache are requested from CDF
+    requested = [call.kwargs["external_ids"] for call in cognite_client.time_series.retrieve_multiple.call_args_list]
+    assert requested == [["a", "b", "unknown"], ["c"]]
+
+    cache.invalidate(cognite_client, ["a"])
+    cache.retrieve(cognite_client, ["a", "b"])
+    assert cognite_client.time_series.retrieve_multiple.call_args.kwargs["external_ids"] == ["a"]
+
+
+HOUR = 3600 * 1000
+
+
+@pytest.fixture()
+def cognite_client_with_datapoints(cognite_client: CogniteClient) -> CogniteClient:
+    # Hourly datapoints with the hour as value
+    def retrieve(external_id: list[DatapointsQuery], ignore_unknown_ids: bool) -> DatapointsList:
+        datapoints = []
+        for query in external_id:
+            timestamps = np.arange(query.start + (-query.start) % HOUR, query.end, HOUR)
+            datapoints.append(
+                Datapoints(
+                    external_id=query.identifier.as_primitive(),
+                    timestamp=timestamps.tolist(),
+                    value=(timestamps / HOUR).tolist(),
+                )
+            )
+        return DatapointsList(datapoints)
+
+    cognite_client.time_series.data.retrieve.side_effect = retrieve
+    return cognite_client
+
+
+def _requested(client: CogniteClient) -> list[tuple[str, int, int]]:
+    queries = client.time_series.data.retrieve.call_args.kwargs["external_id"]
+    return [(query.identifier.as_primitive(), query.start, query.end) for query in queries]
+
+
+def test_datapoint_cache_only_retrieves_uncovered_datapoints(
+    cognite_client_with_datapoints: CogniteClient, tmp_path: Path
+):
+    client = cognite_client_with_datapoints
+    cache = DatapointCache(tmp_path)
+
+    first = cache.retrieve_dataframe(client, ["a"], 0, 10 * HOUR)
+    second = cache.retrieve_dataframe(client, ["a", "b"], 5 * HOUR, 15 * HOUR)
+
+    assert first["a"].tolist() == list(range(10))
+    assert second["a"].tolist() == list(range(5, 15))
+    assert second["b"].tolist() == list(range(5, 15))
+    # Only the tail of "a" that is not in the cache is retrieved
+    assert _requested(client) == [("a", 10 * HOUR, 15 * HOUR), ("b", 5 * HOUR, 15 * HOUR)]
+
+    cache.retrieve_dataframe(client, ["a"], 2 * HOUR, 12 * HOUR)
+    assert client.time_series.data.retrieve.call_count == 2
+    assert cache.latest_before(client, [("a", 3 * HOUR), ("a", 20 * HOUR), ("b", 5 * HOUR)]) == {
+        ("a", 3 * HOUR): (2 * HOUR, 2.0)
+    }
+
+
+def test_datapoint_cache_does_not_cover_the_future(
+    cognite_client_with_datapoints: CogniteClient, tmp_path: Path, monkeypatch
+):
+    client = cognite_client_with_datapoints
+    cache = DatapointCache(tmp_path, refetch_window=0)
+    now = 1_700_000_123_456
+    monkeypatch.setattr(time, "time", lambda: now / 1000)
+    start = now - now % HOUR - 2 * HOUR
+
+    cache.retrieve_dataframe(client, ["a"], start, start + 5 * HOUR)
+    cache.retrieve_dataframe(client, ["a"], start, start + 5 * HOUR)
+
+    assert _requested(client)[0][1] == now
+
+
+def test_datapoint_cache_refetches_recent_datapoints(
+    cognite_client_with_datapoints: CogniteClient, tmp_path: Path, monkeypatch
+):
+    client = cognite_client_with_datapoints
+    cache = DatapointCache(tmp_path, refetch_window=3 * 3600)
+    now = 1_700_000_000_000 - 1_700_000_000_000 % HOUR
+    monkeypatch.setattr(time, "time", lambda: now / 1000)
+
+    cache.retrieve_dataframe(client, ["a"], now - 10 * HOUR, now)
+    # A late datapoint within the refetch window is in CDF on the next retrieval
+    client.time_series.data.retrieve.side_effect = lambda external_id, ignore_unknown_ids: DatapointsList(
+        [Datapoints(external_id="a", timestamp=[now - 2 * HOUR], value=[-1.0])]
+    )
+    second = cache.retrieve_dataframe(client, ["a"], now - 10 * HOUR, now)
+
+    assert _requested(client) == [("a", now - 3 * HOUR, now)]
+    assert second["a"].tolist() == [float(hour) for hour in range(now // HOUR - 10, now // HOUR - 3)] + [-1.0]
+
+
+def test_datapoint_cache_only_evicts_after_storing(
+    cognite_client_with_datapoints: CogniteClient, tmp_path: Path, monkeypatch
+):
+    client = cognite_client_with_datapoints
+    cache = DatapointCache(tmp_path)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+
+    cache.retrieve_dataframe(client, ["a"], 0, 10 * HOUR)
+    cache.retrieve_dataframe(client, ["a"], 2 * HOUR, 8 * HOUR)
+
+    # The directory is only scanned for eviction when datapoints were stored
+    assert client.time_series.data.retrieve.call_count == 1
+    assert len(scans) == 1
+
+
+def test_datapoint_cache_does_not_hold_the_lock_while_retrieving(
+    cognite_client_with_datapoints: CogniteClient, tmp_path: Path
+):
+    client = cognite_client_with_datapoints
+    cache = DatapointCache(tmp_path)
+    retrieve = client.time_series.data.retrieve.side_effect
+    locked = []
+
+    def retrieve_and_check_lock(external_id: list[DatapointsQuery], ignore_unknown_ids: bool) -> DatapointsList:
+        locked.append(cache._lock.locked())
+        return retrieve(external_id, ignore_unknown_ids)
+
+    client.time_series.data.retrieve.side_effect = retrieve_and_check_lock
+    cache.retrieve_dataframe(client, ["a"], 0, 10 * HOUR)
+    cache.retrieve_dataframe(client, ["a"], 0, 20 * HOUR)
+
+    assert locked == [False, False]
+
+
+def test_datapoint_cache_writes_new_files_on_update(cognite_client_with_datapoints: CogniteClient, tmp_path: Path):
+    client = cognite_client_with_datapoints
+    cache = DatapointCache(tmp_path)
+    cache.retrieve_dataframe(client, ["a"], 0, 10 * HOUR)
+    (path,) = (meta.parent for meta in tmp_path.glob("*/*/meta.json"))
+    first_files = set(path.glob("*.npy"))
+
+    entry = cache._load("test-project", "a")
+    second = cache.retrieve_dataframe(client, ["a"], 5 * HOUR, 15 * HOUR)
+
+    # The loaded datapoints are copies, so no memory map keeps the replaced files open
+    assert entry is not None and not isinstance(entry.timestamps, np.memmap)
+    assert second["a"].tolist() == list(range(5, 15))
+    assert len(set(path.glob("*.npy"))) == 2
+    assert not first_files & set(path.glob("*.npy"))
+    assert cache.retrieve_dataframe(client, ["a"], 0, 15 * HOUR)["a"].tolist() == list(range(15))
+    assert client.time_series.data.retrieve.call_count == 2
+
+
+def test_datapoint_cache_eviction(cognite_client_with_datapoints: CogniteClient, tmp_path: Path):
+    client = cognite_client_with_datapoints
+    cache = DatapointCache(tmp_path, max_bytes=None)
+    cache.retrieve_dataframe(client, ["a", "b"], 0, 100 * HOUR)
+
+    cache.max_bytes = 1
+    cache.evict()
+    assert len(list(tmp_path.glob("*/*/meta.json"))) == 0
+
+    cache.retrieve_dataframe(client, ["a"], 0, HOUR)
+    cache.invalidate(client, ["a"])
+    cache.retrieve_dataframe(client, ["a"], 0, HOUR)
+    assert client.time_series.data.retrieve.call_count == 3
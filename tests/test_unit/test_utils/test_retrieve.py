@@ -0,0 +1,354 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from cognite.client import CogniteClient
+from cognite.client.data_classes import (
+    Datapoints,
+    DatapointsList,
+    DatapointsQuery,
+    LatestDatapointQuery,
+    TimeSeries,
+)
+from cognite.client.testing import monkeypatch_cognite_client
+
+from cognite.powerops.client._generated.data_classes import ShopTimeResolutionWrite
+from cognite.powerops.utils.retrieve import (
+    TimeResolution,
+    _resample_grid,
+    _resample_to_grid,
+    retrieve_latest_async,
+    retrieve_range,
+    retrieve_range_async,
+    retrieve_range_in_windows,
+    retrieve_time_series_datapoints,
+)
+
+
+def _ms(timestamp: datetime) -> int:
+    return int(timestamp.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+@pytest.fixture()
+def cognite_client(request: pytest.FixtureRequest) -> CogniteClient:
+    with monkeypatch_cognite_client() as client:
+        # The time series metadata cache is shared by all clients for the same project
+        client.config.project = request.node.name
+        yield client
+
+
+def test_resample_to_grid_matches_minute_upsampling():
+    rng = np.random.default_rng(42)
+    minutes = np.sort(rng.choice(3000, size=40, replace=False))
+    index = pd.Timestamp("2022-01-01 00:17") + pd.to_timedelta(minutes, unit="min")
+    values = rng.normal(size=(len(index), 4))
+    values[rng.random(values.shape) < 0.4] = np.nan
+    df_raw = pd.DataFrame(values, index=index, columns=["step_1", "step_2", "linear_1", "linear_2"])
+    step_columns, linear_columns = ["step_1", "step_2"], ["linear_1", "linear_2"]
+
+    # The previous implementation: step columns are forward filled, linear columns are upsampled to one minute
+    # resolution and interpolated before being downsampled to one hour
+    expected = (
+        df_raw[step_columns]
+        .ffill()
+        .resample("1h")
+        .ffill()
+        .combine_first(df_raw[linear_columns].resample("1min").interpolate().resample("1h").interpolate())
+    )
+
+    grid = _resample_grid(df_raw.index, freq="1h")
+    output = _resample_to_grid(df_raw, grid, step_columns=step_columns, linear_columns=linear_columns)
+
+    pd.testing.assert_frame_equal(expected, output[expected.columns], check_freq=False)
+
+
+START, END = datetime(2022, 1, 1, 1), datetime(2022, 1, 1, 4)
+
+
+@pytest.fixture()
+def cognite_client_with_datapoints(cognite_client: CogniteClient) -> CogniteClient:
+    first_in_range = _ms(datetime(2022, 1, 1, 1, 30))
+    cognite_client.time_series.data.retrieve.return_value = DatapointsList(
+        [
+            Datapoints(external_id="step", value=[2.0, 4.0], timestamp=[first_in_range, _ms(END)]),
+            Datapoints(external_id="linear", value=[2.0, 4.0], timestamp=[first_in_range, _ms(END)]),
+        ]
+    )
+    cognite_client.time_series.data.retrieve_latest.return_value = DatapointsList(
+        [
+            Datapoints(external_id="step", value=[1.0], timestamp=[_ms(datetime(2022, 1, 1, 0, 30))]),
+            Datapoints(external_id="linear", value=[1.0], timestamp=[_ms(datetime(2022, 1, 1, 0, 30))]),
+        ]
+    )
+    cognite_client.time_series.retrieve_multiple.return_value = [
+        TimeSeries(external_id="step", is_step=True),
+        TimeSeries(external_id="linear", is_step=False),
+    ]
+    return cognite_client
+
+
+@pytest.mark.parametrize(
+    "resolution, expected_index, expected_step, expected_linear",
+    [
+        pytest.param(
+            "1h",
+            pd.date_range(START, END, freq="1h"),
+            [1.0, 2.0, 2.0, 4.0],
+            [1.5, 2.4, 3.2, 4.0],
+            id="hourly",
+        ),
+        pytest.param(
+            "30min",
+            pd.date_range(START, END, freq="30min"),
+            [1.0, 2.0, 2.0, 2.0, 2.0, 2.0, 4.0],
+            [1.5, 2.0, 2.4, 2.8, 3.2, 3.6, 4.0],
+            id="sub-hourly",
+        ),
+        pytest.param(
+            ShopTimeResolutionWrite(
+                external_id="segments", name="segments", minutes_after_start=[0, 60], time_resolution_minutes=[30, 120]
+            ),
+            pd.DatetimeIndex([START, START + timedelta(minutes=30), START + timedelta(hours=1), END]),
+            [1.0, 2.0, 2.0, 4.0],
+            [1.5, 2.0, 2.4, 4.0],
+            id="time resolution segments",
+        ),
+    ],
+)
+def test_retrieve_range(
+    cognite_client_with_datapoints: CogniteClient,
+    resolution: TimeResolution,
+    expected_index: pd.DatetimeIndex,
+    expected_step: list[float],
+    expected_linear: list[float],
+):
+    output = retrieve_range(
+        cognite_client_with_datapoints,
+        ["step", "linear", "step"],
+        start=_ms(START),
+        end=_ms(END),
+        resolution=resolution,
+    )
+
+    pd.testing.assert_series_equal(
+        output["step"], pd.Series(expected_step, index=expected_index, name="step"), check_freq=False
+    )
+    pd.testing.assert_series_equal(
+        output["linear"], pd.Series(expected_linear, index=expected_index, name="linear"), check_freq=False
+    )
+
+
+def test_retrieve_time_series_datapoints(cognite_client_with_datapoints: CogniteClient):
+    latest_values = {("start", _ms(START)): 10.0, ("end", _ms(END)): 20.0, ("step", _ms(START)): 1.0}
+
+    def retrieve_latest(external_id: list[LatestDatapointQuery], ignore_unknown_ids: bool) -> DatapointsList:
+        # Returns datapoints in the order of the queries, skipping queries without datapoints
+        return DatapointsList(
+            [
+                Datapoints(
+                    external_id=query.identifier.as_primitive(),
+                    value=[latest_values[(query.identifier.as_primitive(), query.before)]],
+                    timestamp=[_ms(datetime(2022, 1, 1, 0, 30))],
+                )
+                for query in external_id
+                if (query.identifier.as_primitive(), query.before) in latest_values
+            ]
+        )
+
+    cognite_client_with_datapoints.time_series.data.retrieve_latest.side_effect = retrieve_latest
+    mappings = [
+        SimpleNamespace(cdf_time_series="start", retrieve="START"),
+        SimpleNamespace(cdf_time_series="end", retrieve="END"),
+        SimpleNamespace(cdf_time_series="step", retrieve="RANGE"),
+        SimpleNamespace(cdf_time_series="step", retrieve="RANGE"),
+        SimpleNamespace(cdf_time_series="linear", retrieve="RANGE"),
+        SimpleNamespace(
+            cdf_time_series=None, retrieve=None, shop_object_type="a", shop_object_name="b", shop_attribute_name="c"
+        ),
+    ]
+
+    output = retrieve_time_series_datapoints(cognite_client_with_datapoints, mappings, start=_ms(START), end=_ms(END))
+
+    # START, END and the latest datapoints for RANGE mappings are retrieved in a single, deduplicated request
+    cognite_client_with_datapoints.time_series.data.retrieve_latest.assert_called_once()
+    queries = cognite_client_with_datapoints.time_series.data.retrieve_latest.call_args.kwargs["external_id"]
+    assert [(query.identifier.as_primitive(), query.before) for query in queries] == [
+        ("start", _ms(START)),
+        ("step", _ms(START)),
+        ("linear", _ms(START)),
+        ("end", _ms(END)),
+    ]
+    assert set(output) == {"start", "end", "step", "linear"}
+    pd.testing.assert_series_equal(output["start"], pd.Series([10.0], index=[START], name="start"), check_freq=False)
+    pd.testing.assert_series_equal(output["end"], pd.Series([20.0], index=[END], name="end"), check_freq=False)
+    pd.testing.assert_series_equal(
+        output["step"],
+        pd.Series([1.0, 2.0, 2.0, 4.0], index=pd.date_range(START, END, freq="1h"), name="step"),
+        check_freq=False,
+    )
+    # No latest datapoint before start, so the linear series starts at its first datapoint in range
+    pd.testing.assert_series_equal(
+        output["linear"],
+        pd.Series([2.4, 3.2, 4.0], index=pd.date_range(START + timedelta(hours=1), END, freq="1h"), name="linear"),
+        check_freq=False,
+    )
+
+
+def test_retrieve_time_series_datapoints_columnar(cognite_client_with_datapoints: CogniteClient):
+    mappings = [
+        SimpleNamespace(cdf_time_series="step", retrieve="RANGE"),
+        SimpleNamespace(cdf_time_series="linear", retrieve="RANGE"),
+    ]
+
+    block = retrieve_time_series_datapoints(
+        cognite_client_with_datapoints, mappings, start=_ms(START), end=_ms(END), columnar=True
+    )
+    expected = retrieve_time_series_datapoints(cognite_client_with_datapoints, mappings, start=_ms(START), end=_ms(END))
+
+    assert sorted(block.columns) == ["linear", "step"]
+    assert block.matrix.shape == (len(block.timestamps), 2)
+    assert np.shares_memory(block["step"], block.matrix)
+    for external_id, series in block.to_dict().items():
+        pd.testing.assert_series_equal(series, expected[external_id], check_freq=False)
+
+
+def test_retrieve_range_aggregates(cognite_client: CogniteClient):
+    hours = [_ms(START + timedelta(hours=i)) for i in range(3)]
+    cognite_client.time_series.data.retrieve.return_value = DatapointsList(
+        [
+            Datapoints(external_id="step", timestamp=hours, step_interpolation=[1.0, 2.0, 2.0]),
+            Datapoints(external_id="linear", timestamp=hours, interpolation=[1.5, 2.5, 3.5]),
+        ]
+    )
+    latest_datapoints = {
+        ("step", _ms(START)): (datetime(2022, 1, 1, 0, 30), 1.0),
+        ("linear", _ms(START)): (datetime(2022, 1, 1, 0, 30), 1.0),
+        ("step", _ms(END)): (datetime(2022, 1, 1, 3, 30), 4.0),
+        ("linear", _ms(END)): (datetime(2022, 1, 1, 3, 30), 4.0),
+    }
+    cognite_client.time_series.data.retrieve_latest.side_effect = lambda external_id, ignore_unknown_ids: (
+        DatapointsList(
+            [
+                Datapoints(
+                    external_id=query.identifier.as_primitive(),
+                    timestamp=[_ms(latest_datapoints[(query.identifier.as_primitive(), query.before)][0])],
+                    value=[latest_datapoints[(query.identifier.as_primitive(), query.before)][1]],
+                )
+                for query in external_id
+            ]
+        )
+    )
+    cognite_client.time_series.retrieve_multiple.return_value = [
+        TimeSeries(external_id="step", is_step=True),
+        TimeSeries(external_id="linear", is_step=False),
+    ]
+
+    output = retrieve_range(cognite_client, ["step", "linear"], start=_ms(START), end=_ms(END), mode="aggregates")
+
+    queries = cognite_client.time_series.data.retrieve.call_args.kwargs["external_id"]
+    assert {query.identifier.as_primitive(): query.aggregates for query in queries} == {
+        "step": ["step_interpolation"],
+        "linear": ["interpolation"],
+    }
+    assert cognite_client.time_series.data.retrieve.call_args.kwargs["granularity"] == "1h"
+    expected_index = pd.date_range(START, END - timedelta(hours=1), freq="1h")
+    pd.testing.assert_series_equal(
+        output["step"], pd.Series([1.0, 2.0, 2.0], index=expected_index, name="step"), check_freq=False
+    )
+    pd.testing.assert_series_equal(
+        output["linear"], pd.Series([1.5, 2.5, 3.5], index=expected_index, name="linear"), check_freq=False
+    )
+
+
+def test_retrieve_async_matches_retrieve(cognite_client_with_datapoints: CogniteClient):
+    client = cognite_client_with_datapoints
+    expected = retrieve_range(client, ["step", "linear"], start=_ms(START), end=_ms(END))
+
+    async def retrieve_concurrently() -> list[dict[str, pd.Series]]:
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(
+            *(
+                retrieve_range_async(client, ["step", "linear"], start=_ms(START), end=_ms(END), semaphore=semaphore)
+                for _ in range(3)
+            )
+        )
+
+    for output in asyncio.run(retrieve_concurrently()):
+        assert output.keys() == expected.keys()
+        for external_id, series in expected.items():
+            pd.testing.assert_series_equal(output[external_id], series, check_freq=False)
+
+    latest = asyncio.run(retrieve_latest_async(client, ["step", "linear"], before=_ms(START)))
+    assert {external_id: series.index[0] for external_id, series in latest.items()} == {"step": START, "linear": START}
+
+
+@pytest.mark.parametrize(
+    "resolution",
+    [
+        pytest.param("1h", id="hourly"),
+        pytest.param("7h", id="not dividing a day"),
+        pytest.param(
+            ShopTimeResolutionWrite(
+                external_id="segments", name="segments", minutes_after_start=[0, 600], time_resolution_minutes=[15, 60]
+            ),
+            id="time resolution segments",
+        ),
+    ],
+)
+def test_retrieve_range_in_windows_matches_retrieve_range(cognite_client: CogniteClient, resolution: TimeResolution):
+    rng = np.random.default_rng(7)
+    start, end = _ms(datetime(2022, 1, 3)), _ms(datetime(2022, 1, 13))
+    datapoints = {
+        external_id: np.sort(rng.choice(np.arange(start - 2 * 24 * 3600_000, end, 60_000), size=100, replace=False))
+        for external_id in ["step", "linear", "sparse"]
+    }
+    datapoints["sparse"] = datapoints["sparse"][::25]
+
+    def to_datapoints(external_id: str, timestamps: np.ndarray) -> Datapoints:
+        return Datapoints(external_id=external_id, timestamp=timestamps.tolist(), value=(timestamps / 1e9).tolist())
+
+    def retrieve(external_id, ignore_unknown_ids, start=None, end=None) -> DatapointsList:
+        queries = [
+            query if isinstance(query, DatapointsQuery) else DatapointsQuery(external_id=query, start=start, end=end)
+            for query in external_id
+        ]
+        results = []
+        for query in queries:
+            timestamps = datapoints[query.identifier.as_primitive()]
+            limit = query.limit if isinstance(query.limit, int) else None
+            timestamps = timestamps[(timestamps >= query.start) & (timestamps < query.end)][:limit]
+            results.append(to_datapoints(query.identifier.as_primitive(), timestamps))
+        return DatapointsList(results)
+
+    def retrieve_latest(external_id, ignore_unknown_ids, before=None) -> DatapointsList:
+        results = []
+        for query in external_id:
+            if isinstance(query, LatestDatapointQuery):
+                query, before = query.identifier.as_primitive(), query.before
+            timestamps = datapoints[query]
+            results.append(to_datapoints(query, timestamps[timestamps < before][-1:]))
+        return DatapointsList(results)
+
+    cognite_client.time_series.data.retrieve.side_effect = retrieve
+    cognite_client.time_series.data.retrieve_latest.side_effect = retrieve_latest
+    cognite_client.time_series.retrieve_multiple.return_value = [
+        TimeSeries(external_id="step", is_step=True),
+        TimeSeries(external_id="linear", is_step=False),
+        TimeSeries(external_id="sparse", is_step=False),
+    ]
+
+    expected = retrieve_range(cognite_client, list(datapoints), start=start, end=end, resolution=resolution)
+    chunks = list(
+        retrieve_range_in_windows(
+            cognite_client, list(datapoints), start=start, end=end, resolution=resolution, window=timedelta(days=1)
+        )
+    )
+
+    assert len(chunks) > 1
+    output = pd.concat(chunks)
+    assert output.index.is_unique
+    for external_id, series in expected.items():
+        pd.testing.assert_series_equal(output[external_id].dropna(), series, check_freq=False)